@@ -16,9 +16,9 @@ load_dotenv()  # 載入 .env 檔案的環境變數
 db = SQLAlchemy()
 
 # 自動匯入 models、schemas、services，確保 migrate 能正確找到所有資料表
-import app.models.user, app.models.product, app.models.order, app.models.payment, app.models.customer, app.models.operation_log, app.models.notification# 匯入資料表模型
+import app.models.user, app.models.product, app.models.order, app.models.order_search, app.models.sales_rollup, app.models.payment, app.models.customer, app.models.operation_log, app.models.notification# 匯入資料表模型
 import app.schemas.user, app.schemas.product, app.schemas.order, app.schemas.payment, app.schemas.customer, app.schemas.notification  # 匯入 Marshmallow schema
-import app.services.auth_service, app.services.user_service, app.services.product_service, app.services.order_service, app.services.payment_service, app.services.customer_service, app.services.report_service, app.services.notification_service  # 匯入服務層
+import app.services.auth_service, app.services.user_service, app.services.product_service, app.services.order_service, app.services.stock_service, app.services.payment_service, app.services.customer_service, app.services.report_service, app.services.notification_service, app.services.write_buffer, app.services.search_service, app.services.rollup_service, app.services.catalog_cache, app.services.category_service, app.services.reconciliation_service, app.services.event_broker, app.services.operation_log_service, app.services.dashboard_service  # 匯入服務層
 
 # 工廠模式建立 app 實例
 def create_app():
@@ -33,17 +33,33 @@ def create_app():
     }[env]
     app.config.from_object(cfg_cls)  # 載入對應設定檔
 
+    from app.utils.json_provider import init_json_provider
+    init_json_provider(app)  # JSON 回應編碼（有 orjson 時使用 orjson）
+
     db.init_app(app)  # 初始化 SQLAlchemy
     Migrate(app, db)  # 綁定資料庫遷移工具
     JWTManager(app)  # 啟用 JWT 管理
 
+    from app.utils.order_sn import init_order_sn_allocator
+    init_order_sn_allocator(app)  # 建立訂單編號配置器（每個程序一份，不查資料庫）
+
+    from app.services.catalog_cache import init_catalog_cache
+    init_catalog_cache(app)  # 商品目錄快取後端（程序內 LRU 或 Redis）
+
+    from app.services.event_broker import init_event_broker
+    init_event_broker(app)  # 即時事件推播的 pub/sub（程序內或 Redis）
+
+    from app.utils.query_metrics import init_query_metrics
+    init_query_metrics(app)  # 每個請求的 SQL 查詢數 / 耗時統計（Server-Timing、/metrics、查詢數上限）
+
     # 設定 CORS，允許前端網址從 config 讀取
-    CORS(app, resources={r"/*": {"origins": app.config["FRONTEND_URL"]}}, supports_credentials=True)
+    CORS(app, resources={r"/*": {"origins": app.config["FRONTEND_URL"]}}, supports_credentials=True,
+         expose_headers=["X-Next-Cursor"])  # 讓前端讀得到分頁游標標頭
 
     app.url_map.strict_slashes = False  # 關閉嚴格尾斜線檢查，避免 /api 和 /api/ 被視為不同路徑
 
     # 註冊 Blueprint 模組化路由
-    from app.routes import auth, main, users, products, orders, payments, customers, dashboard, categories, reports, notifications  # 匯入各模組路由
+    from app.routes import auth, main, users, products, orders, payments, customers, dashboard, categories, reports, notifications, metrics, events  # 匯入各模組路由
     app.register_blueprint(auth.bp_auth)  # 註冊登入認證藍圖
     app.register_blueprint(main.bp_main)  # 註冊主頁相關藍圖
     app.register_blueprint(users.bp_users)  # 註冊使用者管理藍圖
@@ -55,6 +71,8 @@ def create_app():
     app.register_blueprint(categories.bp_categories)    # 匯入分類藍圖
     app.register_blueprint(reports.bp_reports)  # 匯入報表藍圖
     app.register_blueprint(notifications.bp_notifications)  # 匯入通知藍圖
+    app.register_blueprint(metrics.bp_metrics)  # 匯入監控指標藍圖
+    app.register_blueprint(events.bp_events)  # 匯入即時事件（SSE）藍圖
 
     # 全域錯誤處理機制
     from marshmallow import ValidationError  # 匯入 schema 驗證錯誤
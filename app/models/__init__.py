@@ -3,7 +3,9 @@
 from .user import User
 from .product import Product, Category
 from .order import Order, OrderItem, OrderHistory
+from .order_search import OrderSearchToken
+from .sales_rollup import DailyOrderRollup, DailyProductRollup
 from .payment import Payment
 from .customer import Customer
 from .operation_log import OperationLog
-from .notification import Notification
+from .notification import Notification, NotificationState, NotificationRead
@@ -14,7 +14,7 @@ class Customer(db.Model):
     # 使用 Python 端管理時間，統一為 UTC 時區
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))  
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))  # 建立時間和更新時間，預設值為現在時間，onupdate 表示每次更新時自動更新為現在時間
-    orders = relationship('Order', back_populates='customer')  # 關聯到 Order 訂單資料表，意思是「一個顧客可以有多筆訂單」
+    orders = relationship('Order', back_populates='customer', lazy='raise_on_sql', passive_deletes=True)  # 關聯到 Order 訂單資料表，意思是「一個顧客可以有多筆訂單」；刪除顧客時由資料庫 ON DELETE SET NULL 處理
     # back_populates='customer' 表示 Order 資料表那邊也要設對應欄位叫 customer
 
     # 將資料轉成字典格式，方便前端或 API 回傳
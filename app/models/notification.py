@@ -3,6 +3,10 @@ from datetime import datetime,timezone
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_created_at', 'user_id', 'created_at'),  # 使用者通知列表
+        db.Index('ix_notifications_user_id_id', 'user_id', 'id'),  # 通知 feed（since_id / cursor 依 id 分頁）
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # null=全站
     type = db.Column(db.String(32), nullable=False)  # e.g. 'order_status', 'system'
@@ -21,3 +25,23 @@ class Notification(db.Model):
             'is_read': self.is_read,
             'created_at': self.created_at,
         }
+
+
+class NotificationState(db.Model):
+    """
+    每位使用者的通知狀態
+    - unread_count：個人通知的未讀數，新增通知、標記已讀時同步增減，輪詢時不必 COUNT
+    - read_all_id：「全部標為已讀」時的最大通知 id，id 不大於此值的通知（含全站通知）一律視為已讀
+    """
+    __tablename__ = 'notification_states'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    read_all_id = db.Column(db.Integer, nullable=False, default=0)
+
+
+class NotificationRead(db.Model):
+    """全站通知（user_id 為 null）的個別已讀紀錄：全站通知只存一筆，不複製給每位使用者"""
+    __tablename__ = 'notification_reads'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    notification_id = db.Column(db.Integer, db.ForeignKey('notifications.id', ondelete='CASCADE'), primary_key=True)
+    read_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
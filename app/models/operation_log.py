@@ -3,6 +3,12 @@ from datetime import datetime, timezone
 
 class OperationLog(db.Model):
     __tablename__ = 'operation_logs'
+    __table_args__ = (
+        # 列表一律依 (created_at, id) 做 keyset 分頁，索引都以這兩個欄位結尾，篩選後不需要另外排序
+        db.Index('ix_operation_logs_created_at_id', 'created_at', 'id'),  # 管理員瀏覽全部紀錄、時間區間、封存時依時間刪除
+        db.Index('ix_operation_logs_user_id_created_at_id', 'user_id', 'created_at', 'id'),  # 使用者自己的操作紀錄
+        db.Index('ix_operation_logs_target_created_at_id', 'target_type', 'target_id', 'created_at', 'id'),  # 單一對象（例如某張訂單）的異動紀錄
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     username = db.Column(db.String(64), nullable=False)
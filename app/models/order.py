@@ -5,6 +5,13 @@ from app.models.user import User  # 匯入 User 模型，用來建立關聯
 class Order(db.Model):  # 訂單主表
     """訂單資料表"""
     __tablename__ = 'orders'  # 指定在資料庫中對應的表格名稱為 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),  # 一般使用者的訂單列表（依建立時間排序）
+        db.Index('ix_orders_status_created_at', 'status', 'created_at'),  # 狀態篩選 + 排序
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),  # 管理員列表、keyset 分頁、報表日期區間
+        db.Index('ix_orders_total_amount_id', 'total_amount', 'id'),  # 依金額排序 / keyset 分頁
+        db.Index('ix_orders_customer_id', 'customer_id'),  # 顧客銷售統計
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # 主鍵，自動遞增
     order_sn = db.Column(db.String(64), unique=True, nullable=False)  # 訂單編號，必填且不可重複
@@ -23,13 +30,14 @@ class Order(db.Model):  # 訂單主表
     updated_at = db.Column(db.DateTime, onupdate=lambda: datetime.now(timezone.utc), nullable=True)  # 更新可以允許空
 
     # 資料表關聯設定
-    items = db.relationship('OrderItem', backref='order', lazy='selectin', cascade="all, delete-orphan")  # 一對多：訂單 ➜ 多筆商品明細
-    histories = db.relationship('OrderHistory', backref='order', lazy='selectin', cascade="all, delete-orphan")  # 一對多：訂單 ➜ 多筆歷史紀錄
-    customer = db.relationship('Customer', back_populates='orders')  # 多對一：訂單 ➜ 客戶，需配對 Customer.orders
-    user = db.relationship('User', back_populates='orders', lazy='selectin')  # 多對一：訂單 ➜ 使用者，需配對 User.orders
+    # 預設 raise_on_sql：關聯不會被隱性載入，需要的端點以 selectinload / joinedload 明確指定，避免 N+1 與整串歷史被帶出
+    items = db.relationship('OrderItem', backref=db.backref('order', lazy='raise_on_sql'), lazy='raise_on_sql', cascade="all, delete-orphan")  # 一對多：訂單 ➜ 多筆商品明細
+    histories = db.relationship('OrderHistory', backref=db.backref('order', lazy='raise_on_sql'), lazy='raise_on_sql', cascade="all, delete-orphan")  # 一對多：訂單 ➜ 多筆歷史紀錄
+    customer = db.relationship('Customer', back_populates='orders', lazy='raise_on_sql')  # 多對一：訂單 ➜ 客戶，需配對 Customer.orders
+    user = db.relationship('User', back_populates='orders', lazy='raise_on_sql')  # 多對一：訂單 ➜ 使用者，需配對 User.orders
 
     def to_dict(self, include_items=False, include_history=False, include_user=False):  # 將 Order 物件轉為字典格式，方便前端使用
-        """轉換為 dict，可選擇是否包含明細、歷史、使用者資料"""
+        """轉換為 dict，可選擇是否包含明細、歷史、使用者資料（對應的關聯需在查詢時先載入）"""
         
         data = {
             "id": self.id,  # 訂單的唯一編號（主鍵）
@@ -63,6 +71,10 @@ class Order(db.Model):  # 訂單主表
 
 class OrderItem(db.Model):  # 商品明細資料表（子表）
     __tablename__ = 'order_items'  # 對應資料庫中的表名
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),  # 載入訂單明細
+        db.Index('ix_order_items_product_id_order_id', 'product_id', 'order_id'),  # 商品銷售排行
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # 主鍵
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)  # 外鍵：對應到訂單
@@ -86,6 +98,9 @@ class OrderItem(db.Model):  # 商品明細資料表（子表）
 
 class OrderHistory(db.Model):  # 訂單歷史紀錄（例如狀態變更）
     __tablename__ = 'order_histories'  # 對應資料表名稱
+    __table_args__ = (
+        db.Index('ix_order_histories_order_id_operated_at', 'order_id', 'operated_at'),  # 訂單歷史（依時間排序）
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # 主鍵
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)  # 外鍵：對應訂單
@@ -0,0 +1,9 @@
+from app import db
+
+class OrderSearchToken(db.Model):
+    """訂單關鍵字搜尋索引（n-gram）
+    每筆訂單的 order_sn、remark、receiver_name 切成 token 後存放於此，
+    由 app.services.search_service 在訂單新增 / 修改 / 刪除時自動維護"""
+    __tablename__ = 'order_search_tokens'
+    token = db.Column(db.String(32), primary_key=True)  # 主鍵以 token 開頭，查詢 token IN (...) 直接走索引
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), primary_key=True, index=True)
@@ -4,6 +4,12 @@ from datetime import datetime, timezone
 class Payment(db.Model):
     """付款資訊資料表"""
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('ix_payments_order_id', 'order_id'),  # 依訂單查付款、使用者付款列表 join
+        db.Index('ix_payments_created_at_id', 'created_at', 'id'),  # 管理員付款列表
+        db.Index('ix_payments_status_created_at_id', 'status', 'created_at', 'id'),  # 付款列表依狀態篩選 + keyset 分頁
+        db.UniqueConstraint('payment_method', 'transaction_id', name='uq_payments_method_transaction'),  # 金流通知重送時不重複入帳
+    )
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -15,7 +21,7 @@ class Payment(db.Model):
     updated_at = db.Column(db.DateTime, onupdate=lambda: datetime.now(timezone.utc))
     
     # 關聯關係
-    order = db.relationship('Order', backref='payments')
+    order = db.relationship('Order', backref=db.backref('payments', lazy='raise_on_sql'), lazy='raise_on_sql')
     
     def to_dict(self):
         """將模型轉換為字典"""
@@ -4,10 +4,15 @@ from datetime import datetime, timezone
 class Category(db.Model):
     """商品分類（支援多層級）"""
     __tablename__ = 'categories'
+    __table_args__ = (
+        # 子孫分類以 path LIKE '/1/4/%' 前綴查詢；PostgreSQL 需 pattern_ops 才能讓 LIKE 走索引
+        db.Index('ix_categories_path', 'path', postgresql_ops={'path': 'varchar_pattern_ops'}),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
     sku = db.Column(db.String(64), unique=True, nullable=True)
     parent_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
+    path = db.Column(db.String(255))  # 物化路徑，例如 '/1/4/9/'（含自己），由 category_service 於 flush 後維護
     parent = db.relationship('Category', remote_side=[id], backref='children')
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, onupdate=lambda: datetime.now(timezone.utc))
@@ -27,6 +32,10 @@ class Category(db.Model):
 class Product(db.Model):
     """商品資料表"""
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_category_id', 'category_id'),  # 分類篩選
+        db.Index('ix_products_is_active_created_at', 'is_active', 'created_at'),  # 上架商品列表 / 下拉選單
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     price = db.Column(db.Float, nullable=False)
@@ -57,8 +66,9 @@ class Product(db.Model):
         }
 
     def change_stock(self, delta):
-        """庫存異動（正數進貨，負數銷售）"""
-        new_stock = self.stock + delta
-        if new_stock < 0:
-            raise ValueError(f"庫存不足，當前庫存: {self.stock}, 要求變更: {delta}")
-        self.stock = new_stock
+        """庫存異動（正數進貨，負數銷售）
+        以條件式 UPDATE 直接在資料庫加減，避免讀出再寫回造成併發超賣"""
+        from app.services.stock_service import adjust_stock  # 延遲匯入，避免 models ↔ services 循環 import
+        failed = adjust_stock(self.id, delta)
+        if failed:
+            raise ValueError(f"庫存不足，當前庫存: {failed['available']}, 要求變更: {delta}")
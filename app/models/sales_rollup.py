@@ -0,0 +1,24 @@
+from app import db
+
+class DailyOrderRollup(db.Model):
+    """每日訂單彙總（日期 × 狀態 × 顧客）
+    由 app.services.rollup_service 在訂單建立 / 修改 / 取消 / 付款 / 刪除時以增量維護，
+    報表與儀表板讀取此表，不必每次掃描 orders"""
+    __tablename__ = 'daily_order_rollups'
+    day = db.Column(db.String(10), primary_key=True)  # 'YYYY-MM-DD'，以字串存放方便各資料庫以 substr 彙總到月 / 年
+    status = db.Column(db.String(20), primary_key=True)
+    customer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 表示未指定顧客
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0)
+
+class DailyProductRollup(db.Model):
+    """每日商品銷售彙總（日期 × 商品 × 訂單狀態），分類透過 products 對應，商品換分類時報表跟著更新"""
+    __tablename__ = 'daily_product_rollups'
+    __table_args__ = (
+        db.Index('ix_daily_product_rollups_product_id_day', 'product_id', 'day'),  # 單一商品的銷售趨勢
+    )
+    day = db.Column(db.String(10), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(db.String(20), primary_key=True)
+    qty = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0)
@@ -19,7 +19,8 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, onupdate=lambda: datetime.now(timezone.utc))
     last_login = db.Column(db.DateTime)
 
-    orders = db.relationship('Order', back_populates='user', lazy='selectin', cascade="all, delete-orphan")
+    # 不隨使用者載入訂單（登入 / 個人資料 / 使用者列表都不需要），存取時直接報錯而不是發出查詢
+    orders = db.relationship('Order', back_populates='user', lazy='raise_on_sql', cascade="all, delete-orphan")
 
     def set_password(self, password: str):
         self.password_hash = generate_password_hash(password)
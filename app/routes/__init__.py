@@ -11,3 +11,5 @@ from .customers import bp_customers
 from .reports import bp_reports
 from .notifications import bp_notifications
 from .categories import bp_categories
+from .metrics import bp_metrics
+from .events import bp_events
@@ -6,6 +6,7 @@ from app import db
 from app.models import User
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import timedelta
+from app.utils.query_metrics import query_budget
 
 bp_auth = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -89,6 +90,7 @@ def register():
 
 # ---------- 登入 ----------
 @bp_auth.route('/login', methods=['POST'])
+@query_budget(2)
 def login():
     """
     使用者登入 (Login)
@@ -124,6 +126,7 @@ def login():
 # ---------- 取得目前使用者資訊 ----------
 @bp_auth.route('/me', methods=['GET'])
 @jwt_required()
+@query_budget(1)
 def me():
     """
     取得目前登入者資訊 (Get current user info)
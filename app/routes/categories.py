@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify, abort
 from app import db
 from app.models.product import Category
-from app.schemas.product import category_schema, categories_schema
+from app.schemas.product import category_schema
+from app.services.category_service import category_tree, find_category, validate_category_parent
 from flask_jwt_extended import jwt_required, get_jwt
 
 bp_categories = Blueprint('categories', __name__, url_prefix='/categories')
@@ -9,15 +10,17 @@ bp_categories = Blueprint('categories', __name__, url_prefix='/categories')
 @bp_categories.route('', methods=['GET'])
 @jwt_required(optional=True)
 def list_categories():
-    """取得所有分類（巢狀結構）"""
-    roots = Category.query.filter_by(parent_id=None).all()
-    return jsonify(categories_schema.dump(roots))
+    """取得所有分類（巢狀結構），整棵樹一次查詢並快取"""
+    return jsonify(category_tree())
 
 @bp_categories.route('/<int:cid>', methods=['GET'])
 @jwt_required(optional=True)
 def get_category(cid):
-    cat = Category.query.get_or_404(cid)
-    return jsonify(category_schema.dump(cat))
+    node, _ = find_category(cid)
+    if node is None:
+        # 上層已不存在的孤兒分類不在樹中，直接查詢
+        node = category_schema.dump(Category.query.get_or_404(cid))
+    return jsonify(node)
 
 @bp_categories.route('', methods=['POST'])
 @jwt_required()
@@ -27,6 +30,10 @@ def create_category():
     parent_id = data.get('parent_id')
     if not name:
         abort(400, description="缺少分類名稱")
+    try:
+        validate_category_parent(None, parent_id)
+    except ValueError as e:
+        abort(400, description=str(e))
     cat = Category(name=name, parent_id=parent_id)
     db.session.add(cat)
     db.session.commit()
@@ -40,6 +47,10 @@ def update_category(cid):
     if 'name' in data:
         cat.name = data['name']
     if 'parent_id' in data:
+        try:
+            validate_category_parent(cat, data['parent_id'])
+        except ValueError as e:
+            abort(400, description=str(e))
         cat.parent_id = data['parent_id']
     db.session.commit()
     return jsonify(category_schema.dump(cat))
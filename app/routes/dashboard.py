@@ -1,65 +1,20 @@
 #app/routes/dashboard.py
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt
-from app.models import Order, User
-from app import db
-from sqlalchemy import func
+from app.services.dashboard_service import cached_dashboard_summary
+from app.utils.query_metrics import query_budget
 
 bp_dashboard = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
 @bp_dashboard.route('/summary', methods=['GET'])
 @jwt_required()
+@query_budget(1)
 def summary():
     claims = get_jwt()
     # 允許所有登入用戶查看統計
     if claims.get('role') not in ['admin', 'seller']:
         return jsonify({'msg': 'Permission denied'}), 403
     
-    try:
-        # 統計資料
-        total_sales = db.session.query(func.sum(Order.total_amount)).scalar() or 0
-        order_count = db.session.query(func.count(Order.id)).scalar() or 0
-        customer_count = db.session.query(func.count(User.id)).scalar() or 0
-        
-        # 簡化的月度統計，在測試環境返回空數組
-        monthly_sales = []
-        
-        # 只在有訂單資料時才進行月度統計
-        if order_count > 0:
-            try:
-                # 嘗試 SQLite 相容的日期函數（測試環境）
-                month_expr = func.strftime('%Y-%m', Order.created_at)
-                monthly_sales_raw = (
-                    db.session.query(month_expr.label("month"), func.sum(Order.total_amount).label("value"))
-                    .group_by(month_expr)
-                    .order_by(month_expr)
-                    .all()
-                )
-                
-                # 序列化月度資料
-                for row in monthly_sales_raw:
-                    month_str = str(row.month) if row.month else "Unknown"
-                    monthly_sales.append({
-                        "month": month_str,
-                        "value": float(row.value) if row.value else 0
-                    })
-                    
-            except Exception as e:
-                # 如果日期函數失敗，返回空的月度統計
-                monthly_sales = []
-        
-        return jsonify({
-            "total_sales": float(total_sales),
-            "order_count": int(order_count),
-            "customer_count": int(customer_count),
-            "monthly_sales": monthly_sales
-        })
-        
-    except Exception as e:
-        # 如果整個函數失敗，返回基本統計
-        return jsonify({
-            "total_sales": 0.0,
-            "order_count": 0,
-            "customer_count": 0,
-            "monthly_sales": []
-        })
\ No newline at end of file
+    # 總額、筆數、使用者數與月度統計以一次查詢取得（開啟 SALES_ROLLUP_READS 時讀每日彙總表），
+    # 結果依角色快取 DASHBOARD_CACHE_TTL 秒
+    return jsonify(cached_dashboard_summary(claims.get('role')))
@@ -0,0 +1,69 @@
+# app/routes/events.py
+import time
+from flask import Blueprint, Response, request, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.services.event_broker import get_broker, user_channel, format_sse, ADMIN_CHANNEL
+
+bp_events = Blueprint('events', __name__, url_prefix='/events')
+
+def _event_stream(subscription, heartbeat, max_duration, retry_ms):
+    """
+    產生 SSE 內容；不使用 app context 與資料庫連線，連線期間不佔用連線池
+    超過 max_duration 後結束，由瀏覽器依 retry 自動重連（帶 Last-Event-ID 補送期間的事件）
+    """
+    deadline = time.monotonic() + max_duration
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            record = subscription.get(timeout=min(heartbeat, remaining))
+            if record is None:
+                yield ": keep-alive\n\n"  # 註解行，避免 proxy 因閒置切斷連線
+            else:
+                yield format_sse(record)
+    finally:
+        subscription.close()
+
+@bp_events.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream():
+    """
+    即時事件（Server-Sent Events）：order_status、payment_success
+    ---
+    tags:
+      - Events
+    parameters:
+      - in: query
+        name: jwt
+        schema:
+          type: string
+        description: access token（EventSource 無法帶 Authorization header 時使用）
+      - in: header
+        name: Last-Event-ID
+        schema:
+          type: integer
+        description: 重連時補送此 id 之後的事件
+    responses:
+      200:
+        description: text/event-stream，每則事件的 data 為 {"order_id", "order_sn", "status"}
+    """
+    uid = int(get_jwt_identity())
+    channels = [user_channel(uid)]
+    if get_jwt().get('role') == 'admin':
+        channels.append(ADMIN_CHANNEL)  # 管理員收到所有訂單的事件
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscription = get_broker().subscribe(channels, last_event_id)
+    config = current_app.config
+    return Response(
+        _event_stream(subscription, config.get('SSE_HEARTBEAT', 15), config.get('SSE_MAX_DURATION', 300),
+                      config.get('SSE_RETRY_MS', 3000)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},  # 關閉 nginx 緩衝，事件立即送出
+    )
@@ -0,0 +1,34 @@
+# app/routes/metrics.py
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+from app.utils.query_metrics import query_metrics
+from app.services.write_buffer import get_flush_metrics
+from app.services.catalog_cache import get_catalog_cache_stats
+from app.services.event_broker import get_broker_stats
+from app.services.dashboard_service import get_dashboard_cache_stats
+
+bp_metrics = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+@bp_metrics.route('', methods=['GET'])
+@jwt_required()
+def metrics():
+    """
+    監控指標：各端點的 SQL 查詢數 / 資料庫耗時、通知寫入緩衝區的批次寫入統計、商品目錄 / 儀表板快取命中率、即時事件推播
+    ---
+    tags:
+      - Utility
+    responses:
+      200:
+        description: 程序啟動以來的累計統計（多 worker 部署時為單一 worker 的數字）
+      403:
+        description: 只有管理員可以查看
+    """
+    if get_jwt().get('role') != 'admin':
+        return jsonify({'msg': 'Permission denied'}), 403
+    return jsonify({
+        'sql': query_metrics.snapshot(),
+        'write_buffer': get_flush_metrics(),
+        'catalog_cache': get_catalog_cache_stats(),
+        'events': get_broker_stats(),
+        'dashboard_cache': get_dashboard_cache_stats(),
+    })
@@ -1,38 +1,98 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Notification, OperationLog
-from app.schemas import NotificationSchema, OperationLogSchema
+from flask import Blueprint, jsonify, request, abort
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.models import Notification
+from app.services.notification_service import notification_feed, unread_count, mark_notification_read, mark_all_read
+from app.services.operation_log_service import list_operation_log_page
+from app.utils.query_metrics import query_budget
 from app import db
+from datetime import datetime, timedelta
 
 bp_notifications = Blueprint('notifications', __name__, url_prefix='/notifications')
 
 @bp_notifications.route('', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def list_notifications():
+    """
+    通知 feed（個人 + 全站），依 id 由新到舊，每頁 page_size 筆（預設 20，最多 100）
+    - since_id：只回傳比此 id 新的通知，輪詢時帶目前最新的 id
+    - cursor：帶上一頁的 next_cursor 取更舊的通知
+    回傳 {"data", "unread_count", "next_cursor"}
+    """
     uid = int(get_jwt_identity())
-    notifs = Notification.query.filter((Notification.user_id == uid) | (Notification.user_id == None)).order_by(Notification.created_at.desc()).all()
-    return jsonify({"data": NotificationSchema(many=True).dump(notifs)})
+    try:
+        page_size = min(max(int(request.args.get('page_size', 20)), 1), 100)
+        since_id = request.args.get('since_id')
+        result = notification_feed(
+            uid,
+            since_id=int(since_id) if since_id else None,
+            cursor=request.args.get('cursor'),
+            limit=page_size,
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
+    return jsonify(result)
+
+@bp_notifications.route('/unread_count', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+def get_unread_count():
+    """未讀通知數（讀取計數欄位，不掃描通知表）"""
+    return jsonify({'unread_count': unread_count(int(get_jwt_identity()))})
 
 @bp_notifications.route('/<int:notif_id>/read', methods=['POST'])
 @jwt_required()
+@query_budget(6)
 def mark_read(notif_id):
     uid = int(get_jwt_identity())
     notif = Notification.query.get_or_404(notif_id)
     if notif.user_id and notif.user_id != uid:
         return jsonify({'msg': '無權限'}), 403
-    notif.is_read = True
-    db.session.commit()
-    return jsonify({'msg': '已標記為已讀'})
+    mark_notification_read(uid, notif)
+    return jsonify({'msg': '已標記為已讀', 'unread_count': unread_count(uid)})
+
+@bp_notifications.route('/read_all', methods=['POST'])
+@jwt_required()
+@query_budget(6)
+def read_all():
+    """
+    全部標為已讀；可帶 {"up_to_id": n} 只標記畫面上已看到的通知，之後才送達的維持未讀
+    """
+    uid = int(get_jwt_identity())
+    up_to_id = (request.get_json(silent=True) or {}).get('up_to_id')
+    if up_to_id is not None and (not isinstance(up_to_id, int) or isinstance(up_to_id, bool)):
+        abort(400, description="up_to_id 必須是整數")
+    return jsonify({'msg': '已全部標記為已讀', 'unread_count': mark_all_read(uid, up_to_id)})
 
 @bp_notifications.route('/logs', methods=['GET'])
 @jwt_required()
+@query_budget(2)
 def list_logs():
-    # 僅 admin 可看全部，user 只能看自己
-    from flask_jwt_extended import get_jwt
+    """
+    操作紀錄（由新到舊），回應內容為紀錄陣列；僅 admin 可看全部，user 只能看自己
+    - 篩選：user_id（admin）、action、target_type、target_id、date_start / date_end（YYYY-MM-DD，皆含當日）
+    - 分頁：page_size（預設 50，最多 100）；還有下一頁時回應帶 X-Next-Cursor 標頭，下一頁以 cursor 參數帶回
+    """
     claims = get_jwt()
     uid = int(get_jwt_identity())
-    if claims.get('role') == 'admin':
-        logs = OperationLog.query.order_by(OperationLog.created_at.desc()).all()
-    else:
-        logs = OperationLog.query.filter_by(user_id=uid).order_by(OperationLog.created_at.desc()).all()
-    return jsonify(OperationLogSchema(many=True).dump(logs))
+    try:
+        page_size = min(max(int(request.args.get('page_size', 50)), 1), 100)
+        user_id = request.args.get('user_id', type=int) if claims.get('role') == 'admin' else uid
+        date_start = request.args.get('date_start')
+        date_end = request.args.get('date_end')
+        logs, next_cursor = list_operation_log_page(
+            user_id=user_id,
+            action=request.args.get('action'),
+            target_type=request.args.get('target_type'),
+            target_id=request.args.get('target_id', type=int),
+            date_start=datetime.fromisoformat(date_start) if date_start else None,
+            date_end=datetime.fromisoformat(date_end) + timedelta(days=1) if date_end else None,
+            limit=page_size,
+            cursor=request.args.get('cursor'),
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
+    response = jsonify(logs)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
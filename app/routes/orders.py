@@ -3,17 +3,40 @@ from app import db
 from app.models import Order, OrderItem, OrderHistory, Product
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from sqlalchemy import or_, and_, func
-from sqlalchemy.orm import joinedload  # 重要，為了一起查出 user
+from sqlalchemy.orm import joinedload, selectinload  # 關聯預設 raise_on_sql，序列化需要的關聯在查詢時明確載入
 from datetime import datetime
-import random
 from app.services.notification_service import log_operation, create_notification
+from app.services.event_broker import publish_event
+from app.services.order_service import place_order, load_products, bulk_transition, reserve_error
+from app.services.stock_service import reserve_stock, release_stock
+from app.services.rollup_service import order_snapshot, record_order_change
+from app.services.search_service import apply_order_keyword
+from app.utils.order_sn import allocate_order_sn
+from app.utils.pagination import keyset_page
+from app.utils.query_metrics import query_budget
 
 bp_orders = Blueprint('orders', __name__, url_prefix='/orders')
 
+# cursor 分頁可用的排序欄位與其 cursor 值型別
+KEYSET_SORT_TYPES = {'created_at': datetime, 'total_amount': float}
+
+# 各端點需要的關聯載入選項（Order 的關聯預設 raise_on_sql，不會被隱性查詢）
+WITH_ITEMS = (selectinload(Order.items),)
+WITH_DETAIL = (selectinload(Order.items), selectinload(Order.histories))
+
+def _reload_detail(order):
+    """commit 後重新載入訂單與明細、歷史，供回應序列化"""
+    return Order.query.options(*WITH_DETAIL).populate_existing().filter_by(id=order.id).one()
+
 @bp_orders.route('', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def list_orders():
-    """取得訂單列表，支援分頁、篩選、關鍵字、狀態、排序，並帶出 user"""
+    """取得訂單列表，支援分頁、篩選、關鍵字、狀態、排序，並帶出 user
+    分頁兩種模式：
+    - page / page_size（OFFSET 分頁，回傳 total）
+    - cursor / page_size（keyset 分頁，回傳 next_cursor；with_total=true 時才計算 total）
+    """
     claims = get_jwt()
     uid = int(get_jwt_identity())
     page = int(request.args.get('page', 1))
@@ -25,7 +48,7 @@ def list_orders():
     sort_by = request.args.get('sort_by', 'created_at')
     sort_order = request.args.get('sort_order', 'desc')
 
-    q = Order.query.options(joinedload(Order.user))  # 關鍵，避免 N+1 查詢
+    q = Order.query.options(joinedload(Order.user), *WITH_ITEMS)  # 使用者以 JOIN、明細以一次 IN 查詢帶出，避免 N+1
 
     if claims.get('role') != 'admin':
         q = q.filter_by(user_id=uid)
@@ -36,7 +59,27 @@ def list_orders():
     if date_end:
         q = q.filter(Order.created_at <= date_end)
     if keyword:
-        q = q.filter(or_(Order.order_sn.like(f"%{keyword}%"), Order.remark.like(f"%{keyword}%"), Order.receiver_name.like(f"%{keyword}%")))
+        q = apply_order_keyword(q, keyword)  # n-gram 索引縮小範圍後再以 LIKE 精確比對
+
+    # 游標模式：帶 cursor 參數（第一頁給空字串）時改用 keyset 分頁，預設不計算 total
+    if 'cursor' in request.args:
+        if sort_by not in KEYSET_SORT_TYPES:
+            abort(400, description="cursor 分頁只支援 sort_by=created_at 或 total_amount")
+        result = {}
+        if request.args.get('with_total') in ('1', 'true'):
+            result["total"] = q.count()
+        try:
+            orders, next_cursor = keyset_page(
+                q, getattr(Order, sort_by), Order.id, min(page_size, 100),
+                cursor=request.args.get('cursor'),
+                desc=sort_order == 'desc',
+                sort_type=KEYSET_SORT_TYPES[sort_by]
+            )
+        except ValueError as e:
+            abort(400, description=str(e))
+        result["data"] = [o.to_dict(include_items=True, include_user=True) for o in orders]
+        result["next_cursor"] = next_cursor
+        return jsonify(result)
 
     if sort_by in ['created_at', 'total_amount', 'status']:
         sort_col = getattr(Order, sort_by)
@@ -52,10 +95,11 @@ def list_orders():
 
 @bp_orders.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def get_order(order_id):
     claims = get_jwt()
     uid = int(get_jwt_identity())
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(joinedload(Order.user), *WITH_DETAIL).get_or_404(order_id)
     if claims.get('role') != 'admin' and order.user_id != uid:
         return jsonify({'msg': 'Permission denied'}), 403
     # 修改：include_user=True
@@ -64,6 +108,7 @@ def get_order(order_id):
 # 以 order_sn 查訂單
 @bp_orders.route('/sn/<string:order_sn>', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def get_order_by_sn(order_sn):
     """
     以 order_sn（訂單編號）取得訂單
@@ -71,7 +116,7 @@ def get_order_by_sn(order_sn):
     """
     claims = get_jwt()
     uid = int(get_jwt_identity())
-    order = Order.query.filter_by(order_sn=order_sn).first_or_404()
+    order = Order.query.options(*WITH_DETAIL).filter_by(order_sn=order_sn).first_or_404()
     if claims.get('role') != 'admin' and order.user_id != uid:
         abort(403, description="Permission denied")
     return jsonify(order.to_dict(include_items=True, include_history=True)), 200
@@ -90,44 +135,54 @@ def get_order_history(order_id):
 
 @bp_orders.route('/status', methods=['PUT'])
 @jwt_required()
+@query_budget(9)
 def batch_update_status():
+    """批次更新訂單狀態，一次載入、一次提交，回傳每筆訂單的處理結果"""
     data = request.get_json() or {}
     ids = data.get('order_ids', data.get('ids', []))  # 支援兩種參數名稱
     status = data.get('status')
     remark = data.get('remark')
+    if not status:
+        abort(400, description="缺少 status 參數")
+    if not isinstance(ids, list):
+        abort(400, description="order_ids 必須是陣列")
     claims = get_jwt()
     uid = int(get_jwt_identity())
-    updated_count = 0
-    
-    for oid in ids:
-        order = Order.query.get(oid)
-        if not order:
-            continue
-        if claims.get('role') != 'admin' and order.user_id != uid:
-            continue
-        
-        # 如果是取消訂單，恢復庫存
-        if status == 'cancelled' and order.status != 'cancelled':
-            for item in order.items:
-                product = Product.query.get(item.product_id)
-                if product:
-                    product.change_stock(item.qty)
-        
-        order.status = status
-        h = OrderHistory(order_id=order.id, status=status, operator=str(uid), operated_at=datetime.now(), remark=remark)
-        db.session.add(h)
-        # 狀態異動通知（站內）
-        create_notification(order.user_id, 'order_status', f'訂單狀態更新', f'您的訂單 {order.order_sn} 狀態已變更為 {order.status}')
-        updated_count += 1
-        
+
+    results = bulk_transition(ids, status, uid, remark=remark, is_admin=claims.get('role') == 'admin')
     db.session.commit()
     return jsonify({
         'msg': '狀態更新成功',
-        'updated_count': updated_count
+        'updated_count': sum(1 for r in results if r['ok']),
+        'results': results
     })
 
+def _parse_lines(items):
+    """驗證商品項目格式，回傳 [{'product_id': int, 'qty': int}, ...]；格式錯誤時回應 400"""
+    lines = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            abort(400, description=f"items[{i}] 必須是物件")
+
+        if 'product_id' not in item:
+            abort(400, description=f"items[{i}] 缺少 product_id")
+        if 'qty' not in item:
+            abort(400, description=f"items[{i}] 缺少 qty")
+
+        try:
+            product_id = int(item['product_id'])
+            qty = int(item['qty'])
+        except (ValueError, TypeError):
+            abort(400, description=f"items[{i}] product_id 和 qty 必須是數字")
+
+        if qty <= 0:
+            abort(400, description=f"items[{i}] qty 必須大於 0")
+        lines.append({'product_id': product_id, 'qty': qty})
+    return lines
+
 @bp_orders.route('', methods=['POST'])
 @jwt_required()
+@query_budget(14)
 def create_order():
     """
     建立新訂單 (Create a new order)
@@ -136,15 +191,8 @@ def create_order():
     current_app.logger.info(f"收到建立訂單請求: {data}")
     user_id = int(get_jwt_identity())
     current_app.logger.info(f"用戶 ID: {user_id}")
-    # 自動產生唯一訂單編號 - 避免競態條件
-    max_attempts = 10
-    for attempt in range(max_attempts):
-        order_sn = f"OMS{datetime.now().strftime('%Y%m%d%H%M%S')}{random.randint(1000,9999)}"
-        existing_order = Order.query.filter_by(order_sn=order_sn).first()
-        if not existing_order:
-            break
-        if attempt == max_attempts - 1:
-            abort(500, description="無法生成唯一訂單編號，請稍後重試")
+    # 自動產生唯一訂單編號（時間 + 節點 + PID + 序號，不需查資料庫確認重複）
+    order_sn = allocate_order_sn()
     receiver_name = data.get('receiver_name')
     receiver_phone = data.get('receiver_phone')
     shipping_address = data.get('shipping_address')
@@ -167,75 +215,38 @@ def create_order():
     if not isinstance(items, list):
         abort(400, description="items 必須是陣列")
     
-    # 計算金額
-    total_amount = 0
-    for i, item in enumerate(items):
-        if not isinstance(item, dict):
-            abort(400, description=f"items[{i}] 必須是物件")
-        
-        if 'product_id' not in item:
-            abort(400, description=f"items[{i}] 缺少 product_id")
-        if 'qty' not in item:
-            abort(400, description=f"items[{i}] 缺少 qty")
-        
-        try:
-            product_id = int(item['product_id'])
-            qty = int(item['qty'])
-        except (ValueError, TypeError):
-            abort(400, description=f"items[{i}] product_id 和 qty 必須是數字")
-        
-        if qty <= 0:
-            abort(400, description=f"items[{i}] qty 必須大於 0")
-        
-        product = Product.query.get(product_id)
-        if not product:
-            abort(400, description=f"找不到商品 ID: {product_id}")
-        
-        item['product_name'] = product.name
-        item['price'] = product.price
-        total_amount += product.price * qty
-    order = Order(
-        user_id=user_id,
-        order_sn=order_sn,
-        total_amount=total_amount,
-        status='pending',
-        shipping_fee=0,
-        payment_status='unpaid',
-        remark=remark,
-        receiver_name=receiver_name,
-        receiver_phone=receiver_phone,
-        shipping_address=shipping_address
-    )
-    db.session.add(order)
-    db.session.flush()
-    for item in items:
-        db.session.add(OrderItem(order_id=order.id, product_id=item['product_id'], product_name=item['product_name'], qty=item['qty'], price=item['price']))
-    # 狀態歷史
-    db.session.add(OrderHistory(order_id=order.id, status='pending', operator=str(user_id), operated_at=datetime.now(), remark='訂單建立'))
-    # 扣減商品庫存
+    # 驗證商品項目格式，商品是否存在與庫存交給 place_order 一次批次處理
+    lines = _parse_lines(items)
+
     try:
-        for item in items:
-            product = Product.query.get(item['product_id'])
-            if not product:
-                abort(400, description=f"找不到商品 {item['product_id']}")
-            if product.stock < item['qty']:
-                abort(400, description=f"商品 {product.name} 庫存不足，現有庫存: {product.stock}")
-            product.change_stock(-item['qty'])
+        order = place_order(
+            user_id=user_id,
+            order_sn=order_sn,
+            lines=lines,
+            receiver_name=receiver_name,
+            receiver_phone=receiver_phone,
+            shipping_address=shipping_address,
+            remark=remark
+        )
     except ValueError as e:
         db.session.rollback()
         abort(400, description=str(e))
     db.session.commit()
+    order = _reload_detail(order)
     return jsonify(order.to_dict(include_items=True, include_history=True)), 201
 
 @bp_orders.route('/<int:order_id>', methods=['PUT'])
 @jwt_required()
+@query_budget(15)
 def update_order(order_id):
     claims = get_jwt()
     uid = int(get_jwt_identity())
-    o = Order.query.get_or_404(order_id)
+    o = Order.query.options(*WITH_ITEMS).get_or_404(order_id)
     if claims.get("role") != "admin" and o.user_id != uid:
         abort(404, description="找不到或無權限修改此訂單")
     data = request.get_json() or {}
+    rollup_before = order_snapshot(o)
+    new_items = None
     
     # 狀態更新只有管理員可以執行
     if 'status' in data:
@@ -244,10 +255,7 @@ def update_order(order_id):
         
         # 如果是取消訂單，恢復庫存
         if data['status'] == 'cancelled' and o.status != 'cancelled':
-            for item in o.items:
-                product = Product.query.get(item.product_id)
-                if product:
-                    product.change_stock(item.qty)
+            release_stock((item.product_id, item.qty) for item in o.items)
         
         o.status = data['status']
         # 記錄狀態變更歷史
@@ -261,6 +269,7 @@ def update_order(order_id):
         db.session.add(h)
         # 狀態異動通知
         create_notification(o.user_id, 'order_status', '訂單狀態更新', f'您的訂單 {o.order_sn} 狀態已變更為 {o.status}')
+        publish_event(o.user_id, 'order_status', {'order_id': o.id, 'order_sn': o.order_sn, 'status': o.status})
     
     if 'receiver_name' in data:
         o.receiver_name = data['receiver_name']
@@ -273,16 +282,36 @@ def update_order(order_id):
     
     # 商品明細可編輯（僅未結單）
     if o.status == 'pending' and 'items' in data:
+        if not isinstance(data['items'], list):
+            abort(400, description="items 必須是陣列")
+        lines = _parse_lines(data['items'])  # 先驗證數量，才不會以負數調整庫存
+        products = load_products({line['product_id'] for line in lines})
+        # 以新舊明細的數量差調整庫存：增加的部分條件式扣減，減少的部分回補
+        diff = {}
+        for item in o.items:
+            diff[item.product_id] = diff.get(item.product_id, 0) - item.qty
         OrderItem.query.filter_by(order_id=o.id).delete()
+        new_items = []
         total_amount = 0
-        for item in data['items']:
-            product = Product.query.get(item['product_id'])
+        for line in lines:
+            product = products.get(line['product_id'])
             if not product:
-                abort(400, description=f"找不到商品 {item['product_id']}")
-            db.session.add(OrderItem(order_id=o.id, product_id=product.id, product_name=product.name, qty=item['qty'], price=product.price))
-            total_amount += product.price * item['qty']
+                abort(400, description=f"找不到商品 {line['product_id']}")
+            diff[product.id] = diff.get(product.id, 0) + line['qty']
+            db.session.add(OrderItem(order_id=o.id, product_id=product.id, product_name=product.name, qty=line['qty'], price=product.price))
+            new_items.append((product.id, line['qty'], product.price))
+            total_amount += product.price * line['qty']
+        # 新明細的商品都以讀到的單價檢查（數量未增加的也檢查），避免以下架或改價前的價格重新計價
+        failed = reserve_stock({pid: qty for pid, qty in diff.items() if qty > 0},
+                               prices={pid: price for pid, _, price in new_items})
+        if failed:
+            db.session.rollback()
+            abort(400, description=reserve_error(products[failed[0]['product_id']], failed[0]))
+        release_stock({pid: -qty for pid, qty in diff.items() if qty < 0})
         o.total_amount = total_amount
+    record_order_change(rollup_before, order_snapshot(o, new_items))
     db.session.commit()
+    o = _reload_detail(o)
     return jsonify(o.to_dict(include_items=True, include_history=True)), 200
 
 @bp_orders.route('/<int:order_id>', methods=['DELETE'])
@@ -296,7 +325,7 @@ def delete_order(order_id):
         uid = int(get_jwt_identity())
         
         # 查詢訂單
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.options(*WITH_ITEMS).get_or_404(order_id)
         
         # 權限檢查
         if claims.get("role") != "admin" and order.user_id != uid:
@@ -309,11 +338,8 @@ def delete_order(order_id):
         current_app.logger.info(f"開始刪除訂單 {order_id}")
         
         # 手動刪除關聯資料（如果 cascade 設定有問題）
+        # 訂單項目已隨訂單載入（恢復庫存需要），由 db.session.delete(order) 的 cascade 一併刪除
         try:
-            # 刪除訂單項目
-            OrderItem.query.filter_by(order_id=order_id).delete()
-            current_app.logger.info(f"已刪除訂單 {order_id} 的訂單項目")
-            
             # 刪除訂單歷史
             from app.models.order import OrderHistory
             OrderHistory.query.filter_by(order_id=order_id).delete()
@@ -325,11 +351,8 @@ def delete_order(order_id):
         # 恢復庫存（如果訂單已扣庫存）
         if order.status == 'pending':
             try:
-                for item in order.items:
-                    product = Product.query.get(item.product_id)
-                    if product:
-                        product.change_stock(item.qty)  # 恢復庫存
-                        current_app.logger.info(f"恢復商品 {product.id} 庫存 {item.qty}")
+                release_stock((item.product_id, item.qty) for item in order.items)  # 恢復庫存
+                current_app.logger.info(f"恢復訂單 {order_id} 的商品庫存")
             except Exception as e:
                 current_app.logger.error(f"恢復庫存時發生錯誤: {str(e)}")
         
@@ -340,7 +363,8 @@ def delete_order(order_id):
         except Exception as e:
             current_app.logger.error(f"記錄操作日誌失敗: {str(e)}")
         
-        # 刪除主訂單
+        # 刪除主訂單，並從銷售彙總扣除
+        record_order_change(order_snapshot(order), None)
         db.session.delete(order)
         db.session.commit()
         
@@ -3,17 +3,19 @@ from flask import Blueprint, jsonify, abort, request, current_app, redirect
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app import db
 from app.models import Order, Payment
-from app.services.notification_service import create_notification
-from app.utils.check_mac_value import verify_check_mac_value
-import hashlib
-import urllib.parse
-from datetime import datetime
+from sqlalchemy.orm import selectinload
+from app.services.rollup_service import order_snapshot, record_order_change
+from app.services.payment_service import apply_gateway_payment, list_payment_page
+from app.utils.check_mac_value import get_signer, verify_check_mac_value
+from datetime import datetime, timedelta
 from urllib.parse import quote
+from app.utils.query_metrics import query_budget
 
 bp_payments = Blueprint('payments', __name__, url_prefix='/payments')
 
 @bp_payments.route('/<int:order_id>', methods=['POST'])
 @jwt_required()
+@query_budget(7)
 def pay_order(order_id):
     """
     付款訂單
@@ -45,7 +47,7 @@ def pay_order(order_id):
     """
     claims = get_jwt()
     uid = int(get_jwt_identity())
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(selectinload(Order.items)).get_or_404(order_id)  # 明細供銷售彙總使用
 
     # 只允許 admin 或本人付款
     if claims.get('role') != 'admin' and order.user_id != uid:
@@ -63,8 +65,10 @@ def pay_order(order_id):
         payment_method='mock',
         paid_at=datetime.now()
     )
+    rollup_before = order_snapshot(order)
     order.status = 'paid'
     order.payment_status = 'paid'
+    record_order_change(rollup_before, order_snapshot(order))
     db.session.add(payment)
     db.session.commit()
 
@@ -98,8 +102,6 @@ def ecpay_pay_order(order_id):
         abort(400, "訂單已付款或已取消")
 
     merchant_id = current_app.config.get('ECPAY_MERCHANT_ID')
-    hash_key    = current_app.config.get('ECPAY_HASH_KEY')
-    hash_iv     = current_app.config.get('ECPAY_HASH_IV')
     base_url    = 'https://payment-stage.ecpay.com.tw/Cashier/AioCheckOut/V5'
     notify_url  = current_app.config.get('ECPAY_NOTIFY_URL')
     return_url  = current_app.config.get('ECPAY_RETURN_URL')
@@ -125,26 +127,8 @@ def ecpay_pay_order(order_id):
         'EncryptType':       1,
     }
 
-    def gen_mac(params: dict):
-      # 1. 按 key 字典序排序後拼成字串
-      ordered = sorted(params.items())
-      raw = "&".join(f"{k}={v}" for k, v in ordered)
-      raw = f"HashKey={hash_key}&{raw}&HashIV={hash_iv}"
-
-      # 2. URL encode 全串，用 quote_plus (空格會變 '+')，並轉小寫
-      urlenc = urllib.parse.quote_plus(raw).lower()
-
-      # 3. 還原綠界要求的保留字元
-      for enc, ch in [
-          ('%2d','-'), ('%5f','_'), ('%2e','.'), 
-          ('%21','!'), ('%2a','*'), ('%28','('), ('%29',')'),
-      ]:
-          urlenc = urlenc.replace(enc, ch)
-
-      # 4. 做 SHA256，hex → 再轉大寫
-      return hashlib.sha256(urlenc.encode('utf-8')).hexdigest().upper()
-    # 5. 計算 CheckMacValue
-    raw_params['CheckMacValue'] = gen_mac(raw_params)
+    # 計算 CheckMacValue
+    raw_params['CheckMacValue'] = get_signer().sign(raw_params)
     send_params = { k: str(v) for k, v in raw_params.items() }
 
     return jsonify({
@@ -178,6 +162,7 @@ def ecpay_return():
     return redirect(redirect_to)
 
 @bp_payments.route('/ecpay/callback', methods=['POST'])
+@query_budget(10)
 def ecpay_callback():
     """
     綠界付款結果通知 (加強除錯版本)
@@ -204,51 +189,14 @@ def ecpay_callback():
             return '0|MAC驗證失敗'
 
         if rtn_code == '1':
-            current_app.logger.info(f"交易成功，查詢訂單...")
-
-            # 查詢訂單
-            order = Order.query.filter_by(trade_no=trade_no).first()
-            current_app.logger.info(f"查詢結果: {order.id if order else 'None'}")
+            # 冪等處理：重送的通知不載入訂單、不重複入帳，仍回 1|OK 讓綠界停止重送
+            result = apply_gateway_payment(trade_no, 'ecpay', remark='綠界付款完成')
+            current_app.logger.info(f"處理結果: {result}")
 
-            if not order:
+            if result == 'not_found':
                 current_app.logger.error(f"找不到訂單: {trade_no}")
                 return '0|找不到訂單'
 
-            # 更新訂單
-            order.status = 'paid'
-            order.payment_status = 'paid'
-
-            payment = Payment(
-                order_id=order.id,
-                amount=order.total_amount,
-                status='success',
-                payment_method='ecpay',
-                transaction_id=trade_no,
-                paid_at=datetime.now()
-            )
-            db.session.add(payment)
-
-            # 訂單歷史
-            from app.models.order import OrderHistory
-            db.session.add(OrderHistory(
-                order_id=order.id,
-                status='paid',
-                operator=str(order.user_id),
-                operated_at=datetime.now(),
-                remark='綠界付款完成'
-            ))
-
-            db.session.commit()
-            current_app.logger.info("訂單更新成功")
-
-            # 發送付款成功通知
-            create_notification(
-                user_id=order.user_id,
-                type='payment_success',
-                title='付款成功',
-                content=f'您的訂單 {order.order_sn} 已完成付款。'
-            )
-
             return '1|OK'
         else:
             current_app.logger.error(f"交易失敗: rtn_code={rtn_code}")
@@ -260,18 +208,40 @@ def ecpay_callback():
 
 @bp_payments.route('', methods=['GET'])
 @jwt_required()
+@query_budget(2)
 def list_payments():
+    """
+    付款列表（由新到舊），回應內容仍為付款陣列
+    - 篩選：status、payment_method、order_id、date_start / date_end（YYYY-MM-DD，皆含當日）
+    - 分頁：page_size（預設 50，最多 100）；還有下一頁時回應帶 X-Next-Cursor 標頭，
+      下一頁以 cursor 參數帶回
+    一般使用者只會看到自己訂單的付款
+    """
     claims = get_jwt()
     uid = int(get_jwt_identity())
     try:
-        if claims.get('role') == 'admin':
-            qs = Payment.query.order_by(Payment.created_at.desc())
-        else:
-            qs = Payment.query.join(Order, Payment.order_id == Order.id).filter(Order.user_id == uid).order_by(Payment.created_at.desc())
-        payments = [p.to_dict() for p in qs.all()]
-        return jsonify(payments), 200
-    except Exception as e:
-        return jsonify([]), 200  # 如果查詢失敗，返回空數組
+        page_size = min(max(int(request.args.get('page_size', 50)), 1), 100)
+        order_id = request.args.get('order_id', type=int)
+        date_start = request.args.get('date_start')
+        date_end = request.args.get('date_end')
+        date_start = datetime.fromisoformat(date_start) if date_start else None
+        date_end = datetime.fromisoformat(date_end) + timedelta(days=1) if date_end else None
+        payments, next_cursor = list_payment_page(
+            user_id=None if claims.get('role') == 'admin' else uid,
+            status=request.args.get('status'),
+            payment_method=request.args.get('payment_method'),
+            order_id=order_id,
+            date_start=date_start,
+            date_end=date_end,
+            limit=page_size,
+            cursor=request.args.get('cursor'),
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
+    response = jsonify(payments)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 @bp_payments.route('/<int:payment_id>', methods=['GET'])
 @jwt_required()
@@ -4,7 +4,9 @@ from flask import Blueprint, request, jsonify, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app import db
 from app.models.product import Product, Category
-from app.schemas.product import product_schema, products_schema
+from app.schemas.product import product_schema
+from app.services.catalog_cache import cached_listing, cached_product
+from app.services.product_service import list_product_page
 
 bp_products = Blueprint('products', __name__, url_prefix='/products')
 
@@ -12,32 +14,30 @@ bp_products = Blueprint('products', __name__, url_prefix='/products')
 @bp_products.route('', methods=['GET'])
 def list_products():
     """
-    查詢商品清單，支援條件查詢（名稱、分類、上下架）、分頁、排序
+    查詢商品清單，支援條件查詢（名稱、分類（含子分類）、上下架）、分頁、排序
+    結果依正規化後的查詢參數快取，商品或分類異動後失效
     """
-    name = request.args.get('name')
-    category_id = request.args.get('category_id')
     is_active = request.args.get('is_active')
-    page = int(request.args.get('page', 1))
-    page_size = int(request.args.get('page_size', 20))
-    q = Product.query
-    if name:
-        q = q.filter(Product.name.like(f"%{name}%"))
-    if category_id:
-        q = q.filter(Product.category_id == int(category_id))
-    if is_active is not None:
-        q = q.filter(Product.is_active == (is_active == 'true'))
-    total = q.count()
-    products = q.order_by(Product.created_at.desc()).offset((page-1)*page_size).limit(page_size).all()
-    return jsonify({
-        "data": products_schema.dump(products),
-        "total": total
-    })
+    params = {
+        'name': request.args.get('name') or None,
+        'category_id': int(request.args['category_id']) if request.args.get('category_id') else None,
+        'is_active': (is_active == 'true') if is_active is not None else None,
+        'page': int(request.args.get('page', 1)),
+        'page_size': int(request.args.get('page_size', 20)),
+    }
+    return jsonify(cached_listing('list', params, lambda: list_product_page(**params)))
 
 @bp_products.route('/<int:pid>', methods=['GET'])
 def get_product(pid):
-    """取得單一商品"""
-    p = Product.query.get_or_404(pid)
-    return jsonify(product_schema.dump(p))
+    """取得單一商品（read-through 快取）"""
+    def load():
+        p = db.session.get(Product, pid)
+        return product_schema.dump(p) if p else None
+
+    data = cached_product(pid, load)
+    if data is None:
+        abort(404)
+    return jsonify(data)
 
 @bp_products.route('', methods=['POST'])
 @jwt_required()
@@ -141,7 +141,11 @@ def batch_active():
 @bp_products.route('/<int:pid>/stock', methods=['PUT'])
 @jwt_required()
 def change_stock(pid):
-    """庫存異動（進貨/銷售）"""
+    """
+    庫存異動（進貨/銷售）
+    body: {"delta": 整數異動量}；舊版前端送出的 stock_change 視為 delta 的別名（兩者都有時以 delta 為準）
+    delta 不是整數或扣減後庫存不足時回傳 400
+    """
     # 權限檢查：只有 admin 和 seller 可以異動庫存
     current_user_claims = get_jwt()
     current_user_role = current_user_claims.get('role', 'customer')
@@ -150,10 +154,18 @@ def change_stock(pid):
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以異動庫存'}), 403
     p = Product.query.get_or_404(pid)
     data = request.get_json() or {}
-    delta = data.get('delta')
+    delta = data.get('delta', data.get('stock_change'))  # stock_change 為舊參數名稱
     if delta is None:
         abort(400, description="缺少 delta 參數")
-    p.change_stock(delta)
+    try:
+        delta = int(delta)
+    except (ValueError, TypeError):
+        abort(400, description="delta 必須是整數")
+    try:
+        p.change_stock(delta)
+    except ValueError as e:
+        db.session.rollback()
+        abort(400, description=str(e))
     db.session.commit()
     return jsonify(product_schema.dump(p))
 
@@ -161,7 +173,10 @@ def change_stock(pid):
 @jwt_required()
 def product_options():
     """商品下拉選單用（id, name, price, stock）"""
-    qs = Product.query.filter_by(is_active=True).order_by(Product.created_at)
-    return jsonify([
-        {"id": p.id, "name": p.name, "price": p.price, "stock": p.stock} for p in qs
-    ])
+    def load():
+        qs = Product.query.filter_by(is_active=True).order_by(Product.created_at)
+        return [
+            {"id": p.id, "name": p.name, "price": p.price, "stock": p.stock} for p in qs
+        ]
+
+    return jsonify(cached_listing('options', {}, load))
@@ -1,13 +1,30 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt
 from app.services.report_service import *
-from app.models.customer import Customer
-from app.models.order import Order
-from app.models.product import Product
 from app import db
 
 bp_reports = Blueprint('reports', __name__, url_prefix='/api/reports')
 
+def _stream_csv(chunks, filename):
+    """以串流回應輸出 CSV；?gzip=1 時改輸出 .csv.gz"""
+    headers = {'Content-Disposition': f'attachment;filename={filename}'}
+    if request.args.get('gzip', '').lower() in ('1', 'true', 'yes'):
+        headers['Content-Disposition'] += '.gz'
+        return Response(stream_with_context(iter_gzip(chunks)), mimetype='application/gzip', headers=headers)
+    return Response(stream_with_context(chunks), mimetype='text/csv', headers=headers)
+
+def _date_range():
+    start = request.args.get('date_start') or request.args.get('start')
+    end = request.args.get('date_end') or request.args.get('end')
+    return start, end
+
+def _ranking(start, end):
+    """商品排行；limit 不是正整數或日期格式錯誤時拋出 ValueError"""
+    limit = request.args.get('limit', '10')
+    if not limit.isdigit() or int(limit) < 1:
+        raise ValueError('limit 必須為正整數')
+    return product_sales_ranking(start, end, int(limit))
+
 @bp_reports.route('/sales', methods=['GET'])
 @jwt_required()
 def sales():
@@ -19,9 +36,11 @@ def sales():
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以查看報表'}), 403
     
     period = request.args.get('period', 'day')
-    start = request.args.get('date_start') or request.args.get('start')
-    end = request.args.get('date_end') or request.args.get('end')
-    data = sales_summary(period, start, end)
+    start, end = _date_range()
+    try:
+        data = sales_summary(period, start, end)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
     return jsonify(data)
 
 @bp_reports.route('/product-ranking', methods=['GET'])
@@ -34,10 +53,11 @@ def product_ranking():
     if current_user_role not in ['admin', 'seller']:
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以查看報表'}), 403
     
-    start = request.args.get('date_start') or request.args.get('start')
-    end = request.args.get('date_end') or request.args.get('end')
-    limit = int(request.args.get('limit', 10))
-    data = product_sales_ranking(start, end, limit)
+    start, end = _date_range()
+    try:
+        data = _ranking(start, end)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
     return jsonify(data)
 
 @bp_reports.route('/customer-summary', methods=['GET'])
@@ -63,9 +83,7 @@ def export_customers():
     if current_user_role not in ['admin', 'seller']:
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以匯出報表'}), 403
     
-    customers = Customer.query.all()
-    csv_data = export_customers_csv(customers)
-    return Response(csv_data, mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=customers.csv'})
+    return _stream_csv(stream_customers_csv(), 'customers.csv')
 
 @bp_reports.route('/export/orders', methods=['GET'])
 @jwt_required()
@@ -77,9 +95,7 @@ def export_orders():
     if current_user_role not in ['admin', 'seller']:
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以匯出報表'}), 403
     
-    orders = Order.query.all()
-    csv_data = export_orders_csv(orders)
-    return Response(csv_data, mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=orders.csv'})
+    return _stream_csv(stream_orders_csv(), 'orders.csv')
 
 @bp_reports.route('/export/products', methods=['GET'])
 @jwt_required()
@@ -91,9 +107,7 @@ def export_products():
     if current_user_role not in ['admin', 'seller']:
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以匯出報表'}), 403
     
-    products = Product.query.all()
-    csv_data = export_products_csv(products)
-    return Response(csv_data, mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=products.csv'})
+    return _stream_csv(stream_products_csv(), 'products.csv')
 
 @bp_reports.route('/export/order_stats', methods=['GET'])
 @jwt_required()
@@ -106,9 +120,11 @@ def export_order_stats():
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以匯出報表'}), 403
     
     period = request.args.get('period', 'day')
-    start = request.args.get('date_start') or request.args.get('start')
-    end = request.args.get('date_end') or request.args.get('end')
-    data = sales_summary(period, start, end)
+    start, end = _date_range()
+    try:
+        data = sales_summary(period, start, end)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
     csv_data = export_order_stats_csv(data)
     return Response(csv_data, mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=order_stats.csv'})
 
@@ -122,9 +138,10 @@ def export_product_rank():
     if current_user_role not in ['admin', 'seller']:
         return jsonify({'code': 403, 'message': '權限不足，只有管理員和銷售員可以匯出報表'}), 403
     
-    start = request.args.get('date_start') or request.args.get('start')
-    end = request.args.get('date_end') or request.args.get('end')
-    limit = int(request.args.get('limit', 10))
-    data = product_sales_ranking(start, end, limit)
+    start, end = _date_range()
+    try:
+        data = _ranking(start, end)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
     csv_data = export_product_rank_csv(data)
     return Response(csv_data, mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=product_rank.csv'})
@@ -5,6 +5,7 @@ from app import db
 from app.models import User
 from app.schemas import user_schema
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.utils.query_metrics import query_budget
 
 bp_users = Blueprint('users', __name__, url_prefix='/users')
 
@@ -68,6 +69,7 @@ def create_user():
 # ─────────────  Read all  ─────────────
 @bp_users.route('', methods=['GET'])
 @jwt_required()
+@query_budget(1)
 def list_users():
     """
     取得使用者列表 (List users)
@@ -4,7 +4,17 @@ from .auth_service import *
 from .user_service import *
 from .product_service import *
 from .order_service import *
+from .stock_service import *
 from .payment_service import *
 from .customer_service import *
 from .report_service import *
 from .notification_service import *
+from .write_buffer import *
+from .rollup_service import *
+from .search_service import *
+from .catalog_cache import *
+from .category_service import *
+from .reconciliation_service import *
+from .event_broker import *
+from .operation_log_service import *
+from .dashboard_service import *
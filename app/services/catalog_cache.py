@@ -0,0 +1,203 @@
+"""
+商品目錄的 read-through 快取
+
+- 單一商品：catalog:c{分類版本}:product:{id}
+- 列表 / 下拉選單：catalog:c{分類版本}:v{目錄版本}:{種類}:{正規化後的查詢參數}
+
+商品異動只刪除該商品的 key 並遞增目錄版本（所有列表 key 隨之失效，舊資料由 LRU / TTL 自然淘汰）；
+分類異動遞增分類版本（商品內嵌分類資料，需全部失效）。
+ORM 對 Product / Category 的新增、修改、刪除由 after_flush 自動記錄，
+stock_service 的 Core UPDATE 則呼叫 mark_products_changed；實際失效在 commit 之後執行，rollback 時捨棄。
+
+後端預設為程序內的 LocalCache；設定 CATALOG_CACHE_URL 時改用 Redis（需安裝 redis 套件），
+或以 CATALOG_CACHE_BACKEND（"module:factory"）指定任何相容 Redis 指令子集的實作。
+"""
+import json
+import threading
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+from app.models.product import Product, Category
+from app.utils.cache import LocalCache
+
+PREFIX = 'catalog:'
+LIST_VERSION_KEY = PREFIX + 'version:list'
+CATEGORY_VERSION_KEY = PREFIX + 'version:category'
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def add(self, hits=0, misses=0, invalidations=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.invalidations += invalidations
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else None,
+                'invalidations': self.invalidations,
+            }
+
+
+cache_stats = CacheStats()
+
+
+def init_catalog_cache(app):
+    """在 create_app 建立快取後端，放在 app.extensions 供各請求共用"""
+    factory = app.config.get('CATALOG_CACHE_BACKEND')
+    url = app.config.get('CATALOG_CACHE_URL')
+    if factory:
+        if isinstance(factory, str):
+            factory = import_string(factory)
+        backend = factory(app)
+    elif url:
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CATALOG_CACHE_URL 需要安裝 redis 套件（pip install redis）")
+        backend = redis.Redis.from_url(url)
+    else:
+        backend = LocalCache(maxsize=app.config.get('CATALOG_CACHE_MAXSIZE', 1024))
+    app.extensions['catalog_cache'] = backend
+    return backend
+
+
+def _backend():
+    if not has_app_context():
+        return None
+    if not current_app.config.get('CATALOG_CACHE_ENABLED', True):
+        return None
+    return current_app.extensions.get('catalog_cache')
+
+
+def _ttl():
+    return current_app.config.get('CATALOG_CACHE_TTL', 60)
+
+
+def _versions(backend):
+    list_version, category_version = backend.mget([LIST_VERSION_KEY, CATEGORY_VERSION_KEY])
+    return int(list_version or 0), int(category_version or 0)
+
+
+def _product_key(category_version, pid):
+    return f'{PREFIX}c{category_version}:product:{pid}'
+
+
+def cached_products(product_ids, loader):
+    """
+    依商品 id 取得序列化後的商品資料 {id: dict}
+    未命中的 id 交給 loader(missing_ids) 一次查詢（回傳 {id: dict}），結果寫回快取；找不到的商品不快取
+    """
+    backend = _backend()
+    if backend is None:
+        return loader(list(product_ids))
+    _, category_version = _versions(backend)
+    product_ids = list(dict.fromkeys(product_ids))
+    keys = [_product_key(category_version, pid) for pid in product_ids]
+    found = {}
+    missing = []
+    for pid, raw in zip(product_ids, backend.mget(keys)):
+        if raw is None:
+            missing.append(pid)
+        else:
+            found[pid] = json.loads(raw)
+    cache_stats.add(hits=len(found), misses=len(missing))
+    if missing:
+        loaded = loader(missing)
+        for pid, data in loaded.items():
+            backend.set(_product_key(category_version, pid), json.dumps(data), ex=_ttl())
+        found.update(loaded)
+    return found
+
+
+def cached_product(pid, loader):
+    """取得單一商品；loader() 回傳 dict，找不到時回傳 None"""
+    def load(missing):
+        data = loader()
+        return {pid: data} if data is not None else {}
+    return cached_products([pid], load).get(pid)
+
+
+def cached_listing(kind, params, loader):
+    """
+    取得列表類查詢結果；params 為已正規化的查詢參數 dict，loader() 回傳可 JSON 序列化的結果
+    任何商品或分類異動後都會失效
+    """
+    backend = _backend()
+    if backend is None:
+        return loader()
+    list_version, category_version = _versions(backend)
+    key = f'{PREFIX}c{category_version}:v{list_version}:{kind}:' + json.dumps(params, sort_keys=True, separators=(',', ':'))
+    raw = backend.get(key)
+    if raw is not None:
+        cache_stats.add(hits=1)
+        return json.loads(raw)
+    cache_stats.add(misses=1)
+    data = loader()
+    backend.set(key, json.dumps(data), ex=_ttl())
+    return data
+
+
+def invalidate_products(product_ids=(), categories=False):
+    """立即讓商品（以及所有列表）的快取失效；categories=True 時連同分類版本一起遞增"""
+    backend = _backend()
+    if backend is None:
+        return
+    _, category_version = _versions(backend)
+    if product_ids:
+        backend.delete(*(_product_key(category_version, pid) for pid in product_ids))
+    backend.incr(LIST_VERSION_KEY)
+    if categories:
+        backend.incr(CATEGORY_VERSION_KEY)
+    cache_stats.add(invalidations=1)
+
+
+def mark_products_changed(product_ids):
+    """記錄目前交易中異動的商品，commit 後才讓快取失效（用於不經 ORM flush 的 Core UPDATE）"""
+    from app import db
+    pending = db.session().info.setdefault('catalog_dirty', {'products': set(), 'categories': False})
+    pending['products'].update(product_ids)
+
+
+def get_catalog_cache_stats():
+    return cache_stats.snapshot()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_catalog_changes(session, flush_context):
+    products = set()
+    categories = False
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Product):
+            products.add(obj.id)
+        elif isinstance(obj, Category):
+            categories = True
+    if products or categories:
+        pending = session.info.setdefault('catalog_dirty', {'products': set(), 'categories': False})
+        pending['products'] |= products
+        pending['categories'] = pending['categories'] or categories
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    pending = session.info.pop('catalog_dirty', None)
+    if pending:
+        invalidate_products(pending['products'], categories=pending['categories'])
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_after_rollback(session, transaction):
+    # commit 時 after_commit 已處理完畢，剩下的代表最外層交易被 rollback 或 session 關閉
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop('catalog_dirty', None)
@@ -0,0 +1,180 @@
+"""
+分類樹（物化路徑）
+
+每個分類的 path 記錄從根到自己的 id，例如 '/1/4/9/'：
+- 子孫分類：path LIKE '/1/4/%'，一次索引範圍查詢，不需遞迴
+- 祖先分類：直接拆解 path
+
+path 在 after_flush 於同一個交易內維護：新增時依上層分類計算，
+搬移（parent_id 變更）時以一條 UPDATE 改寫整棵子樹的前綴，刪除時子分類依 ORM 行為升為根分類。
+整棵樹一次查詢組成巢狀結構並放入商品目錄快取，分類異動 commit 後自動失效。
+"""
+from sqlalchemy import event, select, update, func, inspect, literal
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.product import Category
+from app.schemas.product import CategorySchema
+from app.services.catalog_cache import cached_listing
+from app import db
+
+ROOT_PATH = '/'
+
+_flat_schema = CategorySchema(many=True, exclude=('children',))
+
+def child_path(parent_path, category_id):
+    return f"{parent_path or ROOT_PATH}{category_id}/"
+
+def path_ids(path):
+    """'/1/4/9/' -> [1, 4, 9]"""
+    return [int(part) for part in (path or '').strip('/').split('/') if part]
+
+def _parent_changed(state):
+    return state.attrs.parent_id.history.has_changes() or state.attrs.parent.history.has_changes()
+
+def _rewrite_prefix(conn, old_prefix, new_prefix):
+    """把 path 以 old_prefix 開頭的分類（整棵子樹）改寫為 new_prefix 開頭"""
+    conn.execute(
+        update(Category)
+        .where(Category.path.startswith(old_prefix))
+        .values(path=literal(new_prefix) + func.substr(Category.path, len(old_prefix) + 1))
+    )
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_category_paths(session, flush_context):
+    """分類新增、搬移、刪除後，在同一個交易內更新物化路徑"""
+    pending = {obj.id: obj for obj in session.new if isinstance(obj, Category)}
+    pending.update(
+        (obj.id, obj) for obj in session.dirty
+        if isinstance(obj, Category) and _parent_changed(inspect(obj))
+    )
+    deleted = [
+        inspect(obj).attrs.path.loaded_value for obj in session.deleted if isinstance(obj, Category)
+    ]
+    if not pending and not deleted:
+        return
+    conn = session.connection()
+    rewritten = {}
+
+    # 被刪除分類的子分類已由 ORM 設為 parent_id = NULL，整棵子樹升為根
+    for old_path in deleted:
+        if isinstance(old_path, str):
+            _rewrite_prefix(conn, old_path, ROOT_PATH)
+            rewritten[old_path] = ROOT_PATH
+
+    def resolve(cat):
+        # 上層分類也在這次 flush 中新增 / 搬移時先處理上層
+        parent = pending.pop(cat.parent_id, None) if cat.parent_id is not None else None
+        if parent is not None:
+            resolve(parent)
+        parent_path = None
+        if cat.parent_id is not None:
+            parent_path = conn.execute(select(Category.path).where(Category.id == cat.parent_id)).scalar()
+        old_path = conn.execute(select(Category.path).where(Category.id == cat.id)).scalar()
+        new_path = child_path(parent_path, cat.id)
+        if old_path and old_path != new_path:
+            _rewrite_prefix(conn, old_path, new_path)
+            rewritten[old_path] = new_path
+        elif old_path != new_path:
+            conn.execute(update(Category).where(Category.id == cat.id).values(path=new_path))
+        set_committed_value(cat, 'path', new_path)
+
+    while pending:
+        _, cat = pending.popitem()
+        resolve(cat)
+
+    # session 中已載入的子孫分類同步新路徑，避免讀到舊值
+    if rewritten:
+        for obj in list(session.identity_map.values()):
+            if not isinstance(obj, Category) or obj in session.deleted:
+                continue
+            path = inspect(obj).attrs.path.loaded_value
+            for old_prefix, new_prefix in rewritten.items():
+                if isinstance(path, str) and path.startswith(old_prefix):
+                    set_committed_value(obj, 'path', new_prefix + path[len(old_prefix):])
+                    break
+
+def validate_category_parent(category, parent_id):
+    """檢查上層分類存在，且不是分類自己或其子孫（避免形成循環）"""
+    if parent_id is None:
+        return None
+    parent = db.session.get(Category, parent_id)
+    if parent is None:
+        raise ValueError("上層分類不存在")
+    if category is not None and category.id is not None and category.id in path_ids(parent.path) + [parent.id]:
+        raise ValueError("不可將分類移到自己或子分類之下")
+    return parent
+
+def rebuild_category_paths():
+    """依 parent_id 重新計算全部分類的 path（資料回填 / 修正用），回傳分類數"""
+    parents = dict(db.session.execute(select(Category.id, Category.parent_id)).all())
+    paths = {}
+
+    def path_of(cid, seen=()):
+        if cid not in paths:
+            parent_id = parents.get(cid)
+            if parent_id is None or parent_id not in parents or parent_id in seen:
+                paths[cid] = child_path(None, cid)  # 根分類，或上層已不存在 / 資料形成循環時視為根
+            else:
+                paths[cid] = child_path(path_of(parent_id, seen + (cid,)), cid)
+        return paths[cid]
+
+    for cid in parents:
+        path_of(cid)
+    if paths:
+        db.session.execute(
+            update(Category.__table__).where(Category.__table__.c.id == db.bindparam('b_id'))
+            .values(path=db.bindparam('b_path')),
+            [{'b_id': cid, 'b_path': path} for cid, path in paths.items()]
+        )
+    db.session.commit()
+    return len(paths)
+
+def _load_tree():
+    rows = db.session.execute(select(Category).order_by(Category.id)).scalars().all()
+    nodes = {}
+    for node in _flat_schema.dump(rows):
+        node['children'] = []
+        nodes[node['id']] = node
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        if node['parent_id'] is None:
+            roots.append(node)
+        elif parent is not None:
+            parent['children'].append(node)
+    return roots
+
+def category_tree():
+    """整棵分類樹（巢狀 dict，格式同 CategorySchema），一次查詢並快取"""
+    return cached_listing('categories', {}, _load_tree)
+
+def find_category(category_id, tree=None):
+    """在分類樹中找出分類，回傳 (節點, path)；不在樹中時回傳 (None, None)"""
+    stack = [(node, ROOT_PATH) for node in (tree if tree is not None else category_tree())]
+    while stack:
+        node, parent_path = stack.pop()
+        path = child_path(parent_path, node['id'])
+        if node['id'] == category_id:
+            return node, path
+        stack.extend((child, path) for child in node['children'])
+    return None, None
+
+def category_nodes(tree=None):
+    """分類樹攤平成 {id: 節點}"""
+    nodes = {}
+    stack = list(tree if tree is not None else category_tree())
+    while stack:
+        node = stack.pop()
+        nodes[node['id']] = node
+        stack.extend(node['children'])
+    return nodes
+
+def category_filter(column, category_id):
+    """
+    篩選屬於某分類（含所有子孫分類）的資料：column IN (SELECT id FROM categories WHERE path LIKE '/1/4/%')
+    分類的 path 從快取的分類樹取得，實際篩選只有一次查詢；找不到分類時退回只比對該分類 id
+    """
+    _, path = find_category(category_id)
+    if path is None:
+        return column == category_id
+    return column.in_(select(Category.id).where(Category.path.startswith(path)))
@@ -0,0 +1,60 @@
+"""
+儀表板統計的短期快取
+
+每位員工登入後的首頁都會呼叫 /dashboard/summary，統計本身是一次 UNION ALL 查詢（report_service.dashboard_summary），
+結果依角色快取 DASHBOARD_CACHE_TTL 秒（0 表示不快取），期間新增的訂單要等快取過期才會反映。
+快取後端與商品目錄快取共用（LocalCache 或 Redis）；快取過期時同一個程序內只有一個請求重新計算，
+其餘請求等它算完直接讀取結果（single-flight），避免瞬間湧入的請求同時打到資料庫。
+"""
+import json
+import threading
+from flask import current_app, has_app_context
+from app.services.catalog_cache import CacheStats
+from app.services.report_service import dashboard_summary
+
+KEY_PREFIX = 'dashboard:summary:'
+
+dashboard_stats = CacheStats()
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _backend():
+    if not has_app_context() or not current_app.config.get('DASHBOARD_CACHE_TTL'):
+        return None
+    return current_app.extensions.get('catalog_cache')
+
+
+def _lock(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _cache_key(role):
+    # 時區與是否讀彙總表會影響結果，一併放進 key
+    config = current_app.config
+    return f"{KEY_PREFIX}{role}:{config.get('REPORT_TIMEZONE', 'UTC')}:{int(bool(config.get('SALES_ROLLUP_READS')))}"
+
+
+def cached_dashboard_summary(role, loader=dashboard_summary):
+    """依角色取得儀表板統計；快取未命中時以 loader() 計算並寫回"""
+    backend = _backend()
+    if backend is None:
+        return loader()
+    key = _cache_key(role)
+    raw = backend.get(key)
+    if raw is None:
+        with _lock(key):
+            raw = backend.get(key)  # 等鎖期間可能已由其他請求算好
+            if raw is None:
+                dashboard_stats.add(misses=1)
+                data = loader()
+                backend.set(key, json.dumps(data), ex=current_app.config['DASHBOARD_CACHE_TTL'])
+                return data
+    dashboard_stats.add(hits=1)
+    return json.loads(raw)
+
+
+def get_dashboard_cache_stats():
+    return dashboard_stats.snapshot()
@@ -0,0 +1,247 @@
+"""
+即時事件推播（Server-Sent Events 的 pub/sub）
+
+訂單狀態變更、付款成功時以 publish_event 排入目前交易，commit 之後才真正發佈，rollback 時捨棄；
+事件發佈到「user:{使用者 id}」與「admin」兩個頻道，/events/stream 依登入身分訂閱。
+
+後端預設為程序內的 LocalBroker：每個訂閱者一個有上限的佇列（滿了丟掉最舊的事件），
+每個頻道保留最近 EVENT_BROKER_HISTORY 筆，斷線重連時依 Last-Event-ID 補送。
+LocalBroker 只在同一個程序內傳遞，多個 worker process 部署時需設定 EVENT_BROKER_URL 改用 Redis pub/sub
+（需安裝 redis 套件，不支援補送），或以 EVENT_BROKER_BACKEND（"module:factory"）指定其他實作；
+WEB_CONCURRENCY 大於 1 卻沒有設定時拒絕啟動，避免連到其他 worker 的客戶端默默收不到事件。
+"""
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+
+ADMIN_CHANNEL = 'admin'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class BrokerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def add(self, published=0, delivered=0, dropped=0):
+        with self._lock:
+            self.published += published
+            self.delivered += delivered
+            self.dropped += dropped
+
+    def snapshot(self):
+        with self._lock:
+            return {'published': self.published, 'delivered': self.delivered, 'dropped': self.dropped}
+
+
+class Subscription:
+    """單一連線的訂閱；get 回傳 (id, type, data) 或逾時回傳 None"""
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, record):
+        while True:
+            try:
+                self._queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()  # 連線太慢：丟掉最舊的事件，客戶端可再以 feed API 補齊
+                    self.broker.stats.add(dropped=1)
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """程序內的 pub/sub"""
+
+    def __init__(self, queue_size=100, history=100):
+        self.queue_size = queue_size
+        self.history = history
+        self.stats = BrokerStats()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = {}
+        self._recent = {}
+
+    def publish(self, channels, type, data):
+        """發佈到多個頻道（同一個事件 id，同時訂閱多個頻道的連線只會收到一次）"""
+        with self._lock:
+            record = (next(self._ids), type, data)
+            targets = set()
+            for channel in channels:
+                self._recent.setdefault(channel, deque(maxlen=self.history)).append(record)
+                targets.update(self._subscribers.get(channel, ()))
+        for subscription in targets:
+            subscription.put(record)
+        self.stats.add(published=1, delivered=len(targets))
+        return record[0]
+
+    def subscribe(self, channels, last_event_id=None):
+        """訂閱頻道；帶 last_event_id 時先補送保留中、比它新的事件"""
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+            missed = set()
+            if last_event_id is not None:
+                for channel in subscription.channels:
+                    missed.update(r for r in self._recent.get(channel, ()) if r[0] > last_event_id)
+        for record in sorted(missed):
+            subscription.put(record)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    def get(self, timeout=None):
+        message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout or 0)
+        if message is None:
+            return None
+        return tuple(json.loads(message['data']))
+
+    def close(self):
+        self._pubsub.close()
+
+
+class RedisBroker:
+    """以 Redis PUBLISH / SUBSCRIBE 跨程序傳遞；事件 id 由 INCR 產生"""
+
+    def __init__(self, client, prefix='oms:events:'):
+        self.client = client
+        self.prefix = prefix
+        self.stats = BrokerStats()
+
+    def publish(self, channels, type, data):
+        event_id = self.client.incr(self.prefix + 'id')
+        payload = json.dumps([event_id, type, data])
+        delivered = sum(self.client.publish(self.prefix + channel, payload) for channel in channels)
+        self.stats.add(published=1, delivered=delivered)
+        return event_id
+
+    def subscribe(self, channels, last_event_id=None):
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(*(self.prefix + channel for channel in channels))
+        return RedisSubscription(pubsub)
+
+
+def init_event_broker(app):
+    """在 create_app 建立事件 broker，放在 app.extensions 供各請求共用"""
+    factory = app.config.get('EVENT_BROKER_BACKEND')
+    url = app.config.get('EVENT_BROKER_URL')
+    if factory:
+        if isinstance(factory, str):
+            factory = import_string(factory)
+        broker = factory(app)
+    elif url:
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("EVENT_BROKER_URL 需要安裝 redis 套件（pip install redis）")
+        broker = RedisBroker(redis.Redis.from_url(url))
+    else:
+        workers = app.config.get('WEB_CONCURRENCY', 1)
+        if workers > 1:
+            raise RuntimeError(
+                f"WEB_CONCURRENCY={workers} 時程序內的事件 broker 無法跨 worker 傳遞，"
+                "請設定 EVENT_BROKER_URL（redis://...）或 EVENT_BROKER_BACKEND"
+            )
+        broker = LocalBroker(
+            queue_size=app.config.get('SSE_QUEUE_SIZE', 100),
+            history=app.config.get('EVENT_BROKER_HISTORY', 100),
+        )
+    app.extensions['event_broker'] = broker
+    return broker
+
+
+def get_broker():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('event_broker')
+
+
+def publish_event(user_id, type, data):
+    """排入一筆事件給 user_id（管理員頻道也會收到），目前交易 commit 後才發佈"""
+    from app import db
+    if get_broker() is None:
+        return
+    session = db.session()
+    if not session.in_transaction():
+        session.begin()  # 事件跟著交易走，rollback 時才會一併丟棄
+    session.info.setdefault('pending_events', []).append(
+        ((user_channel(user_id), ADMIN_CHANNEL), type, current_app.json.dumps(data))
+    )
+
+
+def get_broker_stats():
+    broker = get_broker()
+    if broker is None:
+        return None
+    stats = broker.stats.snapshot()
+    if isinstance(broker, LocalBroker):
+        stats['subscribers'] = broker.subscriber_count()
+    return stats
+
+
+def format_sse(record):
+    """(id, type, data) 轉成 SSE 訊息；data 為已編碼的 JSON 字串（不含換行）"""
+    event_id, type, data = record
+    return f"id: {event_id}\nevent: {type}\ndata: {data}\n\n"
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    pending = session.info.pop('pending_events', None)
+    broker = get_broker()
+    if not pending or broker is None:
+        return
+    for channels, type, data in pending:
+        try:
+            broker.publish(channels, type, data)
+        except Exception:
+            current_app.logger.exception("事件發佈失敗")  # 推播失敗不影響已 commit 的交易
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_after_rollback(session, transaction):
+    # commit 時已在 after_commit 取出；剩下的代表交易被 rollback
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop('pending_events', None)
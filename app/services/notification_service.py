@@ -1,29 +1,178 @@
-from app.models import OperationLog, Notification
+from app.models import OperationLog, Notification, NotificationState, NotificationRead
+from app.services.write_buffer import buffer_write
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.upsert import increment
 from app import db
+from collections import Counter
 from datetime import datetime
+from sqlalchemy import event, select, update, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# 通知與操作紀錄都先放進 write buffer，commit 時與主要異動一起批次寫入，不再各自 commit
+# 個人通知的未讀數（notification_states.unread_count）也在 commit 前以一次 upsert 累加；
+# 全站通知（user_id 為 null）只存一筆，已讀狀態記在 notification_reads（fan-out on read）
 
 def log_operation(user_id, username, action, target_type, target_id=None, content=None):
-    log = OperationLog(
-        user_id=user_id,
-        username=username,
-        action=action,
-        target_type=target_type,
-        target_id=target_id,
-        content=content,
-        created_at=datetime.utcnow(),
+    buffer_write(OperationLog, {
+        'user_id': user_id,
+        'username': username,
+        'action': action,
+        'target_type': target_type,
+        'target_id': target_id,
+        'content': content,
+        'created_at': datetime.utcnow(),
+    })
+
+def create_notification(user_id, type, title, content):
+    buffer_write(Notification, {
+        'user_id': user_id,
+        'type': type,
+        'title': title,
+        'content': content,
+        'is_read': False,
+        'created_at': datetime.utcnow(),
+    })
+    if user_id is not None:
+        db.session().info.setdefault('notification_unread', Counter())[user_id] += 1
+
+def create_notifications(rows):
+    """批次新增通知：rows 為 [{'user_id', 'type', 'title', 'content'}, ...]"""
+    for row in rows:
+        create_notification(row['user_id'], row['type'], row['title'], row['content'])
+
+def notification_state(user_id):
+    """回傳 (個人通知未讀數, read_all_id)；尚未有狀態列的使用者為 (0, 0)"""
+    row = db.session.execute(
+        select(NotificationState.unread_count, NotificationState.read_all_id)
+        .where(NotificationState.user_id == user_id)
+    ).first()
+    return tuple(row) if row else (0, 0)
+
+def _global_unread_count(user_id, read_all_id):
+    """全站通知中 id 大於 read_all_id 且沒有已讀紀錄的筆數（全站通知數量少，直接計算）"""
+    return db.session.scalar(
+        select(func.count(Notification.id))
+        .outerjoin(NotificationRead, and_(NotificationRead.notification_id == Notification.id,
+                                          NotificationRead.user_id == user_id))
+        .where(Notification.user_id.is_(None), Notification.id > read_all_id,
+               NotificationRead.notification_id.is_(None))
     )
-    db.session.add(log)
+
+def unread_count(user_id, state=None):
+    """個人通知（計數欄位）+ 全站通知的未讀數"""
+    personal, read_all_id = state or notification_state(user_id)
+    return personal + _global_unread_count(user_id, read_all_id)
+
+def _is_read(row, read_all_id):
+    """
+    已讀判斷與未讀數計算一致：個人通知看 is_read；全站通知只看 notification_reads，
+    舊資料共用的 is_read 不代表個別使用者已讀（與遷移回填的規則相同）；兩者都受 read_all_id 影響
+    """
+    if row.id <= read_all_id:
+        return True
+    if row.user_id is None:
+        return row.notification_id is not None
+    return bool(row.is_read)
+
+def notification_feed(user_id, since_id=None, cursor=None, limit=20):
+    """
+    使用者的通知 feed（個人 + 全站），依 id 由新到舊
+    since_id：只取比此 id 新的通知（輪詢用）；cursor：上一頁回傳的 next_cursor，取更舊的通知
+    回傳 {'data', 'unread_count', 'next_cursor'}；cursor 格式錯誤時拋出 ValueError
+    """
+    state = notification_state(user_id)
+    read_all_id = state[1]
+    q = db.session.query(
+        Notification.id, Notification.user_id, Notification.type, Notification.title,
+        Notification.content, Notification.is_read, Notification.created_at, NotificationRead.notification_id,
+    ).outerjoin(NotificationRead, and_(NotificationRead.notification_id == Notification.id,
+                                       NotificationRead.user_id == user_id)
+    ).filter(or_(Notification.user_id == user_id, Notification.user_id.is_(None)))
+    if since_id is not None:
+        q = q.filter(Notification.id > since_id)
+    if cursor:
+        before_id, = decode_cursor(cursor, int)
+        q = q.filter(Notification.id < before_id)
+    rows = q.order_by(Notification.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    data = [{
+        'id': row.id,
+        'user_id': row.user_id,
+        'type': row.type,
+        'title': row.title,
+        'content': row.content,
+        'is_read': _is_read(row, read_all_id),
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+    } for row in rows]
+    return {'data': data, 'unread_count': unread_count(user_id, state), 'next_cursor': next_cursor}
+
+def mark_notification_read(user_id, notification):
+    """標記單筆通知為已讀並同步未讀數，回傳是否由未讀變為已讀（已 commit）"""
+    if notification.id <= notification_state(user_id)[1]:
+        return False
+    if notification.user_id is None:
+        db.session.add(NotificationRead(user_id=user_id, notification_id=notification.id))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # 已經讀過
+            return False
+        return True
+    changed = db.session.execute(
+        update(Notification)
+        .where(Notification.id == notification.id, Notification.is_read.isnot(True))
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if changed:
+        db.session.execute(
+            update(NotificationState)
+            .where(NotificationState.user_id == user_id, NotificationState.unread_count > 0)
+            .values(unread_count=NotificationState.unread_count - 1)
+        )
     db.session.commit()
-    return log
+    return bool(changed)
 
-def create_notification(user_id, type, title, content):
-    notif = Notification(
-        user_id=user_id,
-        type=type,
-        title=title,
-        content=content,
-        created_at=datetime.utcnow(),
+def mark_all_read(user_id, up_to_id=None):
+    """
+    全部標為已讀：只以一條 UPDATE 把 read_all_id 推進到 up_to_id（省略時為目前最新的通知），
+    並重算之後才送達的個人未讀數，不逐筆更新通知；回傳標記後的未讀數（已 commit）
+    """
+    if up_to_id is None:
+        up_to_id = db.session.scalar(
+            select(func.max(Notification.id))
+            .where(or_(Notification.user_id == user_id, Notification.user_id.is_(None)))
+        ) or 0
+    remaining = (
+        select(func.count(Notification.id))
+        .where(Notification.user_id == user_id, Notification.is_read.isnot(True), Notification.id > up_to_id)
+        .scalar_subquery()
     )
-    db.session.add(notif)
+    updated = db.session.execute(
+        update(NotificationState)
+        .where(NotificationState.user_id == user_id, NotificationState.read_all_id < up_to_id)
+        .values(read_all_id=up_to_id, unread_count=remaining)
+    ).rowcount
+    if not updated and db.session.get(NotificationState, user_id) is None:
+        db.session.add(NotificationState(user_id=user_id, read_all_id=up_to_id, unread_count=remaining))
     db.session.commit()
-    return notif
+    return unread_count(user_id)
+
+
+@event.listens_for(Session, 'before_commit')
+def _apply_unread_counts(session):
+    pending = session.info.pop('notification_unread', None)
+    if pending:
+        increment(session, NotificationState.__table__, ('user_id',),
+                  [{'user_id': user_id, 'unread_count': n} for user_id, n in pending.items()])
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_unread_counts(session, transaction):
+    # 與 write buffer 相同：最外層交易結束時還沒套用的計數代表通知沒有寫入
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop('notification_unread', None)
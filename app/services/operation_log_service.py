@@ -0,0 +1,106 @@
+"""
+操作紀錄的查詢與封存
+
+列表依 (created_at, id) 由新到舊做 keyset 分頁，各種篩選條件都有以 (created_at, id) 結尾的索引對應，
+深頁數也不需要 OFFSET 掃描。
+操作紀錄每月新增數百萬筆，超過保留天數（OPERATION_LOG_RETENTION_DAYS）的資料由
+archive_operation_logs 分批寫入 gzip 壓縮的 JSON Lines 檔案後刪除，資料表只保留近期的熱資料。
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from app.models.operation_log import OperationLog
+from app.utils.pagination import keyset_page
+from app.utils.serialization import compile_row_serializer, isoformat
+from app import db
+from sqlalchemy import select, delete, func
+
+OPERATION_LOG_FIELDS = ('id', 'user_id', 'username', 'action', 'target_type', 'target_id', 'content', 'created_at')
+OPERATION_LOG_COLUMNS = tuple(getattr(OperationLog, name) for name in OPERATION_LOG_FIELDS)
+_serialize_log_row = compile_row_serializer([
+    (name, isoformat if name == 'created_at' else None) for name in OPERATION_LOG_FIELDS
+])
+
+
+def list_operation_log_page(user_id=None, action=None, target_type=None, target_id=None,
+                            date_start=None, date_end=None, limit=50, cursor=None):
+    """
+    操作紀錄列表，依 (created_at, id) 由新到舊
+    date_start / date_end: 時間區間，date_end 不含
+    回傳 (紀錄 dict 清單, next_cursor)；cursor 格式錯誤時拋出 ValueError
+    """
+    q = db.session.query(*OPERATION_LOG_COLUMNS)
+    if user_id is not None:
+        q = q.filter(OperationLog.user_id == user_id)
+    if action:
+        q = q.filter(OperationLog.action == action)
+    if target_type:
+        q = q.filter(OperationLog.target_type == target_type)
+    if target_id is not None:
+        q = q.filter(OperationLog.target_id == target_id)
+    if date_start is not None:
+        q = q.filter(OperationLog.created_at >= date_start)
+    if date_end is not None:
+        q = q.filter(OperationLog.created_at < date_end)
+    rows, next_cursor = keyset_page(q, OperationLog.created_at, OperationLog.id, limit, cursor=cursor)
+    return [_serialize_log_row(row) for row in rows], next_cursor
+
+
+def _json_default(value):
+    return value.isoformat()
+
+
+def archive_operation_logs(before, output_dir, batch_size=5000, dry_run=False):
+    """
+    把 created_at 早於 before 的操作紀錄封存到 output_dir/operation_logs_{執行時間}.jsonl.gz 後刪除
+    每批依 id 順序讀取 batch_size 筆，壓縮成獨立的 gzip member 附加到檔案，fsync 之後才刪除該批、commit；
+    中途失敗（包含程序中斷）時，已刪除的資料都在檔案中完整的 member 裡，gzip 可正常讀取。
+    最後一批可能已寫入檔案但尚未刪除，重新執行時會再封存一次（同一筆可能出現在兩個檔案，不會遺失）
+    回傳 {'rows': 封存筆數, 'path': 檔案路徑或 None}；dry_run 時只計算筆數
+    """
+    if dry_run:
+        count = db.session.scalar(
+            select(func.count(OperationLog.id)).where(OperationLog.created_at < before)
+        )
+        return {'rows': count, 'path': None}
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"operation_logs_{datetime.utcnow():%Y%m%d%H%M%S}.jsonl.gz")
+    total = 0
+    last_id = 0
+    archive = None
+    try:
+        while True:
+            rows = db.session.execute(
+                select(*OPERATION_LOG_COLUMNS)
+                .where(OperationLog.created_at < before, OperationLog.id > last_id)
+                .order_by(OperationLog.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            if archive is None:
+                archive = open(path, 'wb')
+            payload = ''.join(json.dumps(dict(zip(OPERATION_LOG_FIELDS, row)), ensure_ascii=False,
+                                         default=_json_default) + '\n' for row in rows)
+            archive.write(gzip.compress(payload.encode('utf-8')))  # 完整的 gzip member（含結尾）
+            archive.flush()
+            os.fsync(archive.fileno())
+            ids = [row.id for row in rows]
+            db.session.execute(delete(OperationLog).where(OperationLog.id.in_(ids)))
+            db.session.commit()
+            total += len(rows)
+            last_id = ids[-1]
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if archive is not None:
+            archive.close()
+    return {'rows': total, 'path': path if total else None}
+
+
+def retention_cutoff(days, now=None):
+    """保留天數對應的封存界線（操作紀錄的 created_at 為 UTC）"""
+    return (now or datetime.utcnow()) - timedelta(days=days)
@@ -1,5 +1,13 @@
-from app.models.order import Order
+from app.models.order import Order, OrderItem, OrderHistory
+from app.models.product import Product
+from app.services.stock_service import reserve_stock, release_stock
+from app.services.notification_service import create_notifications
+from app.services.event_broker import publish_event
+from app.services.rollup_service import order_snapshot, record_order_change, record_order_changes
 from app import db
+from sqlalchemy import insert, update
+from sqlalchemy.orm import selectinload
+from datetime import datetime
 
 def create_order(**kwargs):
     order = Order(**kwargs)
@@ -9,3 +17,139 @@ def create_order(**kwargs):
 
 def get_order_by_sn(order_sn):
     return Order.query.filter_by(order_sn=order_sn).first()
+
+def load_products(product_ids):
+    """一次 IN (...) 查詢取回所有商品，回傳 {id: Product}
+    只用來取名稱與價格，不加列鎖：呼叫端把讀到的單價傳給 reserve_stock(prices=...)，
+    條件式 UPDATE 同時檢查庫存、上架狀態與單價，讀取後才下架或改價的商品會扣減失敗"""
+    if not product_ids:
+        return {}
+    products = Product.query.filter(Product.id.in_(product_ids)).all()
+    return {p.id: p for p in products}
+
+def reserve_error(product, failure):
+    """reserve_stock 失敗明細轉成錯誤訊息"""
+    if failure.get('reason') == 'inactive':
+        return f"商品 {product.name} 已下架"
+    if failure.get('reason') == 'price_changed':
+        return f"商品 {product.name} 價格已變更，請重新確認"
+    return f"商品 {product.name} 庫存不足，現有庫存: {failure['available']}"
+
+def place_order(user_id, order_sn, lines, receiver_name, receiver_phone, shipping_address, remark=None):
+    """
+    訂單建立管線：批次載入商品 ➜ 驗證 ➜ 計價 ➜ 條件式扣庫存 ➜ 批次寫入明細與歷史
+    lines: [{'product_id': int, 'qty': int}, ...]（欄位格式已由呼叫端驗證）
+    商品不存在、庫存不足、已下架或價格已變更時拋出 ValueError，由呼叫端 rollback
+    不在此 commit，交易邊界交給呼叫端
+    """
+    products = load_products({line['product_id'] for line in lines})
+
+    total_amount = 0
+    item_rows = []
+    for line in lines:
+        product = products.get(line['product_id'])
+        if not product:
+            raise ValueError(f"找不到商品 ID: {line['product_id']}")
+        item_rows.append({
+            'product_id': product.id,
+            'product_name': product.name,
+            'qty': line['qty'],
+            'price': product.price,
+        })
+        total_amount += product.price * line['qty']
+
+    # 同一商品可能在購物車出現多行，reserve_stock 會以合計數量扣減
+    failed = reserve_stock(((line['product_id'], line['qty']) for line in lines),
+                           prices={pid: p.price for pid, p in products.items()})
+    if failed:
+        raise ValueError(reserve_error(products[failed[0]['product_id']], failed[0]))
+
+    order = Order(
+        user_id=user_id,
+        order_sn=order_sn,
+        total_amount=total_amount,
+        status='pending',
+        shipping_fee=0,
+        payment_status='unpaid',
+        remark=remark,
+        receiver_name=receiver_name,
+        receiver_phone=receiver_phone,
+        shipping_address=shipping_address
+    )
+    db.session.add(order)
+    db.session.flush()  # 取得 order.id
+
+    for row in item_rows:
+        row['order_id'] = order.id
+    db.session.execute(insert(OrderItem), item_rows)
+    db.session.execute(insert(OrderHistory), [{
+        'order_id': order.id,
+        'status': 'pending',
+        'operator': str(user_id),
+        'operated_at': datetime.now(),
+        'remark': '訂單建立',
+    }])
+    record_order_change(None, order_snapshot(order, [(r['product_id'], r['qty'], r['price']) for r in item_rows]))
+    return order
+
+def bulk_transition(order_ids, status, operator_id, remark=None, is_admin=False):
+    """
+    批次變更訂單狀態：
+    一次載入所有訂單與明細 ➜ 取消的訂單依商品合計回補庫存 ➜ 一條 UPDATE 改狀態
+    ➜ 歷史、通知與銷售彙總批次寫入；不在此 commit，由呼叫端一次提交
+    回傳每筆訂單的結果 [{'order_id': 1, 'ok': True}, {'order_id': 2, 'ok': False, 'reason': '找不到訂單'}, ...]
+    """
+    results = []
+    wanted = []
+    for oid in order_ids:
+        try:
+            oid = int(oid)
+        except (ValueError, TypeError):
+            results.append({'order_id': oid, 'ok': False, 'reason': '訂單 ID 格式錯誤'})
+            continue
+        if oid not in wanted:
+            wanted.append(oid)
+
+    orders = {}
+    if wanted:
+        orders = {
+            o.id: o for o in
+            Order.query.options(selectinload(Order.items)).filter(Order.id.in_(wanted)).all()
+        }
+
+    now = datetime.now()
+    restock = []
+    updated_ids = []
+    history_rows = []
+    notification_rows = []
+    rollup_changes = []
+    for oid in wanted:
+        order = orders.get(oid)
+        if not order:
+            results.append({'order_id': oid, 'ok': False, 'reason': '找不到訂單'})
+            continue
+        if not is_admin and order.user_id != operator_id:
+            results.append({'order_id': oid, 'ok': False, 'reason': '無權限'})
+            continue
+        # 如果是取消訂單，恢復庫存
+        if status == 'cancelled' and order.status != 'cancelled':
+            restock.extend((item.product_id, item.qty) for item in order.items)
+        updated_ids.append(oid)
+        before = order_snapshot(order)
+        rollup_changes.append((before, dict(before, status=status)))
+        history_rows.append({'order_id': oid, 'status': status, 'operator': str(operator_id), 'operated_at': now, 'remark': remark})
+        # 狀態異動通知（站內）
+        notification_rows.append({'user_id': order.user_id, 'type': 'order_status', 'title': '訂單狀態更新', 'content': f'您的訂單 {order.order_sn} 狀態已變更為 {status}'})
+        publish_event(order.user_id, 'order_status', {'order_id': oid, 'order_sn': order.order_sn, 'status': status})
+        results.append({'order_id': oid, 'ok': True})
+
+    if updated_ids:
+        release_stock(restock)
+        db.session.execute(
+            update(Order).where(Order.id.in_(updated_ids)).values(status=status),
+            execution_options={'synchronize_session': 'evaluate'}
+        )
+        db.session.execute(insert(OrderHistory), history_rows)
+        create_notifications(notification_rows)
+        record_order_changes(rollup_changes)
+    return results
@@ -1,5 +1,15 @@
 from app.models.payment import Payment
+from app.models.order import Order, OrderHistory
+from app.services.notification_service import create_notification
+from app.services.event_broker import publish_event
+from app.services.rollup_service import order_snapshot, record_order_change
+from app.utils.pagination import keyset_page
+from app.utils.serialization import compile_row_serializer, isoformat
 from app import db
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from datetime import datetime
 
 def create_payment(**kwargs):
     payment = Payment(**kwargs)
@@ -9,3 +19,101 @@ def create_payment(**kwargs):
 
 def get_payment_by_id(pid):
     return Payment.query.get(pid)
+
+# 付款列表只查詢需要的欄位，輸出與 Payment.to_dict 相同
+PAYMENT_LIST_FIELDS = ('id', 'order_id', 'amount', 'status', 'payment_method', 'transaction_id',
+                       'paid_at', 'created_at', 'updated_at')
+PAYMENT_LIST_COLUMNS = tuple(getattr(Payment, name) for name in PAYMENT_LIST_FIELDS)
+_serialize_payment_row = compile_row_serializer([
+    (name, isoformat if name.endswith('_at') else None) for name in PAYMENT_LIST_FIELDS
+])
+
+def list_payment_page(user_id=None, status=None, payment_method=None, order_id=None,
+                      date_start=None, date_end=None, limit=50, cursor=None):
+    """
+    付款列表，依 (created_at, id) 由新到舊做 keyset 分頁
+    user_id: 只列出該使用者訂單的付款（管理員傳 None）
+    date_start / date_end: 建立時間區間，date_end 不含
+    回傳 (付款 dict 清單, next_cursor)；cursor 格式錯誤時拋出 ValueError
+    """
+    q = db.session.query(*PAYMENT_LIST_COLUMNS)
+    if user_id is not None:
+        q = q.join(Order, Payment.order_id == Order.id).filter(Order.user_id == user_id)
+    if status:
+        q = q.filter(Payment.status == status)
+    if payment_method:
+        q = q.filter(Payment.payment_method == payment_method)
+    if order_id is not None:
+        q = q.filter(Payment.order_id == order_id)
+    if date_start is not None:
+        q = q.filter(Payment.created_at >= date_start)
+    if date_end is not None:
+        q = q.filter(Payment.created_at < date_end)
+    rows, next_cursor = keyset_page(q, Payment.created_at, Payment.id, limit, cursor=cursor)
+    return [_serialize_payment_row(row) for row in rows], next_cursor
+
+def payment_recorded(payment_method, transaction_id):
+    """這筆金流交易是否已入帳；走 (payment_method, transaction_id) 唯一索引，不載入訂單"""
+    return db.session.query(Payment.id).filter_by(
+        payment_method=payment_method, transaction_id=transaction_id
+    ).first() is not None
+
+def apply_gateway_payment(trade_no, payment_method, remark=None):
+    """
+    處理金流的付款成功通知，可重複呼叫（金流重送、多個 worker 同時收到同一筆通知）：
+    1. 已有相同 (payment_method, transaction_id) 的付款紀錄 → 直接回傳 'duplicate'
+    2. 條件式 UPDATE orders ... WHERE payment_status != 'paid' 搶下這筆訂單，
+       併發時只有一個交易會更新到資料列，其餘回傳 'duplicate'
+    3. 寫入付款紀錄、訂單歷史、通知與銷售彙總；唯一索引衝突時整筆 rollback 並回傳 'duplicate'
+    回傳 'paid' | 'duplicate' | 'not_found'；成功時已 commit
+    """
+    if payment_recorded(payment_method, trade_no):
+        return 'duplicate'
+
+    order = Order.query.options(selectinload(Order.items)).filter_by(trade_no=trade_no).first()  # 明細供銷售彙總使用
+    if order is None:
+        return 'not_found'
+
+    rollup_before = order_snapshot(order)
+    claimed = db.session.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.payment_status != 'paid')
+        .values(status='paid', payment_status='paid')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        return 'duplicate'
+    db.session.expire(order, ['status', 'payment_status', 'updated_at'])
+    record_order_change(rollup_before, dict(rollup_before, status='paid'))
+
+    now = datetime.now()
+    db.session.add(Payment(
+        order_id=order.id,
+        amount=order.total_amount,
+        status='success',
+        payment_method=payment_method,
+        transaction_id=trade_no,
+        paid_at=now
+    ))
+    db.session.add(OrderHistory(
+        order_id=order.id,
+        status='paid',
+        operator=str(order.user_id),
+        operated_at=now,
+        remark=remark
+    ))
+    # 發送付款成功通知（與付款紀錄同一個交易寫入）
+    create_notification(
+        user_id=order.user_id,
+        type='payment_success',
+        title='付款成功',
+        content=f'您的訂單 {order.order_sn} 已完成付款。'
+    )
+    publish_event(order.user_id, 'payment_success', {'order_id': order.id, 'order_sn': order.order_sn, 'status': 'paid'})
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # 另一個 worker 已寫入同一筆交易
+        return 'duplicate'
+    return 'paid'
@@ -1,5 +1,63 @@
 from app.models.product import Product, Category
+from app.services.category_service import category_filter, category_nodes
+from app.utils.serialization import compile_row_serializer, isoformat
 from app import db
+from sqlalchemy import select, func
+
+# 商品列表的 projection：只查 ProductSchema 會輸出的欄位，分類以 LEFT JOIN 一起取回
+PRODUCT_LIST_COLUMNS = (
+    Product.id, Product.name, Product.price, Product.promo_price, Product.stock, Product.desc,
+    Product.image_url, Product.is_active, Product.category_id, Product.created_at, Product.updated_at,
+    Category.id, Category.name, Category.parent_id, Category.created_at, Category.updated_at,
+)
+
+# 輸出格式與 products_schema.dump 相同
+_serialize_product = compile_row_serializer([
+    ('id', None), ('name', None), ('price', float), ('promo_price', float), ('stock', None), ('desc', None),
+    ('image_url', None), ('is_active', None), ('category_id', None), ('created_at', isoformat), ('updated_at', isoformat),
+])
+_serialize_category = compile_row_serializer([
+    ('id', None), ('name', None), ('parent_id', None), ('created_at', isoformat), ('updated_at', isoformat),
+], start=11)
+
+def list_product_page(name=None, category_id=None, is_active=None, page=1, page_size=20):
+    """
+    商品列表（名稱、分類（含子分類）、上下架篩選，依建立時間新到舊分頁），回傳 {'data': [...], 'total': n}
+    一次 COUNT 加一次 projection 查詢；分類的子分類取自快取的分類樹，不逐列載入關聯
+    """
+    conditions = []
+    if name:
+        conditions.append(Product.name.like(f"%{name}%"))
+    if category_id:
+        conditions.append(category_filter(Product.category_id, category_id))
+    if is_active is not None:
+        conditions.append(Product.is_active == is_active)
+    total = db.session.execute(select(func.count(Product.id)).where(*conditions)).scalar()
+    rows = db.session.execute(
+        select(*PRODUCT_LIST_COLUMNS)
+        .outerjoin(Category, Product.category_id == Category.id)
+        .where(*conditions)
+        .order_by(Product.created_at.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).all()
+    return {'data': serialize_product_rows(rows), 'total': total}
+
+def serialize_product_rows(rows):
+    """PRODUCT_LIST_COLUMNS 的查詢結果轉成與 products_schema.dump 相同的 list"""
+    nodes = category_nodes() if any(row[11] is not None for row in rows) else {}
+    data = []
+    for row in rows:
+        product = _serialize_product(row)
+        if row[11] is None:
+            product['category'] = None
+        else:
+            category = _serialize_category(row)
+            node = nodes.get(row[11])
+            category['children'] = node['children'] if node is not None else []
+            product['category'] = category
+        data.append(product)
+    return data
 
 def create_product(**kwargs):
     prod = Product(**kwargs)
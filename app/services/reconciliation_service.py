@@ -0,0 +1,251 @@
+"""
+金流對帳：匯入綠界的交易對帳檔（CSV），補登停機期間漏收的付款通知
+
+對帳檔每列至少包含 MerchantTradeNo / RtnCode / TradeAmt / CheckMacValue，
+簽章範圍與付款結果通知相同（CheckMacValue 以外的所有欄位）。處理流程：
+1. 依 chunk_size 分段讀檔；CheckMacValue 驗證交給 process pool，和資料庫處理重疊進行
+2. 每段以一次 trade_no IN (...) 查詢訂單、一次查詢已入帳的付款紀錄
+3. 需要補登的訂單以一次條件式 UPDATE、批次 INSERT 付款紀錄 / 訂單歷史 / 通知，在同一個交易內完成；
+   若 UPDATE 更新筆數不符或付款唯一索引衝突（對帳期間金流通知同時進來），該段 rollback
+   改為逐筆呼叫 apply_gateway_payment，結果與金流通知的冪等處理一致
+4. 每列的處理結果寫入差異報表（已入帳、無差異的列不列出），回傳各結果的筆數
+"""
+import csv
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from app.models.order import Order, OrderItem, OrderHistory
+from app.models.payment import Payment
+from app.services.notification_service import create_notifications
+from app.services.event_broker import publish_event
+from app.services.payment_service import apply_gateway_payment
+from app.services.rollup_service import order_snapshot, record_order_changes
+from app.utils.check_mac_value import get_signer
+from app import db
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+REQUIRED_COLUMNS = ('MerchantTradeNo', 'RtnCode', 'TradeAmt', 'CheckMacValue')
+REPORT_COLUMNS = ('trade_no', 'result', 'order_id', 'status_before', 'status_after', 'order_amount', 'trade_amount')
+DEFAULT_CHUNK_SIZE = 5000
+
+# 處理結果
+PAID = 'paid'                            # 本次補登入帳
+ALREADY_PAID = 'already_paid'            # 已有付款紀錄，無差異
+PAID_WITHOUT_RECORD = 'paid_without_record'  # 訂單已是已付款，但沒有這筆交易的付款紀錄
+NOT_FOUND = 'not_found'                  # 找不到對應訂單
+AMOUNT_MISMATCH = 'amount_mismatch'      # 金額與訂單不符
+FAILED = 'failed'                        # RtnCode 不是 1（交易失敗）
+INVALID_SIGNATURE = 'invalid_signature'  # CheckMacValue 驗證失敗
+DUPLICATE_ROW = 'duplicate_row'          # 同一筆交易在對帳檔中重複出現
+
+
+def read_settlement_chunks(fileobj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """分段讀取對帳檔，每次回傳最多 chunk_size 列 dict"""
+    reader = csv.DictReader(fileobj)
+    missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"對帳檔缺少欄位：{', '.join(sorted(missing))}")
+    chunk = []
+    for row in reader:
+        row.pop(None, None)  # 欄位數多於表頭的多餘值不列入簽章
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def verified_chunks(chunks, signer, workers=0):
+    """
+    回傳 (rows, [簽章是否正確, ...])，順序與 chunks 相同
+    workers > 0 時以 process pool 驗證，最多預先送出 workers * 2 段，避免整個檔案讀進記憶體
+    """
+    if workers <= 0:
+        for rows in chunks:
+            yield rows, signer.verify_many(rows)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for rows in chunks:
+            pending.append((rows, pool.submit(signer.verify_many, rows)))
+            if len(pending) >= workers * 2:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+        while pending:
+            rows, future = pending.popleft()
+            yield rows, future.result()
+
+
+def _amount(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _entry(trade_no, result, order=None, status_after=None, trade_amount=None):
+    return {
+        'trade_no': trade_no,
+        'result': result,
+        'order_id': order.id if order is not None else None,
+        'status_before': order.status if order is not None else None,
+        'status_after': status_after or (order.status if order is not None else None),
+        'order_amount': order.total_amount if order is not None else None,
+        'trade_amount': trade_amount,
+    }
+
+
+def reconcile_chunk(rows, valid, payment_method='ecpay', dry_run=False, remark='對帳補登', seen=None):
+    """
+    對帳一段資料：rows 為對帳檔的列，valid 為對應的簽章驗證結果
+    seen: 跨段共用的 set，用來找出對帳檔中重複的交易
+    回傳每列的結果 [{'trade_no', 'result', ...}, ...]；dry_run 時只比對不寫入
+    """
+    seen = set() if seen is None else seen
+    entries = []
+    candidates = {}
+    for row, ok in zip(rows, valid):
+        trade_no = (row.get('MerchantTradeNo') or '').strip()
+        trade_amount = row.get('TradeAmt')
+        if not ok:
+            entries.append(_entry(trade_no, INVALID_SIGNATURE, trade_amount=trade_amount))
+        elif row.get('RtnCode') != '1':
+            entries.append(_entry(trade_no, FAILED, trade_amount=trade_amount))
+        elif trade_no in seen:
+            entries.append(_entry(trade_no, DUPLICATE_ROW, trade_amount=trade_amount))
+        else:
+            seen.add(trade_no)
+            candidates[trade_no] = trade_amount
+    if not candidates:
+        return entries
+
+    trade_nos = list(candidates)
+    orders = {
+        order.trade_no: order
+        for order in db.session.execute(
+            select(Order.id, Order.trade_no, Order.user_id, Order.customer_id, Order.order_sn,
+                   Order.status, Order.payment_status, Order.total_amount, Order.created_at)
+            .where(Order.trade_no.in_(trade_nos))
+        )
+    }
+    recorded = set(db.session.scalars(
+        select(Payment.transaction_id)
+        .where(Payment.payment_method == payment_method, Payment.transaction_id.in_(trade_nos))
+    ))
+
+    to_apply = []
+    for trade_no, trade_amount in candidates.items():
+        order = orders.get(trade_no)
+        if order is None:
+            entries.append(_entry(trade_no, NOT_FOUND, trade_amount=trade_amount))
+        elif _amount(trade_amount) != int(order.total_amount):
+            entries.append(_entry(trade_no, AMOUNT_MISMATCH, order, trade_amount=trade_amount))
+        elif trade_no in recorded:
+            entries.append(_entry(trade_no, ALREADY_PAID, order, trade_amount=trade_amount))
+        elif order.payment_status == 'paid':
+            entries.append(_entry(trade_no, PAID_WITHOUT_RECORD, order, trade_amount=trade_amount))
+        else:
+            to_apply.append((order, trade_amount))
+
+    if to_apply and not dry_run:
+        if not _apply_bulk([order for order, _ in to_apply], payment_method, remark):
+            return entries + _apply_one_by_one(to_apply, payment_method, remark)
+    entries.extend(_entry(order.trade_no, PAID, order, status_after='paid', trade_amount=trade_amount)
+                   for order, trade_amount in to_apply)
+    return entries
+
+
+def _apply_bulk(orders, payment_method, remark):
+    """以單一交易補登整段訂單；與其他交易衝突時 rollback 並回傳 False"""
+    ids = [order.id for order in orders]
+    items = {}
+    for order_id, product_id, qty, price in db.session.execute(
+        select(OrderItem.order_id, OrderItem.product_id, OrderItem.qty, OrderItem.price)
+        .where(OrderItem.order_id.in_(ids))
+    ):
+        items.setdefault(order_id, []).append((product_id, qty, price))
+
+    claimed = db.session.execute(
+        update(Order)
+        .where(Order.id.in_(ids), Order.payment_status != 'paid')
+        .values(status='paid', payment_status='paid')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed != len(ids):
+        db.session.rollback()  # 部分訂單已由其他交易付款
+        return False
+
+    changes = []
+    for order in orders:
+        before = order_snapshot(order, items.get(order.id, ()))
+        changes.append((before, dict(before, status='paid')))
+    record_order_changes(changes)
+
+    now = datetime.now()
+    db.session.execute(insert(Payment), [{
+        'order_id': order.id,
+        'amount': order.total_amount,
+        'status': 'success',
+        'payment_method': payment_method,
+        'transaction_id': order.trade_no,
+        'paid_at': now,
+    } for order in orders])
+    db.session.execute(insert(OrderHistory), [{
+        'order_id': order.id,
+        'status': 'paid',
+        'operator': str(order.user_id),
+        'operated_at': now,
+        'remark': remark,
+    } for order in orders])
+    create_notifications([{
+        'user_id': order.user_id,
+        'type': 'payment_success',
+        'title': '付款成功',
+        'content': f'您的訂單 {order.order_sn} 已完成付款。',
+    } for order in orders])
+    for order in orders:
+        publish_event(order.user_id, 'payment_success', {'order_id': order.id, 'order_sn': order.order_sn, 'status': 'paid'})
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # 金流通知同時寫入了其中某筆交易
+        return False
+    return True
+
+
+def _apply_one_by_one(to_apply, payment_method, remark):
+    """批次補登失敗時逐筆處理，沿用金流通知的冪等邏輯"""
+    results = {'paid': PAID, 'duplicate': ALREADY_PAID, 'not_found': NOT_FOUND}
+    entries = []
+    for order, trade_amount in to_apply:
+        result = results[apply_gateway_payment(order.trade_no, payment_method, remark=remark)]
+        entries.append(_entry(order.trade_no, result, order,
+                              status_after='paid' if result == PAID else None, trade_amount=trade_amount))
+    return entries
+
+
+def reconcile_settlement(fileobj, report=None, chunk_size=DEFAULT_CHUNK_SIZE, workers=0,
+                         dry_run=False, payment_method='ecpay', signer=None):
+    """
+    匯入整個對帳檔
+    report: 可選的文字檔 file object，寫入差異報表 CSV（欄位見 REPORT_COLUMNS，已入帳的列不列出）
+    workers: 驗證簽章的 process 數，0 表示在目前的 process 驗證
+    回傳 {'rows': 總列數, 結果: 筆數, ...}
+    """
+    signer = signer or get_signer()
+    writer = None
+    if report is not None:
+        writer = csv.DictWriter(report, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+    summary = Counter()
+    seen = set()
+    for rows, valid in verified_chunks(read_settlement_chunks(fileobj, chunk_size), signer, workers):
+        entries = reconcile_chunk(rows, valid, payment_method=payment_method, dry_run=dry_run, seen=seen)
+        summary['rows'] += len(entries)
+        for entry in entries:
+            summary[entry['result']] += 1
+            if writer is not None and entry['result'] != ALREADY_PAID:
+                writer.writerow(entry)
+    return dict(summary)
@@ -1,41 +1,100 @@
 from app.models.order import Order
 from app.models.product import Product
 from app.models.customer import Customer
+from app.models.user import User
+from app.models.sales_rollup import DailyOrderRollup, DailyProductRollup
+from app.utils.time_bucket import (is_day as _is_day, is_utc, report_timezone, range_bounds, range_filters,
+                                   bucket_expr, day_bucket_expr, check_unit)
 from app import db
-from sqlalchemy import func
+from flask import current_app
+from sqlalchemy import func, select, union_all, null
 from datetime import datetime
-import csv, io
+import csv, io, math, zlib
 
-def sales_summary(period='day', start=None, end=None):
-    # period: day/month/year
-    q = db.session.query(
-        func.date_format(Order.created_at, '%Y-%m-%d' if period=='day' else ('%Y-%m' if period=='month' else '%Y')).label('date'),
-        func.count(Order.id).label('order_count'),
-        func.sum(Order.total_amount).label('total_amount')
-    )
+def use_sales_rollups(*bounds):
+    """
+    SALES_ROLLUP_READS 開啟，且日期條件都是整日（YYYY-MM-DD）時改讀每日彙總表；否則回到原始資料表查詢
+    彙總表以 UTC 日期為單位，REPORT_TIMEZONE 不是 UTC 時也回到原始資料表
+    """
+    return (bool(current_app.config.get('SALES_ROLLUP_READS')) and all(_is_day(b) for b in bounds if b)
+            and is_utc(report_timezone()))
+
+def _filter_created(q, start, end):
+    """原始資料表的日期條件：整日依 REPORT_TIMEZONE 換算成 created_at 的範圍，結束日期包含當天整日，與彙總表一致"""
+    return q.filter(*range_filters(Order.created_at, start, end, report_timezone()))
+
+def _filter_day(q, day_col, start, end):
     if start:
-        q = q.filter(Order.created_at >= start)
+        q = q.filter(day_col >= start)
     if end:
-        q = q.filter(Order.created_at <= end)
-    q = q.group_by(1).order_by(1)
-    return [{'date': r[0], 'order_count': int(r[1]), 'total_amount': float(r[2])} for r in q.all()]
+        q = q.filter(day_col <= end)
+    return q
+
+def sales_summary_stmt(period, start, end, dialect, tz, rollups=False):
+    """
+    依 period（day / week / month / year）分組的 (date, order_count, total_amount) 查詢
+    dialect: 資料庫方言名稱；rollups 為 True 時讀每日彙總表
+    """
+    check_unit(period)
+    if rollups:
+        roll = DailyOrderRollup
+        date_expr = day_bucket_expr(roll.day, period, dialect)
+        stmt = select(
+            date_expr.label('date'),
+            func.sum(roll.order_count).label('order_count'),
+            func.sum(roll.total_amount).label('total_amount')
+        )
+        stmt = _filter_day(stmt, roll.day, start, end)
+        return stmt.group_by(date_expr).having(func.sum(roll.order_count) > 0).order_by(date_expr)
+
+    lower = range_bounds(start, end, tz)[0]
+    date_expr = bucket_expr(Order.created_at, period, dialect, tz, at=lower if isinstance(lower, datetime) else None)
+    stmt = select(
+        date_expr.label('date'),
+        func.count(Order.id).label('order_count'),
+        func.sum(Order.total_amount).label('total_amount')
+    ).where(*range_filters(Order.created_at, start, end, tz))
+    return stmt.group_by(date_expr).order_by(date_expr)  # SQLAlchemy 2 不接受 group_by(1)
+
+def sales_summary(period='day', start=None, end=None):
+    # period: day/week/month/year，不支援的值拋出 ValueError；分組依 REPORT_TIMEZONE 的當地日期
+    stmt = sales_summary_stmt(period, start, end, db.session.get_bind().dialect.name, report_timezone(),
+                              rollups=use_sales_rollups(start, end))
+    return [{'date': r[0], 'order_count': int(r[1]), 'total_amount': float(r[2])} for r in db.session.execute(stmt)]
 
 def product_sales_ranking(start=None, end=None, limit=10):
     from app.models.order import OrderItem
+    if use_sales_rollups(start, end):
+        roll = DailyProductRollup
+        q = db.session.query(
+            Product.name,
+            func.sum(roll.qty).label('total_qty'),
+            func.sum(roll.amount).label('total_amount')
+        ).join(roll, Product.id==roll.product_id)
+        q = _filter_day(q, roll.day, start, end)
+        q = q.group_by(Product.id).having(func.sum(roll.qty) > 0).order_by(func.sum(roll.qty).desc()).limit(limit)
+        return [{'product_name': r[0], 'total_qty': int(r[1]), 'total_amount': float(r[2])} for r in q.all()]
+
     q = db.session.query(
         Product.name,
         func.sum(OrderItem.qty).label('total_qty'),
         func.sum(OrderItem.qty * OrderItem.price).label('total_amount')
     ).join(OrderItem, Product.id==OrderItem.product_id)\
      .join(Order, OrderItem.order_id==Order.id)
-    if start:
-        q = q.filter(Order.created_at >= start)
-    if end:
-        q = q.filter(Order.created_at <= end)
+    q = _filter_created(q, start, end)
     q = q.group_by(Product.id).order_by(func.sum(OrderItem.qty).desc()).limit(limit)
     return [{'product_name': r[0], 'total_qty': int(r[1]), 'total_amount': float(r[2])} for r in q.all()]
 
 def customer_sales_summary():
+    if use_sales_rollups():
+        roll = DailyOrderRollup
+        q = db.session.query(
+            Customer.id, Customer.name,
+            func.sum(roll.order_count),
+            func.sum(roll.total_amount)
+        ).join(roll, Customer.id==roll.customer_id).group_by(Customer.id).having(func.sum(roll.order_count) > 0)
+        return [{'customer_id': r[0], 'name': r[1], 'order_count': int(r[2]), 'total_amount': float(r[3])} for r in q.all()]
+
     q = db.session.query(
         Customer.id, Customer.name,
         func.count(Order.id),
@@ -43,42 +102,108 @@ def customer_sales_summary():
     ).join(Order, Customer.id==Order.customer_id).group_by(Customer.id)
     return [{'customer_id': r[0], 'name': r[1], 'order_count': int(r[2]), 'total_amount': float(r[3])} for r in q.all()]
 
+def sales_totals():
+    """全部訂單的 (總金額, 訂單數)"""
+    if use_sales_rollups():
+        row = db.session.query(func.sum(DailyOrderRollup.total_amount), func.sum(DailyOrderRollup.order_count)).one()
+    else:
+        row = db.session.query(func.sum(Order.total_amount), func.count(Order.id)).one()
+    return float(row[0] or 0), int(row[1] or 0)
+
+def dashboard_stmt(dialect, tz, rollups=False):
+    """
+    儀表板的單一查詢（UNION ALL）：每月 (month, value, order_count) + 一列 (NULL, NULL, 使用者數)
+    總額與訂單數由每月結果加總，不另外掃描 orders
+    """
+    if rollups:
+        roll = DailyOrderRollup
+        month = day_bucket_expr(roll.day, 'month', dialect)
+        monthly = select(
+            month.label('month'),
+            func.sum(roll.total_amount).label('value'),
+            func.sum(roll.order_count).label('order_count')
+        ).group_by(month).having(func.sum(roll.order_count) > 0)
+    else:
+        month = bucket_expr(Order.created_at, 'month', dialect, tz)
+        monthly = select(
+            month.label('month'),
+            func.sum(Order.total_amount).label('value'),
+            func.count(Order.id).label('order_count')
+        ).group_by(month)
+    users = select(null(), null(), func.count(User.id))
+    return union_all(monthly, users)
+
+def dashboard_summary():
+    """儀表板統計：{'total_sales', 'order_count', 'customer_count', 'monthly_sales': [{'month', 'value'}]}"""
+    stmt = dashboard_stmt(db.session.get_bind().dialect.name, report_timezone(), rollups=use_sales_rollups())
+    rows = db.session.execute(stmt).all()
+    months = sorted((r for r in rows if r[0] is not None), key=lambda r: r[0])
+    return {
+        'total_sales': round(math.fsum(float(r[1]) for r in months), 2),
+        'order_count': sum(int(r[2]) for r in months),
+        'customer_count': next((int(r[2]) for r in rows if r[0] is None), 0),
+        'monthly_sales': [{'month': r[0], 'value': float(r[1])} for r in months],
+    }
+
+# CSV 匯出：以產生器逐批輸出，資料庫端用 yield_per（伺服器端游標）分批取回，
+# 整張表不會一次載入記憶體，第一批資料準備好就開始回應
+EXPORT_BATCH_SIZE = 1000
+CSV_CHUNK_ROWS = 500
+
+CUSTOMER_CSV_HEADER = ['ID', '姓名', '電話', '地址', 'Email', '標籤']
+ORDER_CSV_HEADER = ['訂單編號', '客戶', '金額', '狀態', '建立時間']
+PRODUCT_CSV_HEADER = ['商品ID', '名稱', '分類', '價格', '促銷價', '庫存']
+
+def iter_csv(header, rows, chunk_rows=CSV_CHUNK_ROWS):
+    """把資料列轉成 CSV 文字片段，每 chunk_rows 列輸出一次，記憶體只保留一批"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_gzip(chunks, level=6):
+    """把文字片段逐段壓縮成 gzip 位元組串流"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31：gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _stream_rows(stmt, batch_size):
+    """只查詢需要的欄位，每次從游標取 batch_size 列，不建立 ORM 物件"""
+    yield from db.session.execute(stmt.execution_options(yield_per=batch_size))
+
+def stream_customers_csv(batch_size=EXPORT_BATCH_SIZE):
+    stmt = select(Customer.id, Customer.name, Customer.phone, Customer.address, Customer.email, Customer.tags).order_by(Customer.id)
+    return iter_csv(CUSTOMER_CSV_HEADER, _stream_rows(stmt, batch_size))
+
+def stream_orders_csv(batch_size=EXPORT_BATCH_SIZE):
+    stmt = select(Order.id, Order.customer_id, Order.total_amount, Order.status, Order.created_at).order_by(Order.id)
+    return iter_csv(ORDER_CSV_HEADER, _stream_rows(stmt, batch_size))
+
+def stream_products_csv(batch_size=EXPORT_BATCH_SIZE):
+    stmt = select(Product.id, Product.name, Product.category_id, Product.price, Product.promo_price, Product.stock).order_by(Product.id)
+    return iter_csv(PRODUCT_CSV_HEADER, _stream_rows(stmt, batch_size))
+
 def export_customers_csv(customers):
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['ID', '姓名', '電話', '地址', 'Email', '標籤'])
-    for c in customers:
-        writer.writerow([c.id, c.name, c.phone, c.address, c.email, c.tags])
-    return output.getvalue()
+    return ''.join(iter_csv(CUSTOMER_CSV_HEADER, ([c.id, c.name, c.phone, c.address, c.email, c.tags] for c in customers)))
 
 def export_orders_csv(orders):
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['訂單編號', '客戶', '金額', '狀態', '建立時間'])
-    for o in orders:
-        writer.writerow([o.id, o.customer_id, o.total_amount, o.status, o.created_at])
-    return output.getvalue()
+    return ''.join(iter_csv(ORDER_CSV_HEADER, ([o.id, o.customer_id, o.total_amount, o.status, o.created_at] for o in orders)))
 
 def export_products_csv(products):
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['商品ID', '名稱', '分類', '價格', '促銷價', '庫存'])
-    for p in products:
-        writer.writerow([p.id, p.name, p.category_id, p.price, p.promo_price, p.stock])
-    return output.getvalue()
+    return ''.join(iter_csv(PRODUCT_CSV_HEADER, ([p.id, p.name, p.category_id, p.price, p.promo_price, p.stock] for p in products)))
 
 def export_order_stats_csv(data):
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['日期', '訂單數', '總金額'])
-    for item in data:
-        writer.writerow([item['date'], item['order_count'], item['total_amount']])
-    return output.getvalue()
+    return ''.join(iter_csv(['日期', '訂單數', '總金額'], ([item['date'], item['order_count'], item['total_amount']] for item in data)))
 
 def export_product_rank_csv(data):
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['商品名稱', '銷售數量', '銷售金額'])
-    for item in data:
-        writer.writerow([item['product_name'], item['total_qty'], item['total_amount']])
-    return output.getvalue()
+    return ''.join(iter_csv(['商品名稱', '銷售數量', '銷售金額'], ([item['product_name'], item['total_qty'], item['total_amount']] for item in data)))
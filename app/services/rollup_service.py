@@ -0,0 +1,122 @@
+"""
+每日銷售彙總表（daily_order_rollups / daily_product_rollups）的增量維護
+
+訂單異動時先取變更前快照（order_snapshot），異動後再取一次，
+record_order_change 把兩者的差額以 upsert（欄位 = 欄位 + 差額）累加到彙總表，
+和訂單異動在同一個交易內完成；資料回填或修正時用 rebuild_sales_rollups 重新彙總。
+"""
+from app.models.order import Order, OrderItem
+from app.models.sales_rollup import DailyOrderRollup, DailyProductRollup
+from app.utils.upsert import increment
+from app import db
+from sqlalchemy import select, delete, insert, func, literal_column
+from datetime import datetime, timedelta
+
+ORDER_KEYS = ('day', 'status', 'customer_id')
+PRODUCT_KEYS = ('day', 'product_id', 'status')
+
+
+def _day(value):
+    return value.strftime('%Y-%m-%d')
+
+
+def order_snapshot(order, items=None):
+    """
+    訂單目前對彙總表的貢獻
+    items: [(product_id, qty, price), ...]，省略時使用 order.items
+    """
+    if items is None:
+        items = [(item.product_id, item.qty, item.price) for item in order.items]
+    return {
+        'day': _day(order.created_at),
+        'status': order.status,
+        'customer_id': order.customer_id or 0,
+        'total_amount': order.total_amount or 0,
+        'items': list(items),
+    }
+
+
+def record_order_changes(changes):
+    """
+    套用多筆訂單的變化：changes 為 [(before, after), ...]
+    新增訂單時 before 為 None，刪除時 after 為 None；前後相同的部分會互相抵銷，不產生寫入
+    不在此 commit，交易邊界交給呼叫端
+    """
+    order_deltas = {}
+    product_deltas = {}
+    for before, after in changes:
+        for snap, sign in ((before, -1), (after, 1)):
+            if snap is None:
+                continue
+            delta = order_deltas.setdefault((snap['day'], snap['status'], snap['customer_id']), [0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * snap['total_amount']
+            for product_id, qty, price in snap['items']:
+                delta = product_deltas.setdefault((snap['day'], product_id, snap['status']), [0, 0.0])
+                delta[0] += sign * qty
+                delta[1] += sign * qty * price
+
+    order_rows = [
+        dict(zip(ORDER_KEYS, key), order_count=count, total_amount=amount)
+        for key, (count, amount) in order_deltas.items() if count or amount
+    ]
+    product_rows = [
+        dict(zip(PRODUCT_KEYS, key), qty=qty, amount=amount)
+        for key, (qty, amount) in product_deltas.items() if qty or amount
+    ]
+    if order_rows:
+        increment(db.session, DailyOrderRollup.__table__, ORDER_KEYS, order_rows)
+    if product_rows:
+        increment(db.session, DailyProductRollup.__table__, PRODUCT_KEYS, product_rows)
+
+
+def record_order_change(before, after):
+    """單筆訂單版本的 record_order_changes"""
+    record_order_changes([(before, after)])
+
+
+def rebuild_sales_rollups(start=None, end=None):
+    """
+    從 orders / order_items 重新彙總（回填、修正用），回傳彙總的訂單數
+    start / end 為 'YYYY-MM-DD'（含當日），省略時重建全部
+    """
+    day_expr = func.date(Order.created_at)
+    customer_expr = func.coalesce(Order.customer_id, literal_column('0'))
+    order_filters = []
+    order_rollup_filters = []
+    product_rollup_filters = []
+    if start:
+        order_filters.append(Order.created_at >= datetime.fromisoformat(start))
+        order_rollup_filters.append(DailyOrderRollup.day >= start)
+        product_rollup_filters.append(DailyProductRollup.day >= start)
+    if end:
+        order_filters.append(Order.created_at < datetime.fromisoformat(end) + timedelta(days=1))
+        order_rollup_filters.append(DailyOrderRollup.day <= end)
+        product_rollup_filters.append(DailyProductRollup.day <= end)
+
+    db.session.execute(delete(DailyOrderRollup).where(*order_rollup_filters))
+    db.session.execute(delete(DailyProductRollup).where(*product_rollup_filters))
+
+    order_rows = [
+        {'day': str(r[0])[:10], 'status': r[1], 'customer_id': r[2], 'order_count': r[3], 'total_amount': float(r[4] or 0)}
+        for r in db.session.execute(
+            select(day_expr, Order.status, customer_expr, func.count(Order.id), func.sum(Order.total_amount))
+            .where(*order_filters)
+            .group_by(day_expr, Order.status, customer_expr)
+        )
+    ]
+    product_rows = [
+        {'day': str(r[0])[:10], 'product_id': r[1], 'status': r[2], 'qty': int(r[3] or 0), 'amount': float(r[4] or 0)}
+        for r in db.session.execute(
+            select(day_expr, OrderItem.product_id, Order.status, func.sum(OrderItem.qty), func.sum(OrderItem.qty * OrderItem.price))
+            .join(Order, OrderItem.order_id == Order.id)
+            .where(*order_filters)
+            .group_by(day_expr, OrderItem.product_id, Order.status)
+        )
+    ]
+    if order_rows:
+        db.session.execute(insert(DailyOrderRollup), order_rows)
+    if product_rows:
+        db.session.execute(insert(DailyProductRollup), product_rows)
+    db.session.commit()
+    return sum(row['order_count'] for row in order_rows)
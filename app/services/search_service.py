@@ -0,0 +1,115 @@
+from app.models.order import Order
+from app.models.order_search import OrderSearchToken
+from app import db
+from sqlalchemy import event, select, delete, insert, func, or_, inspect
+from sqlalchemy.orm import Session
+import re
+
+# 建索引的欄位
+SEARCH_FIELDS = ('order_sn', 'remark', 'receiver_name')
+
+# CJK（中日韓）字元與英數字分開切詞：中文用單字 + 雙字，英數用三字元（trigram）
+_RUN_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+|[0-9a-z]+')
+_CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+
+def _grams(run, n):
+    return {run[i:i + n] for i in range(len(run) - n + 1)}
+
+def tokenize(text):
+    """把文字切成要寫入索引的 token 集合"""
+    tokens = set()
+    for run in _RUN_RE.findall((text or '').lower()):
+        if _CJK_RE.match(run):
+            tokens |= set(run)  # 單字，支援只搜一個字（例如姓氏）
+            tokens |= _grams(run, 2)
+        elif len(run) < 3:
+            tokens.add(run)
+        else:
+            tokens |= _grams(run, 3)
+    return tokens
+
+def query_tokens(keyword):
+    """
+    把搜尋關鍵字切成查詢用 token；無法用索引時回傳 None（例如只有 1~2 個英數字）
+    索引只負責縮小候選範圍，最後仍以 LIKE 比對確保結果正確
+    """
+    tokens = set()
+    for run in _RUN_RE.findall((keyword or '').lower()):
+        if _CJK_RE.match(run):
+            tokens |= _grams(run, 2) if len(run) > 1 else {run}
+        elif len(run) >= 3:
+            tokens |= _grams(run, 3)
+        else:
+            return None  # 短英數字可能是較長字串的一部分，索引無法涵蓋
+    return tokens or None
+
+def order_tokens(order):
+    return set().union(*(tokenize(getattr(order, f)) for f in SEARCH_FIELDS))
+
+def apply_order_keyword(q, keyword):
+    """在訂單查詢上套用關鍵字條件：先用 n-gram 索引取候選訂單，再以 LIKE 精確比對"""
+    like = or_(*(getattr(Order, f).like(f"%{keyword}%") for f in SEARCH_FIELDS))
+    tokens = query_tokens(keyword)
+    if tokens is None:
+        return q.filter(like)
+    candidates = (
+        select(OrderSearchToken.order_id)
+        .where(OrderSearchToken.token.in_(tokens))
+        .group_by(OrderSearchToken.order_id)
+        .having(func.count(OrderSearchToken.token) == len(tokens))
+    )
+    return q.filter(Order.id.in_(candidates), like)
+
+def _index_rows(order_id, tokens):
+    return [{'order_id': order_id, 'token': t} for t in tokens]
+
+@event.listens_for(Session, 'after_flush')
+def _sync_order_search(session, flush_context):
+    """訂單新增 / 修改搜尋欄位 / 刪除時，在同一個交易內同步更新索引"""
+    stale_ids = set()
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, Order):
+            rows.extend(_index_rows(obj.id, order_tokens(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Order) and session.is_modified(obj):
+            state = inspect(obj)
+            if any(state.attrs[f].history.has_changes() for f in SEARCH_FIELDS):
+                stale_ids.add(obj.id)
+                rows.extend(_index_rows(obj.id, order_tokens(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            stale_ids.add(obj.id)
+    if not stale_ids and not rows:
+        return
+    conn = session.connection()
+    if stale_ids:
+        conn.execute(delete(OrderSearchToken).where(OrderSearchToken.order_id.in_(stale_ids)))
+    if rows:
+        conn.execute(insert(OrderSearchToken), rows)
+
+def rebuild_order_search_index(batch_size=1000):
+    """重建全部訂單的搜尋索引（資料回填用），回傳處理的訂單數"""
+    db.session.execute(delete(OrderSearchToken))
+    count = 0
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            select(Order.id, *(getattr(Order, f) for f in SEARCH_FIELDS))
+            .where(Order.id > last_id)
+            .order_by(Order.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        rows = []
+        for row in batch:
+            tokens = set().union(*(tokenize(v) for v in row[1:]))
+            rows.extend(_index_rows(row.id, tokens))
+        if rows:
+            db.session.execute(insert(OrderSearchToken), rows)
+        db.session.commit()
+        count += len(batch)
+        last_id = batch[-1].id
+    db.session.commit()
+    return count
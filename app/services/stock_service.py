@@ -0,0 +1,107 @@
+from app.models.product import Product
+from app.services.catalog_cache import mark_products_changed
+from app import db
+from sqlalchemy import update, case, bindparam, func, and_, or_
+
+def _aggregate(lines):
+    """把 [(product_id, qty), ...] 或 {product_id: qty} 合併成 {product_id: 總數量}"""
+    pairs = lines.items() if isinstance(lines, dict) else lines
+    totals = {}
+    for pid, qty in pairs:
+        totals[pid] = totals.get(pid, 0) + qty
+    return {pid: qty for pid, qty in totals.items() if qty}
+
+# Float 欄位在 MySQL 為單精度，單價比較以半分為容許誤差
+PRICE_TOLERANCE = 0.005
+
+def reserve_stock(lines, prices=None):
+    """
+    條件式扣庫存：UPDATE products SET stock = stock - q WHERE id = :id AND stock >= q
+    所有商品以一條 CASE 敘述批次扣減，不載入 ORM 物件，多個 worker 併發結帳也不會超賣
+    prices: {product_id: 讀取時的單價}（下單時傳入）；指定時 WHERE 另外要求商品上架中且單價未變，
+        讀取商品之後才被下架或改價的商品不會以舊價格賣出；列在 prices 但數量為 0 的商品也會檢查
+    任一商品不足時整批不扣（all-or-nothing），回傳失敗明細：
+        [{'product_id': 1, 'requested': 3, 'available': 2}, ...]
+        下架或改價的商品另外帶 'reason'（'inactive' 或 'price_changed'）
+    回傳空 list 表示全部扣減成功；不在此 commit，交易邊界交給呼叫端
+    """
+    wanted = _aggregate(lines)
+    for pid in prices or ():
+        wanted.setdefault(pid, 0)
+    if not wanted:
+        return []
+
+    qty_expr = case(wanted, value=Product.id)
+    conditions = [Product.id.in_(wanted), Product.stock >= qty_expr]
+    if prices:
+        price_expr = case(prices, value=Product.id)
+        conditions.append(or_(
+            Product.id.notin_(prices),
+            and_(Product.is_active == True, func.abs(Product.price - price_expr) < PRICE_TOLERANCE),
+        ))
+    stmt = (
+        update(Product)
+        .where(*conditions)
+        .values(stock=Product.stock - qty_expr)
+        .execution_options(synchronize_session=False)
+    )
+
+    if len(wanted) == 1:
+        # 單一商品時 rowcount 為 0 代表什麼都沒改，不需要 savepoint
+        if db.session.execute(stmt).rowcount == len(wanted):
+            _expire_stock(wanted)
+            return []
+    else:
+        savepoint = db.session.begin_nested()
+        if db.session.execute(stmt).rowcount == len(wanted):
+            savepoint.commit()
+            _expire_stock(wanted)
+            return []
+        savepoint.rollback()  # 部分商品已扣減，整批還原後再回報不足的品項
+
+    current = {
+        row.id: row for row in
+        db.session.query(Product.id, Product.stock, Product.is_active, Product.price).filter(Product.id.in_(wanted))
+    }
+    failed = []
+    for pid, qty in wanted.items():
+        row = current.get(pid)
+        item = {'product_id': pid, 'requested': qty, 'available': row.stock if row else None}
+        if row is not None and prices and pid in prices:
+            if not row.is_active:
+                item['reason'] = 'inactive'
+            elif abs(row.price - prices[pid]) >= PRICE_TOLERANCE:
+                item['reason'] = 'price_changed'
+        if row is None or row.stock < qty or 'reason' in item:
+            failed.append(item)
+    return failed
+
+def release_stock(lines):
+    """庫存回補（取消、刪除訂單或進貨），以一次 executemany 批次加回，不會失敗"""
+    wanted = _aggregate(lines)
+    if not wanted:
+        return
+    table = Product.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam('b_id'))
+        .values(stock=table.c.stock + bindparam('b_qty')),
+        [{'b_id': pid, 'b_qty': qty} for pid, qty in wanted.items()]
+    )
+    _expire_stock(wanted)
+
+def adjust_stock(product_id, delta):
+    """單一商品庫存異動（正數進貨，負數銷售），庫存不足時回傳失敗明細，成功回傳 None"""
+    if delta < 0:
+        failed = reserve_stock({product_id: -delta})
+        return failed[0] if failed else None
+    release_stock({product_id: delta})
+    return None
+
+def _expire_stock(product_ids):
+    """UPDATE 直接寫入資料庫，讓 session 中已載入的商品下次讀取 stock 時重新查詢，commit 後商品快取失效"""
+    mark_products_changed(product_ids)
+    for pid in product_ids:
+        product = db.session.identity_map.get(db.session.identity_key(Product, pid))
+        if product is not None:
+            db.session.expire(product, ['stock'])
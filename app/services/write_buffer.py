@@ -0,0 +1,156 @@
+"""
+通知與操作紀錄的延遲批次寫入（write-behind）
+
+create_notification / log_operation 只把資料放進目前 session 的緩衝區，
+在 session commit 前（before_commit）以每張表一次 bulk insert 寫入，和主要異動同一個交易；
+背景工作長時間不 commit 時，累積筆數或時間超過門檻也會先寫入 session。
+交易 rollback / session 關閉時緩衝區一併丟棄，不會留下孤兒通知。
+"""
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+DEFAULT_MAX_ROWS = 500
+DEFAULT_MAX_AGE = 5.0  # 秒
+
+
+class FlushMetrics:
+    """程序層級的寫入統計，提供監控端點讀取"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.flushes = 0
+            self.rows = 0
+            self.rows_by_table = {}
+            self.threshold_flushes = 0
+            self.discarded_rows = 0
+            self.last_flush_ms = 0.0
+            self.max_flush_ms = 0.0
+
+    def record_flush(self, counts, elapsed_ms, threshold):
+        with self._lock:
+            self.flushes += 1
+            self.threshold_flushes += 1 if threshold else 0
+            for table, n in counts.items():
+                self.rows += n
+                self.rows_by_table[table] = self.rows_by_table.get(table, 0) + n
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+    def record_discard(self, n):
+        with self._lock:
+            self.discarded_rows += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'flushes': self.flushes,
+                'rows': self.rows,
+                'rows_by_table': dict(self.rows_by_table),
+                'threshold_flushes': self.threshold_flushes,
+                'discarded_rows': self.discarded_rows,
+                'last_flush_ms': round(self.last_flush_ms, 3),
+                'max_flush_ms': round(self.max_flush_ms, 3),
+            }
+
+
+flush_metrics = FlushMetrics()
+
+
+class WriteBuffer:
+    """單一 session 的待寫入資料，依 model 分組"""
+
+    def __init__(self, max_rows=DEFAULT_MAX_ROWS, max_age=DEFAULT_MAX_AGE, clock=time.monotonic):
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self._clock = clock
+        self._rows = {}
+        self._size = 0
+        self._since = None
+
+    def __len__(self):
+        return self._size
+
+    def add(self, model, row):
+        if self._since is None:
+            self._since = self._clock()
+        self._rows.setdefault(model, []).append(row)
+        self._size += 1
+
+    def due(self):
+        """筆數或等待時間超過門檻"""
+        return self._size >= self.max_rows or (
+            self._since is not None and self._clock() - self._since >= self.max_age
+        )
+
+    def flush(self, session, threshold=False):
+        """每個 model 一次 bulk insert 寫入 session（不 commit），回傳寫入筆數"""
+        if not self._size:
+            return 0
+        started = time.perf_counter()
+        counts = {}
+        for model, rows in self._rows.items():
+            session.execute(insert(model), rows)
+            counts[model.__tablename__] = len(rows)
+        flushed = self._size
+        self.clear()
+        flush_metrics.record_flush(counts, (time.perf_counter() - started) * 1000, threshold)
+        return flushed
+
+    def clear(self):
+        self._rows = {}
+        self._size = 0
+        self._since = None
+
+
+def get_buffer(session):
+    """取得（或建立）session 專屬的緩衝區，門檻讀取 WRITE_BUFFER_MAX_ROWS / WRITE_BUFFER_MAX_AGE"""
+    buffer = session.info.get('write_buffer')
+    if buffer is None:
+        config = current_app.config if has_app_context() else {}
+        buffer = WriteBuffer(
+            max_rows=config.get('WRITE_BUFFER_MAX_ROWS', DEFAULT_MAX_ROWS),
+            max_age=config.get('WRITE_BUFFER_MAX_AGE', DEFAULT_MAX_AGE),
+        )
+        session.info['write_buffer'] = buffer
+    return buffer
+
+
+def buffer_write(model, row):
+    """把一筆資料排入目前 session 的緩衝區，超過門檻時立即寫入 session"""
+    from app import db
+    session = db.session()
+    if not session.in_transaction():
+        session.begin()  # 緩衝資料必須跟著交易走，rollback 時才會一併丟棄
+    buffer = get_buffer(session)
+    buffer.add(model, row)
+    if buffer.due():
+        buffer.flush(session, threshold=True)
+
+
+def get_flush_metrics():
+    return flush_metrics.snapshot()
+
+
+@event.listens_for(Session, 'before_commit')
+def _flush_before_commit(session):
+    buffer = session.info.get('write_buffer')
+    if buffer:
+        buffer.flush(session)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_after_rollback(session, transaction):
+    # 只處理最外層交易；commit 時緩衝區已在 before_commit 清空，剩下的代表被 rollback 或 session 關閉
+    if transaction.parent is not None or transaction.nested:
+        return
+    buffer = session.info.get('write_buffer')
+    if buffer:
+        flush_metrics.record_discard(len(buffer))
+        buffer.clear()
@@ -0,0 +1,63 @@
+"""
+程序內的 LRU + TTL 快取
+
+介面刻意採用 Redis 指令的子集（get / mget / set(ex=) / delete / incr），
+正式環境可直接換成 redis.Redis 實例，測試或單機部署則用 LocalCache 替代。
+值由呼叫端自行序列化（例如 JSON 字串），與 Redis 的行為一致。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """執行緒安全的 LRU 快取，超過 maxsize 時淘汰最久未使用的項目，過期項目在讀取時移除"""
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (到期時間或 None, value)
+        self._counters = {}  # incr 的計數器不參與淘汰，避免版本號被淘汰後歸零
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        if key in self._counters:
+            return self._counters[key]
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (self._clock() + ex if ex else None, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None or self._counters.pop(key, None) is not None)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = self._counters[key] = int(self._get(key) or 0) + amount
+            self._data.pop(key, None)
+            return value
+
+    def __len__(self):
+        return len(self._data)
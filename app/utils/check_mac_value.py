@@ -1,32 +1,88 @@
+"""
+綠界 CheckMacValue 簽章
+
+演算法：參數依 key 排序串成 HashKey=...&k1=v1&...&HashIV=...，整串 URL encode（空白轉 '+'）後轉小寫，
+保留 - _ . ! * ( ) 不編碼，再做 SHA256 並轉大寫。
+
+ECPaySigner 在建立時就把 URL encode 展開成 256 個位元組的對照表：
+UTF-8 位元組以 latin-1 解碼成字串後，一次 str.translate 就完成編碼與轉小寫，
+結果與 quote_plus(raw).lower() 再逐一還原保留字元完全相同。
+每個 app 依 (HashKey, HashIV) 快取一個 signer（含預先編碼的前後綴），設定變更時自動重建。
+"""
 import hashlib
-import urllib.parse
+import hmac
+import string
+
+SAFE_CHARS = string.ascii_letters + string.digits + '-_.~' + '!*()'  # quote_plus 的非保留字元 + 綠界要求保留的字元
+
+
+def _build_table():
+    table = {}
+    for byte in range(256):
+        ch = chr(byte)
+        if ch in SAFE_CHARS:
+            table[byte] = ch.lower()
+        elif ch == ' ':
+            table[byte] = '+'
+        else:
+            table[byte] = f'%{byte:02x}'
+    return table
+
+
+class ECPaySigner:
+    """以 HashKey / HashIV 產生與驗證 CheckMacValue"""
+
+    _table = _build_table()
+
+    def __init__(self, hash_key, hash_iv):
+        self.hash_key = hash_key
+        self.hash_iv = hash_iv
+        # 編碼逐位元組進行，固定的前後綴可以先編碼；前綴直接預先餵進 SHA256，每次簽章只 copy()
+        self._prefix_hash = hashlib.sha256(self.encode(f"HashKey={hash_key}&").encode('ascii'))
+        self._suffix = self.encode(f"&HashIV={hash_iv}").encode('ascii')
+
+    def __reduce__(self):
+        # hashlib 物件無法 pickle；送到其他 process（對帳的 worker pool）時以 HashKey / HashIV 重建
+        return (type(self), (self.hash_key, self.hash_iv))
+
+    @classmethod
+    def encode(cls, raw):
+        """等同 quote_plus(raw, safe='!*()').lower()"""
+        return raw.encode('utf-8').decode('latin-1').translate(cls._table)
+
+    def sign(self, params):
+        """計算 CheckMacValue（params 中的 CheckMacValue 會被忽略）"""
+        raw = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if k != 'CheckMacValue')
+        digest = self._prefix_hash.copy()
+        digest.update(self.encode(raw).encode('ascii'))
+        digest.update(self._suffix)
+        return digest.hexdigest().upper()
+
+    def verify(self, data):
+        """以固定時間比較驗證 data 中的 CheckMacValue"""
+        received = data.get('CheckMacValue')
+        if not received:
+            return False
+        return hmac.compare_digest(self.sign(data).encode('ascii'), str(received).encode('utf-8'))
+
+    def verify_many(self, rows):
+        """逐筆驗證，回傳 [bool, ...]；供 process pool 以一個 chunk 為單位呼叫"""
+        return [self.verify(row) for row in rows]
+
+
+def get_signer(app=None):
+    """取得目前 app 的 signer；HashKey / HashIV 變更時重建"""
+    from flask import current_app
+    app = app or current_app._get_current_object()
+    key = (app.config.get('ECPAY_HASH_KEY'), app.config.get('ECPAY_HASH_IV'))
+    signer = app.extensions.get('ecpay_signer')
+    if signer is None or (signer.hash_key, signer.hash_iv) != key:
+        signer = app.extensions['ecpay_signer'] = ECPaySigner(*key)
+    return signer
+
 
 def verify_check_mac_value(data: dict) -> bool:
     """
     驗證 CheckMacValue
     """
-    from flask import current_app
-    
-    hash_key = current_app.config.get('ECPAY_HASH_KEY')
-    hash_iv = current_app.config.get('ECPAY_HASH_IV')
-    
-    # 移除 CheckMacValue 後排序參數
-    check_data = {k: v for k, v in data.items() if k != 'CheckMacValue'}
-    ordered = sorted(check_data.items())
-    raw = "&".join(f"{k}={v}" for k, v in ordered)
-    raw = f"HashKey={hash_key}&{raw}&HashIV={hash_iv}"
-    
-    # URL encode 並轉小寫
-    urlenc = urllib.parse.quote_plus(raw).lower()
-    
-    # 還原綠界要求的保留字元
-    for enc, ch in [
-        ('%2d','-'), ('%5f','_'), ('%2e','.'), 
-        ('%21','!'), ('%2a','*'), ('%28','('), ('%29',')'),
-    ]:
-        urlenc = urlenc.replace(enc, ch)
-    
-    # 使用 SHA256 (和 gen_mac 函數一致)
-    calculated_mac = hashlib.sha256(urlenc.encode('utf-8')).hexdigest().upper()
-    
-    return calculated_mac == data.get('CheckMacValue')
\ No newline at end of file
+    return get_signer().verify(data)
@@ -0,0 +1,132 @@
+"""
+JSON 回應編碼器
+
+取代 Flask 預設的 JSON provider（每次 json.dumps 都重新建立 encoder，datetime 等型別逐一經過 Python 的 default）：
+- 以 orjson 編碼（已列在 requirements.txt 與 requirements-render.txt），回應直接輸出 bytes；dataclass 由 orjson 原生處理
+- 環境中沒有 orjson 時退回標準函式庫，encoder 依參數組合預先建立並重複使用
+- 輸出格式與 Flask 預設相同：datetime / date 為 HTTP 日期（'Wed, 01 Jan 2025 00:00:00 GMT'），
+  Decimal、UUID 轉字串，依 sort_keys 排序；
+  設定 JSON_DATETIME_FORMAT = 'iso' 時改輸出 ISO 8601，由 orjson 原生處理，速度最快
+- 非 ASCII 字元直接輸出 UTF-8，不轉成 \\uXXXX
+
+可透過 JSON_PROVIDER 設定改用其他 provider（"module:Class"，建構參數為 app）；JSON_FAST_ENCODER=false 時不使用 orjson。
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time, timezone
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.utils import import_string
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用套件
+    orjson = None
+
+
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def http_date(value):
+    """
+    與 werkzeug.http.http_date 相同的輸出（naive datetime 視為 UTC），
+    直接格式化字串，不經過 email.utils，大量 datetime 時是編碼的主要成本
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+    else:
+        value = datetime(value.year, value.month, value.day)
+    return (f"{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} "
+            f"{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT")
+
+
+def _default_http(o):
+    """與 Flask 預設相同的型別轉換"""
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _default_iso(o):
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    return _default_http(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """以 orjson（或預先建立的標準函式庫 encoder）編碼的 JSON provider"""
+
+    ensure_ascii = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.datetime_format = app.config.get('JSON_DATETIME_FORMAT', 'http')
+        if self.datetime_format not in ('http', 'iso'):
+            raise ValueError("JSON_DATETIME_FORMAT 必須是 'http' 或 'iso'")
+        self.use_orjson = orjson is not None and app.config.get('JSON_FAST_ENCODER', True)
+        self.default = _default_iso if self.datetime_format == 'iso' else _default_http
+        self._encoders = {}
+
+    def _orjson_options(self, sort_keys, indent):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.datetime_format == 'http':
+            option |= orjson.OPT_PASSTHROUGH_DATETIME  # datetime 交給 default 轉成 HTTP 日期
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _encoder(self, sort_keys, indent, separators):
+        """依參數組合取得預先建立的標準函式庫 encoder"""
+        key = (sort_keys, indent, separators)
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = self._encoders[key] = json.JSONEncoder(
+                default=self.default, ensure_ascii=self.ensure_ascii, sort_keys=sort_keys,
+                indent=indent, separators=separators,
+            )
+        return encoder
+
+    def dumps_bytes(self, obj, sort_keys=None, indent=None, separators=None):
+        """編碼為 UTF-8 bytes"""
+        if sort_keys is None:
+            sort_keys = self.sort_keys
+        if self.use_orjson and indent in (None, 2):
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(sort_keys, indent))
+            except orjson.JSONEncodeError:
+                pass  # orjson 不支援的值（例如超過 64 位元的整數），交給標準函式庫處理或回報錯誤
+        return self._encoder(sort_keys, indent, separators).encode(obj).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {'sort_keys', 'indent', 'separators'}:
+            kwargs.setdefault('default', self.default)
+            return super().dumps(obj, **kwargs)  # 其他參數（cls 等）維持 Flask 預設行為
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = self.dumps_bytes(obj, indent=2)
+        else:
+            body = self.dumps_bytes(obj, separators=(',', ':'))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """在 create_app 換上 JSON provider，可由 JSON_PROVIDER 設定替換"""
+    provider_class = app.config.get('JSON_PROVIDER') or FastJSONProvider
+    if isinstance(provider_class, str):
+        provider_class = import_string(provider_class)
+    app.json = provider_class(app)
+    return app.json
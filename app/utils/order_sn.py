@@ -0,0 +1,108 @@
+"""
+訂單編號配置器
+
+預設格式：OMS + UTC 時間(14) + 節點編號(2) + 程序 PID(7) + 程序內序號(4)
+
+唯一性來源：
+- 不同主機以 ORDER_SN_NODE_ID 區分（每台主機設定不同值，0~99）
+- 同一主機的不同 worker 以 PID 區分
+- 同一程序同一秒內以序號區分，用完 10000 號就等到下一秒
+- 程序啟動的那一秒不配號，避免 PID 被重複使用時與前一個程序同秒撞號
+- 時鐘倒退時沿用上次的秒數繼續配號，不會產生重複
+
+全程不查資料庫；orders.order_sn 的 unique constraint 仍是最後防線。
+可透過 ORDER_SN_ALLOCATOR 設定改用自訂配置器（"module:factory"，factory(app) 回傳具 allocate() 的物件）。
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from werkzeug.utils import import_string
+
+SEQ_LIMIT = 10000  # 每程序每秒可配的號碼數（序號 4 碼）
+
+_process_floors = {}  # {pid: 程序第一次建立配置器的秒數}，同一程序重建 app 時不必再等待
+
+
+def _process_floor(clock):
+    pid = os.getpid()
+    if pid not in _process_floors:
+        _process_floors[pid] = int(clock())
+    return _process_floors[pid]
+
+
+class OrderSnAllocator(ABC):
+    """訂單編號配置器介面；子類別沒有實作 allocate 時在建立時就會失敗"""
+
+    @abstractmethod
+    def allocate(self):
+        """回傳一組新的訂單編號字串"""
+
+
+class TimeSequenceAllocator(OrderSnAllocator):
+    """時間 + 節點 + PID + 程序內序號，不需查詢資料庫"""
+
+    def __init__(self, prefix='OMS', node_id=0, clock=time.time, sleep=time.sleep, floor=None):
+        if not 0 <= int(node_id) <= 99:
+            raise ValueError("ORDER_SN_NODE_ID 必須介於 0 到 99")
+        self.prefix = prefix
+        self.node_id = int(node_id)
+        self._clock = clock
+        self._sleep = sleep
+        self._fixed_floor = floor
+        self._lock = threading.Lock()
+        self._reset()
+
+    @classmethod
+    def from_app(cls, app):
+        return cls(
+            prefix=app.config.get('ORDER_SN_PREFIX', 'OMS'),
+            node_id=app.config.get('ORDER_SN_NODE_ID', 0),
+        )
+
+    def _reset(self):
+        """（重新）綁定目前程序：gunicorn preload 後 fork 出的 worker 會走到這裡"""
+        self._pid = os.getpid()
+        # 程序啟動的這一秒不配號
+        self._floor = self._fixed_floor if self._fixed_floor is not None else _process_floor(self._clock)
+        self._second = self._floor
+        self._seq = 0
+
+    def allocate(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset()
+            while True:
+                now = int(self._clock())
+                if now > self._second:
+                    self._second, self._seq = now, 0
+                if self._second > self._floor and self._seq < SEQ_LIMIT:
+                    break
+                # 仍在啟動那一秒或本秒序號已用完，等到下一秒
+                self._sleep(max(self._second + 1 - self._clock(), 0.001))
+            seq = self._seq
+            self._seq += 1
+            stamp = datetime.fromtimestamp(self._second, timezone.utc).strftime('%Y%m%d%H%M%S')
+            return f"{self.prefix}{stamp}{self.node_id:02d}{self._pid % 10_000_000:07d}{seq:04d}"
+
+
+def init_order_sn_allocator(app):
+    """在 create_app 建立配置器，放在 app.extensions 供各請求共用"""
+    factory = app.config.get('ORDER_SN_ALLOCATOR')
+    if factory:
+        if isinstance(factory, str):
+            factory = import_string(factory)
+        allocator = factory(app)
+        if not callable(getattr(allocator, 'allocate', None)):
+            raise TypeError(f"ORDER_SN_ALLOCATOR 回傳的物件沒有 allocate()：{allocator!r}")
+    else:
+        allocator = TimeSequenceAllocator.from_app(app)
+    app.extensions['order_sn_allocator'] = allocator
+    return allocator
+
+
+def allocate_order_sn():
+    """取得一組新的訂單編號"""
+    return current_app.extensions['order_sn_allocator'].allocate()
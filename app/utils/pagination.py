@@ -0,0 +1,66 @@
+"""
+Keyset（游標）分頁工具
+
+cursor 為 (排序欄位值, id) 的 JSON 陣列經 urlsafe base64 編碼，
+查詢時轉成 (col < v) OR (col = v AND id < last_id) 的範圍條件，
+可直接走 (col, id) 複合索引，深頁數也不需要 OFFSET 掃描。
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_
+
+
+def encode_cursor(*values):
+    """把排序鍵編成不透明的 cursor 字串，datetime 以 ISO 格式保存"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """依 types（datetime / int / float / str）還原 cursor，格式錯誤時拋出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("cursor 格式錯誤")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("cursor 格式錯誤")
+    try:
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except (TypeError, ValueError):
+        raise ValueError("cursor 格式錯誤")
+
+
+def keyset_filter(sort_col, id_col, sort_value, last_id, desc=True):
+    """回傳「排在 (sort_value, last_id) 之後」的條件"""
+    if desc:
+        return or_(sort_col < sort_value, and_(sort_col == sort_value, id_col < last_id))
+    return or_(sort_col > sort_value, and_(sort_col == sort_value, id_col > last_id))
+
+
+def keyset_order(sort_col, id_col, desc=True):
+    """與 keyset_filter 對應的排序（id 作為同值時的決勝欄位）"""
+    if desc:
+        return (sort_col.desc(), id_col.desc())
+    return (sort_col.asc(), id_col.asc())
+
+
+def keyset_page(q, sort_col, id_col, limit, cursor=None, desc=True, sort_type=datetime):
+    """
+    套用游標條件與排序，多取一筆判斷是否還有下一頁
+    回傳 (rows, next_cursor)；rows 必須有 sort_col 與 id 對應的屬性
+    """
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_type, int)
+        q = q.filter(keyset_filter(sort_col, id_col, sort_value, last_id, desc))
+    rows = q.order_by(*keyset_order(sort_col, id_col, desc)).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
@@ -0,0 +1,145 @@
+"""
+每個請求的 SQL 統計
+
+透過 SQLAlchemy engine 事件（before/after_cursor_execute）記錄請求內的查詢數、資料庫總耗時與最慢的一條 SQL：
+- 回應加上 Server-Timing header，瀏覽器開發者工具可直接看到
+- 依端點累計於 query_metrics，由 /metrics 輸出
+- 端點可用 @query_budget(n) 宣告查詢數上限；QUERY_BUDGET_STRICT 開啟時（測試環境）超過上限直接拋出例外，
+  正式環境只記錄 warning，用來在上線前抓出 N+1 回歸
+"""
+import threading
+import time
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_SQL_PREVIEW = 200  # 最慢 SQL 只保留前幾個字元
+
+
+class QueryBudgetExceeded(AssertionError):
+    """端點執行的查詢數超過 @query_budget 宣告的上限"""
+
+
+class RequestSqlStats:
+    """單一請求的 SQL 統計"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement[:SLOW_SQL_PREVIEW]
+
+    def server_timing(self):
+        return (f'db;dur={self.total_ms:.2f};desc="{self.count} queries", '
+                f'db-slowest;dur={self.slowest_ms:.2f}')
+
+
+class QueryMetrics:
+    """程序層級、依端點累計的 SQL 統計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, stats):
+        with self._lock:
+            m = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0,
+                'db_ms': 0.0, 'max_db_ms': 0.0, 'slowest_ms': 0.0, 'slowest_sql': None,
+            })
+            m['requests'] += 1
+            m['queries'] += stats.count
+            m['max_queries'] = max(m['max_queries'], stats.count)
+            m['db_ms'] += stats.total_ms
+            m['max_db_ms'] = max(m['max_db_ms'], stats.total_ms)
+            if stats.slowest_ms >= m['slowest_ms']:
+                m['slowest_ms'] = stats.slowest_ms
+                m['slowest_sql'] = stats.slowest_sql
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: dict(
+                    m,
+                    avg_queries=round(m['queries'] / m['requests'], 2),
+                    avg_db_ms=round(m['db_ms'] / m['requests'], 3),
+                    db_ms=round(m['db_ms'], 3),
+                    max_db_ms=round(m['max_db_ms'], 3),
+                    slowest_ms=round(m['slowest_ms'], 3),
+                )
+                for endpoint, m in self.endpoints.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+
+query_metrics = QueryMetrics()
+
+
+def current_sql_stats():
+    """目前請求的統計；不在請求中時回傳 None"""
+    return g.get('sql_stats') if has_app_context() else None
+
+
+def query_budget(limit):
+    """宣告端點的查詢數上限（不含在 after_request 之後才執行的串流輸出）"""
+    def decorator(view):
+        view.query_budget = limit  # jwt_required 等以 functools.wraps 包裝的裝飾器會一併複製此屬性
+        return view
+    return decorator
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    stats = current_sql_stats()
+    if stats is not None and started is not None:
+        stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+def _check_budget(stats):
+    view = current_app.view_functions.get(request.endpoint)
+    limit = getattr(view, 'query_budget', None)
+    if limit is None or stats.count <= limit:
+        return
+    message = f"{request.endpoint} 執行了 {stats.count} 次查詢，超過上限 {limit}"
+    if current_app.config.get('QUERY_BUDGET_STRICT'):
+        raise QueryBudgetExceeded(message)
+    current_app.logger.warning(message)
+
+
+def init_query_metrics(app):
+    """在 create_app 註冊請求前後的掛勾"""
+
+    @app.before_request
+    def _start_sql_stats():
+        if current_app.config.get('QUERY_METRICS_ENABLED', True):
+            g.sql_stats = RequestSqlStats()
+
+    @app.after_request
+    def _finish_sql_stats(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        query_metrics.record(request.endpoint or 'unknown', stats)
+        response.headers.add('Server-Timing', stats.server_timing())
+        _check_budget(stats)
+        return response
+
+    @app.teardown_request
+    def _discard_sql_stats(exc):
+        g.pop('sql_stats', None)
@@ -0,0 +1,32 @@
+"""
+查詢結果 row 的輕量序列化
+
+列表類端點直接查詢需要的欄位（projection），再以 compile_row_serializer 產生的函式轉成 dict，
+不經過 ORM 物件與 marshmallow 逐列、逐欄位的 dump。
+欄位清單在模組載入時展開成一段 dict literal 的程式碼並編譯一次，序列化時只剩索引取值與必要的型別轉換。
+"""
+
+
+def isoformat(value):
+    """與 marshmallow fields.DateTime / fields.Date 預設的 'iso' 格式相同"""
+    return value.isoformat()
+
+
+def compile_row_serializer(fields, start=0):
+    """
+    fields: [(輸出欄位名, 轉換函式或 None), ...]，依序對應 row[start], row[start + 1], ...
+    回傳 serialize(row) -> dict；值為 None 時不做轉換直接輸出 None（與 marshmallow 相同）
+    """
+    env = {}
+    items = []
+    for offset, (key, convert) in enumerate(fields):
+        value = f"row[{start + offset}]"
+        if convert is None:
+            items.append(f"{key!r}: {value}")
+        else:
+            env[f"_convert{offset}"] = convert
+            items.append(f"{key!r}: None if {value} is None else _convert{offset}({value})")
+    source = "def serialize(row):\n    return {" + ", ".join(items) + "}\n"
+    exec(compile(source, f"<row serializer {', '.join(key for key, _ in fields)}>", "exec"), env)
+    return env['serialize']
+
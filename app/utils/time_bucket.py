@@ -0,0 +1,135 @@
+"""
+報表的時間分組（日 / 週 / 月 / 年），依資料庫方言產生 SQL
+
+created_at 以 UTC（不含時區）儲存，報表依 REPORT_TIMEZONE 的當地日期分組：
+- 日期區間一律轉成 created_at 的範圍條件（>= 起日 0 點、< 迄日隔天 0 點，換算回 UTC），
+  不對欄位套函式，可走 ix_orders_created_at_id
+- 分組標籤：day / week 為 YYYY-MM-DD（week 為該週週一），month 為 YYYY-MM，year 為 YYYY
+  SQLite 用 strftime / date、MySQL 用 DATE_FORMAT、PostgreSQL 用 date_trunc + to_char
+- 時區：PostgreSQL 以時區名稱換算（含日光節約時間）；SQLite / MySQL 以區間起點當下的 UTC 偏移量換算，
+  沒有日光節約時間的時區（例如 Asia/Taipei）結果完全一致
+"""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app, has_app_context
+from sqlalchemy import func, literal_column, cast, Date
+import re
+
+UNITS = ('day', 'week', 'month', 'year')
+
+_DAY_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+_STRFTIME = {'day': '%Y-%m-%d', 'week': '%Y-%m-%d', 'month': '%Y-%m', 'year': '%Y'}
+_TO_CHAR = {'day': 'YYYY-MM-DD', 'week': 'YYYY-MM-DD', 'month': 'YYYY-MM', 'year': 'YYYY'}
+_LABEL_LENGTH = {'day': 10, 'week': 10, 'month': 7, 'year': 4}
+
+
+def is_day(value):
+    return isinstance(value, str) and bool(_DAY_RE.fullmatch(value))
+
+
+def check_unit(unit):
+    if unit not in UNITS:
+        raise ValueError(f"period 只支援 {', '.join(UNITS)}")
+    return unit
+
+
+def report_timezone(name=None):
+    """報表時區，預設讀取 REPORT_TIMEZONE（未設定為 UTC）"""
+    if name is None:
+        name = current_app.config.get('REPORT_TIMEZONE', 'UTC') if has_app_context() else 'UTC'
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"無效的時區：{name}")
+
+
+def utc_offset_minutes(tz, at=None):
+    """tz 在 at（UTC，不含時區；預設現在）當下的 UTC 偏移分鐘數"""
+    at = (at or datetime.utcnow()).replace(tzinfo=timezone.utc)
+    return int(at.astimezone(tz).utcoffset().total_seconds() // 60)
+
+
+def is_utc(tz):
+    """整年都沒有偏移（UTC 或同義的時區）"""
+    return all(utc_offset_minutes(tz, datetime(2000, month, 1)) == 0 for month in (1, 7))
+
+
+def local_day_start(day, tz):
+    """當地日期 YYYY-MM-DD 的 0 點，換算成 UTC（不含時區）"""
+    local = datetime.fromisoformat(day).replace(tzinfo=tz)
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def range_bounds(start, end, tz):
+    """
+    日期條件轉成 created_at 的 (下限, 上限, 上限是否包含)
+    YYYY-MM-DD 視為當地整日（結束日包含當天）；帶時間的字串照原值比較
+    """
+    lower = upper = None
+    inclusive = False
+    if start:
+        lower = local_day_start(start, tz) if is_day(start) else start
+    if end:
+        if is_day(end):
+            upper = local_day_start((datetime.fromisoformat(end) + timedelta(days=1)).date().isoformat(), tz)
+        else:
+            upper, inclusive = end, True
+    return lower, upper, inclusive
+
+
+def range_filters(col, start, end, tz):
+    """回傳 created_at 範圍條件的 list，可直接放進 where / filter"""
+    lower, upper, inclusive = range_bounds(start, end, tz)
+    filters = []
+    if lower is not None:
+        filters.append(col >= lower)
+    if upper is not None:
+        filters.append(col <= upper if inclusive else col < upper)
+    return filters
+
+
+def _pg_literal(value):
+    # 格式、單位與時區名稱直接寫進 SQL：伺服器端綁定參數時，SELECT 與 GROUP BY 的運算式才會被視為相同
+    return literal_column(f"'{value}'")
+
+
+def _sqlite_modifier(minutes):
+    return f'{minutes:+d} minutes'
+
+
+def bucket_expr(col, unit, dialect, tz, at=None):
+    """
+    timestamp 欄位（UTC）依 tz 的當地時間分組的標籤運算式
+    at: 計算 SQLite / MySQL 偏移量的時間點（通常為查詢區間的起點）
+    """
+    check_unit(unit)
+    minutes = utc_offset_minutes(tz, at)
+    if dialect == 'sqlite':
+        args = (col, _sqlite_modifier(minutes)) if minutes else (col,)
+        if unit == 'week':
+            return func.date(*args, 'weekday 0', '-6 days')  # 下一個（或當天）週日往回 6 天 = 週一
+        return func.strftime(_STRFTIME[unit], *args)
+    if dialect == 'mysql':
+        local = func.date_add(col, literal_column(f'INTERVAL {minutes} MINUTE')) if minutes else col
+        if unit == 'week':
+            local = func.subdate(local, func.weekday(local))  # WEEKDAY：週一為 0
+        return func.date_format(local, _STRFTIME[unit])
+    if dialect == 'postgresql':
+        local = col if is_utc(tz) else func.timezone(_pg_literal(tz.key), func.timezone(_pg_literal('UTC'), col))
+        return func.to_char(func.date_trunc(_pg_literal(unit), local), _pg_literal(_TO_CHAR[unit]))
+    raise NotImplementedError(f"不支援的資料庫：{dialect}")
+
+
+def day_bucket_expr(col, unit, dialect):
+    """已是 YYYY-MM-DD 字串的日期欄位（例如每日彙總表的 day）的分組標籤運算式"""
+    check_unit(unit)
+    if unit != 'week':
+        return col if unit == 'day' else func.substr(col, 1, _LABEL_LENGTH[unit])
+    if dialect == 'sqlite':
+        return func.date(col, 'weekday 0', '-6 days')
+    if dialect == 'mysql':
+        return func.date_format(func.subdate(col, func.weekday(col)), _STRFTIME[unit])
+    if dialect == 'postgresql':
+        return func.to_char(func.date_trunc(_pg_literal(unit), cast(col, Date)), _pg_literal(_TO_CHAR[unit]))
+    raise NotImplementedError(f"不支援的資料庫：{dialect}")
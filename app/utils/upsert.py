@@ -0,0 +1,41 @@
+"""
+計數類資料表的累加寫入
+
+彙總表、未讀數這類「主鍵 + 計數欄位」的表，以 upsert 把差額累加上去：
+資料列不存在時新增，存在時欄位 += 差額，一條語句處理多筆，不需要先查詢再決定 INSERT 或 UPDATE。
+"""
+from sqlalchemy import update, insert
+
+
+def increment(session, table, keys, rows):
+    """
+    rows: [{key 欄位..., 計數欄位: 差額, ...}, ...]，每列的欄位需相同
+    SQLite / PostgreSQL 用 ON CONFLICT，MySQL 用 ON DUPLICATE KEY UPDATE，其他資料庫逐筆 UPDATE 後補 INSERT
+    """
+    values = [c for c in rows[0] if c not in keys]
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: table.c[c] + stmt.excluded[c] for c in values},
+        )
+        session.execute(stmt, rows)
+    elif dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in values})
+        session.execute(stmt, rows)
+    else:
+        for row in rows:
+            result = session.execute(
+                update(table)
+                .where(*(table.c[k] == row[k] for k in keys))
+                .values({c: table.c[c] + row[c] for c in values})
+            )
+            if not result.rowcount:
+                session.execute(insert(table).values(row))
@@ -20,6 +20,55 @@ class BaseConfig:
     # Auto-Return 中繼 URL：綠界將 POST 自動導回到這裡
     ECPAY_ORDER_RETURN_URL  = os.getenv("ECPAY_ORDER_RETURN_URL")
     
+    # 訂單編號配置器：多台主機部署時每台設定不同的 ORDER_SN_NODE_ID（0~99）
+    ORDER_SN_NODE_ID        = int(os.getenv("ORDER_SN_NODE_ID", "0"))
+    # 自訂配置器 "module:factory"，未設定時使用時間 + 節點 + PID + 序號
+    ORDER_SN_ALLOCATOR      = os.getenv("ORDER_SN_ALLOCATOR")
+
+    # 通知 / 操作紀錄延遲批次寫入的門檻（筆數、秒數），超過時不等 commit 先寫入
+    WRITE_BUFFER_MAX_ROWS   = int(os.getenv("WRITE_BUFFER_MAX_ROWS", "500"))
+    WRITE_BUFFER_MAX_AGE    = float(os.getenv("WRITE_BUFFER_MAX_AGE", "5"))
+
+    # 報表 / 儀表板改讀每日彙總表；上線前先執行 python scripts/rebuild_sales_rollups.py 回填
+    SALES_ROLLUP_READS      = os.getenv("SALES_ROLLUP_READS", "false").lower() in ("1", "true", "yes")
+
+    # 報表 / 儀表板依此時區的當地日期分組與篩選（例如 Asia/Taipei）；created_at 一律以 UTC 儲存
+    # 每日彙總表以 UTC 日期為單位，設定非 UTC 時區時報表改查原始資料表
+    REPORT_TIMEZONE         = os.getenv("REPORT_TIMEZONE", "UTC")
+
+    # 儀表板統計依角色快取的秒數（0 表示不快取），後端與商品目錄快取共用
+    DASHBOARD_CACHE_TTL     = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+
+    # 每個請求的 SQL 統計（Server-Timing header、/metrics）；QUERY_BUDGET_STRICT 開啟時超過 @query_budget 直接報錯
+    QUERY_METRICS_ENABLED   = os.getenv("QUERY_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    QUERY_BUDGET_STRICT     = False
+
+    # 商品目錄快取：預設為程序內 LRU；設定 CATALOG_CACHE_URL（redis://...）時改用 Redis
+    CATALOG_CACHE_ENABLED   = os.getenv("CATALOG_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    CATALOG_CACHE_URL       = os.getenv("CATALOG_CACHE_URL")
+    CATALOG_CACHE_BACKEND   = os.getenv("CATALOG_CACHE_BACKEND")  # 自訂後端 "module:factory"，factory(app) 回傳相容 Redis 指令的物件
+    CATALOG_CACHE_TTL       = int(os.getenv("CATALOG_CACHE_TTL", "60"))
+    CATALOG_CACHE_MAXSIZE   = int(os.getenv("CATALOG_CACHE_MAXSIZE", "1024"))
+
+    # JSON 回應編碼：有安裝 orjson 時自動使用；datetime 預設維持 Flask 的 HTTP 日期格式，設為 iso 時輸出 ISO 8601
+    JSON_FAST_ENCODER       = os.getenv("JSON_FAST_ENCODER", "true").lower() in ("1", "true", "yes")
+    JSON_DATETIME_FORMAT    = os.getenv("JSON_DATETIME_FORMAT", "http")
+    JSON_PROVIDER           = os.getenv("JSON_PROVIDER")  # 自訂 provider "module:Class"
+
+    # 即時事件（/events/stream）：預設為程序內 pub/sub，多個 worker process 時設定 EVENT_BROKER_URL（redis://...）
+    WEB_CONCURRENCY         = int(os.getenv("WEB_CONCURRENCY", "1"))  # gunicorn worker 數；大於 1 時必須設定 EVENT_BROKER_URL
+    EVENT_BROKER_URL        = os.getenv("EVENT_BROKER_URL")
+    EVENT_BROKER_BACKEND    = os.getenv("EVENT_BROKER_BACKEND")  # 自訂後端 "module:factory"，factory(app) 回傳 broker
+    EVENT_BROKER_HISTORY    = int(os.getenv("EVENT_BROKER_HISTORY", "100"))  # 每個頻道保留供重連補送的事件數
+    SSE_QUEUE_SIZE          = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+    SSE_HEARTBEAT           = float(os.getenv("SSE_HEARTBEAT", "15"))  # 秒
+    SSE_MAX_DURATION        = float(os.getenv("SSE_MAX_DURATION", "300"))  # 秒，逾時後由客戶端重連
+    SSE_RETRY_MS            = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+    # 操作紀錄保留天數：python scripts/archive_operation_logs.py 把更舊的資料封存成 gzip JSON Lines 後刪除
+    OPERATION_LOG_RETENTION_DAYS = int(os.getenv("OPERATION_LOG_RETENTION_DAYS", "90"))
+    OPERATION_LOG_ARCHIVE_DIR    = os.getenv("OPERATION_LOG_ARCHIVE_DIR", "archive")
+
     # 例外訊息往外傳遞，方便除錯  
     PROPAGATE_EXCEPTIONS = True  
 
@@ -39,6 +88,7 @@ class TestingConfig(BaseConfig):
     """測試環境設定"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    QUERY_BUDGET_STRICT = True  # 測試時超過查詢數上限直接失敗
 
 class ProductionConfig(BaseConfig):
     """正式環境設定"""
@@ -0,0 +1,21 @@
+# gunicorn.conf.py
+"""
+Gunicorn 設定（Dockerfile 以 gunicorn --config gunicorn.conf.py run:app 啟動）
+
+gevent worker：/events/stream 的 SSE 長連線只佔一個 greenlet，等待事件時不會佔住執行緒，
+一般 API 請求不會被大量開著的儀表板卡住；psycopg2 以 psycogreen 改成協作式，查詢時會讓出給其他請求。
+worker 數由 WEB_CONCURRENCY 決定（預設 1）；大於 1 時必須設定 EVENT_BROKER_URL（Redis），
+否則程序內的 LocalBroker 無法把事件送到其他 worker 的連線，create_app 會拒絕啟動。
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+worker_class = 'gevent'
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = 120
+
+
+def post_fork(server, worker):
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
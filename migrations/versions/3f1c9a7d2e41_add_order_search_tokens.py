@@ -0,0 +1,35 @@
+"""add order_search_tokens
+
+Revision ID: 3f1c9a7d2e41
+Revises: b65935eb60df
+Create Date: 2026-10-18 10:12:31.402915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2e41'
+down_revision = 'b65935eb60df'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_search_tokens',
+    sa.Column('token', sa.String(length=32), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('token', 'order_id')
+    )
+    with op.batch_alter_table('order_search_tokens', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_search_tokens_order_id'), ['order_id'], unique=False)
+    # 既有訂單的索引請執行 python scripts/rebuild_order_search.py 回填
+
+
+def downgrade():
+    with op.batch_alter_table('order_search_tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_search_tokens_order_id'))
+
+    op.drop_table('order_search_tokens')
@@ -0,0 +1,51 @@
+"""add materialized path to categories
+
+Revision ID: 3f7b1d9e2c48
+Revises: 9c4e2b7a5d13
+Create Date: 2026-10-18 16:02:41.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7b1d9e2c48'
+down_revision = '9c4e2b7a5d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path', sa.String(length=255), nullable=True))
+        batch_op.create_index('ix_categories_path', ['path'], unique=False, postgresql_ops={'path': 'varchar_pattern_ops'})
+
+    # 回填既有分類的 path（分類數量不多，一次讀出計算）
+    conn = op.get_bind()
+    categories = sa.table('categories', sa.column('id', sa.Integer), sa.column('parent_id', sa.Integer), sa.column('path', sa.String))
+    parents = dict(conn.execute(sa.select(categories.c.id, categories.c.parent_id)).all())
+    paths = {}
+
+    def path_of(cid, seen=()):
+        if cid not in paths:
+            parent_id = parents.get(cid)
+            if parent_id is None or parent_id not in parents or parent_id in seen:
+                paths[cid] = f'/{cid}/'
+            else:
+                paths[cid] = f'{path_of(parent_id, seen + (cid,))}{cid}/'
+        return paths[cid]
+
+    for cid in parents:
+        path_of(cid)
+    if paths:
+        conn.execute(
+            categories.update().where(categories.c.id == sa.bindparam('b_id')).values(path=sa.bindparam('b_path')),
+            [{'b_id': cid, 'b_path': path} for cid, path in paths.items()]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_index('ix_categories_path')
+        batch_op.drop_column('path')
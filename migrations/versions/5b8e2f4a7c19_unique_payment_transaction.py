@@ -0,0 +1,43 @@
+"""unique payment (payment_method, transaction_id)
+
+Revision ID: 5b8e2f4a7c19
+Revises: 3f7b1d9e2c48
+Create Date: 2026-10-18 17:21:09.482113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2f4a7c19'
+down_revision = '3f7b1d9e2c48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 綠界重送通知先前會重複寫入付款紀錄：同一筆交易只保留最早的一筆
+    payments = sa.table('payments', sa.column('id', sa.Integer),
+                        sa.column('payment_method', sa.String), sa.column('transaction_id', sa.String))
+    conn = op.get_bind()
+    duplicates = conn.execute(
+        sa.select(payments.c.payment_method, payments.c.transaction_id, sa.func.min(payments.c.id))
+        .where(payments.c.transaction_id.isnot(None))
+        .group_by(payments.c.payment_method, payments.c.transaction_id)
+        .having(sa.func.count() > 1)
+    ).all()
+    for method, transaction_id, keep_id in duplicates:
+        conn.execute(payments.delete().where(
+            payments.c.payment_method == method,
+            payments.c.transaction_id == transaction_id,
+            payments.c.id != keep_id,
+        ))
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_payments_method_transaction', ['payment_method', 'transaction_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_payments_method_transaction', type_='unique')
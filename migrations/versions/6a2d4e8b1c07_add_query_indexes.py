@@ -0,0 +1,45 @@
+"""add composite indexes for query access patterns
+
+Revision ID: 6a2d4e8b1c07
+Revises: 3f1c9a7d2e41
+Create Date: 2026-10-18 11:03:47.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a2d4e8b1c07'
+down_revision = '3f1c9a7d2e41'
+branch_labels = None
+depends_on = None
+
+# (索引名稱, 資料表, 欄位) — 與 app/models 中 __table_args__ 宣告一致
+INDEXES = [
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at']),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at']),
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id']),
+    ('ix_orders_total_amount_id', 'orders', ['total_amount', 'id']),
+    ('ix_orders_customer_id', 'orders', ['customer_id']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_items_product_id_order_id', 'order_items', ['product_id', 'order_id']),
+    ('ix_order_histories_order_id_operated_at', 'order_histories', ['order_id', 'operated_at']),
+    ('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at']),
+    ('ix_operation_logs_user_id_created_at', 'operation_logs', ['user_id', 'created_at']),
+    ('ix_operation_logs_created_at', 'operation_logs', ['created_at']),
+    ('ix_payments_order_id', 'payments', ['order_id']),
+    ('ix_payments_created_at_id', 'payments', ['created_at', 'id']),
+    ('ix_products_category_id', 'products', ['category_id']),
+    ('ix_products_is_active_created_at', 'products', ['is_active', 'created_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,26 @@
+"""payment list index (status, created_at, id)
+
+Revision ID: 8d3a6c1f4e27
+Revises: 5b8e2f4a7c19
+Create Date: 2026-10-18 18:02:37.915204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3a6c1f4e27'
+down_revision = '5b8e2f4a7c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_status_created_at_id', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_status_created_at_id')
@@ -0,0 +1,46 @@
+"""add daily sales rollup tables
+
+Revision ID: 9c4e2b7a5d13
+Revises: 6a2d4e8b1c07
+Create Date: 2026-10-18 13:26:05.671342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e2b7a5d13'
+down_revision = '6a2d4e8b1c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_order_rollups',
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('customer_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'customer_id')
+    )
+    op.create_table('daily_product_rollups',
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('product_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('qty', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'product_id', 'status')
+    )
+    with op.batch_alter_table('daily_product_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_daily_product_rollups_product_id_day', ['product_id', 'day'], unique=False)
+    # 既有訂單請執行 python scripts/rebuild_sales_rollups.py 回填，再開啟 SALES_ROLLUP_READS
+
+
+def downgrade():
+    with op.batch_alter_table('daily_product_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_daily_product_rollups_product_id_day')
+
+    op.drop_table('daily_product_rollups')
+    op.drop_table('daily_order_rollups')
@@ -0,0 +1,51 @@
+"""notification states / reads, feed index
+
+Revision ID: c7e1a9d4b356
+Revises: 8d3a6c1f4e27
+Create Date: 2026-10-18 18:41:15.604839
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e1a9d4b356'
+down_revision = '8d3a6c1f4e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_states',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.Column('read_all_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('notification_reads',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('notification_id', sa.Integer(), nullable=False),
+    sa.Column('read_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'notification_id')
+    )
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_id_id', ['user_id', 'id'], unique=False)
+
+    # 回填個人通知的未讀數；全站通知原本共用一個 is_read，無法還原各使用者的已讀狀態，一律從未讀開始
+    op.execute(
+        "INSERT INTO notification_states (user_id, unread_count, read_all_id) "
+        "SELECT user_id, SUM(CASE WHEN is_read THEN 0 ELSE 1 END), 0 "
+        "FROM notifications WHERE user_id IS NOT NULL GROUP BY user_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_id_id')
+
+    op.drop_table('notification_reads')
+    op.drop_table('notification_states')
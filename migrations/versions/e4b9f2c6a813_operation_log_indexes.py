@@ -0,0 +1,43 @@
+"""operation log keyset indexes
+
+Revision ID: e4b9f2c6a813
+Revises: c7e1a9d4b356
+Create Date: 2026-10-18 19:20:52.377061
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b9f2c6a813'
+down_revision = 'c7e1a9d4b356'
+branch_labels = None
+depends_on = None
+
+# 新索引都以 (created_at, id) 結尾，對應 keyset 分頁的排序
+NEW_INDEXES = [
+    ('ix_operation_logs_created_at_id', ['created_at', 'id']),
+    ('ix_operation_logs_user_id_created_at_id', ['user_id', 'created_at', 'id']),
+    ('ix_operation_logs_target_created_at_id', ['target_type', 'target_id', 'created_at', 'id']),
+]
+OLD_INDEXES = [
+    ('ix_operation_logs_user_id_created_at', ['user_id', 'created_at']),
+    ('ix_operation_logs_created_at', ['created_at']),
+]
+
+
+def upgrade():
+    with op.batch_alter_table('operation_logs', schema=None) as batch_op:
+        for name, columns in NEW_INDEXES:
+            batch_op.create_index(name, columns, unique=False)
+        for name, columns in OLD_INDEXES:
+            batch_op.drop_index(name)  # 已被新索引的前綴涵蓋，少維護兩個索引
+
+
+def downgrade():
+    with op.batch_alter_table('operation_logs', schema=None) as batch_op:
+        for name, columns in OLD_INDEXES:
+            batch_op.create_index(name, columns, unique=False)
+        for name, columns in reversed(NEW_INDEXES):
+            batch_op.drop_index(name)
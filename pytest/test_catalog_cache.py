@@ -0,0 +1,201 @@
+# pytest/test_catalog_cache.py
+"""
+商品目錄快取測試 - 命中不查資料庫、異動後失效、rollback 不影響快取、LRU / TTL 與自訂後端
+"""
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import Product
+from app.services.catalog_cache import cached_products, init_catalog_cache, mark_products_changed
+from app.utils.cache import LocalCache
+
+
+@pytest.fixture
+def product_queries(app):
+    """記錄對 products 資料表的 SELECT"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM products' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class FakeRedis:
+    """模擬 redis.Redis：值一律以 bytes 回傳"""
+
+    def __init__(self, app=None):
+        self.store = LocalCache()
+
+    def get(self, key):
+        value = self.store.get(key)
+        return value if value is None else str(value).encode()
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        return self.store.set(key, value, ex=ex)
+
+    def delete(self, *keys):
+        return self.store.delete(*keys)
+
+    def incr(self, key, amount=1):
+        return self.store.incr(key, amount)
+
+
+class TestCatalogCache:
+    """商品目錄快取測試"""
+
+    def test_product_detail_hit(self, client, test_product, product_queries):
+        """測試第二次取得商品不再查詢資料庫"""
+        first = client.get(f'/products/{test_product.id}')
+        queried = len(product_queries)
+        second = client.get(f'/products/{test_product.id}')
+        assert first.status_code == second.status_code == 200
+        assert first.get_json() == second.get_json()
+        assert queried >= 1
+        assert len(product_queries) == queried
+
+    def test_product_not_found(self, client, app):
+        """測試不存在的商品仍回傳 404"""
+        assert client.get('/products/9999').status_code == 404
+        assert client.get('/products/9999').status_code == 404
+
+    def test_list_normalized_params(self, client, test_product, product_queries):
+        """測試查詢參數正規化後（順序、預設值）共用同一筆快取"""
+        client.get('/products?page=1&is_active=true')
+        queried = len(product_queries)
+        response = client.get('/products?is_active=true&page_size=20')
+        assert response.get_json()['total'] == 1
+        assert len(product_queries) == queried
+
+    def test_update_invalidates(self, client, admin_headers, test_product):
+        """測試編輯商品後詳情與列表都拿到新資料"""
+        client.get(f'/products/{test_product.id}')
+        client.get('/products')
+        client.put(f'/products/{test_product.id}', headers=admin_headers, json={'name': '新名稱'})
+        assert client.get(f'/products/{test_product.id}').get_json()['name'] == '新名稱'
+        assert client.get('/products').get_json()['data'][0]['name'] == '新名稱'
+
+    def test_create_and_batch_active_invalidate(self, client, admin_headers, test_product, test_category):
+        """測試新增商品、批次上下架後列表失效"""
+        assert client.get('/products?is_active=true').get_json()['total'] == 1
+        client.post('/products', headers=admin_headers, json={'name': '新商品', 'price': 50, 'category_id': test_category.id})
+        assert client.get('/products?is_active=true').get_json()['total'] == 2
+        client.put('/products/batch/active', headers=admin_headers, json={'product_ids': [test_product.id], 'is_active': False})
+        assert client.get('/products?is_active=true').get_json()['total'] == 1
+
+    def test_delete_invalidates(self, client, admin_headers, test_product):
+        """測試刪除商品後快取的詳情失效"""
+        client.get(f'/products/{test_product.id}')
+        client.delete(f'/products/{test_product.id}', headers=admin_headers)
+        assert client.get(f'/products/{test_product.id}').status_code == 404
+
+    def test_stock_change_invalidates(self, client, admin_headers, test_product):
+        """測試庫存異動（Core UPDATE）後快取失效"""
+        client.get(f'/products/{test_product.id}')
+        client.put(f'/products/{test_product.id}/stock', headers=admin_headers, json={'delta': 5})
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 15
+
+    def test_order_invalidates_options(self, client, customer_headers, test_product):
+        """測試下單扣庫存後下拉選單的庫存同步更新"""
+        assert client.get('/products/options', headers=customer_headers).get_json()[0]['stock'] == 10
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [{'product_id': test_product.id, 'qty': 3}],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        assert response.status_code == 201
+        assert client.get('/products/options', headers=customer_headers).get_json()[0]['stock'] == 7
+
+    def test_rollback_discards_pending(self, client, app, test_product):
+        """測試 rollback 的異動不會讓快取失效"""
+        client.get(f'/products/{test_product.id}')
+        backend = app.extensions['catalog_cache']
+        version = backend.get('catalog:version:list')
+        mark_products_changed([test_product.id])
+        db.session.rollback()
+        db.session.commit()
+        assert backend.get('catalog:version:list') == version
+        assert len(backend) == 1
+
+    def test_cached_products_loads_missing_only(self, client, test_product, test_category):
+        """測試批次取得商品時只查詢未命中的 id，找不到的商品不快取"""
+        other = Product(name="其他商品", price=20.0, stock=1, category_id=test_category.id)
+        db.session.add(other)
+        db.session.commit()
+        client.get(f'/products/{test_product.id}')
+        requested = []
+
+        def load(missing):
+            requested.append(list(missing))
+            return {pid: {'id': pid} for pid in missing if pid == other.id}
+
+        assert set(cached_products([test_product.id, other.id, 9999], load)) == {test_product.id, other.id}
+        assert requested == [[other.id, 9999]]
+        cached_products([other.id, 9999], load)
+        assert requested[-1] == [9999]
+
+    def test_disabled(self, client, app, test_product, product_queries):
+        """測試關閉快取時每次都查詢資料庫"""
+        app.config['CATALOG_CACHE_ENABLED'] = False
+        client.get(f'/products/{test_product.id}')
+        queried = len(product_queries)
+        client.get(f'/products/{test_product.id}')
+        assert len(product_queries) > queried
+
+    def test_custom_backend(self, client, app, admin_headers, test_product):
+        """測試以 CATALOG_CACHE_BACKEND 指定相容 Redis 的後端（回傳 bytes）"""
+        app.config['CATALOG_CACHE_BACKEND'] = FakeRedis
+        backend = init_catalog_cache(app)
+        assert isinstance(backend, FakeRedis)
+        client.get(f'/products/{test_product.id}')
+        client.put(f'/products/{test_product.id}', headers=admin_headers, json={'price': 80})
+        assert client.get(f'/products/{test_product.id}').get_json()['price'] == 80
+        assert backend.store.get('catalog:version:list') == 1
+
+    def test_metrics_hit_ratio(self, client, admin_headers, test_product):
+        """測試 /metrics 輸出快取命中統計"""
+        client.get(f'/products/{test_product.id}')
+        client.get(f'/products/{test_product.id}')
+        data = client.get('/metrics', headers=admin_headers).get_json()['catalog_cache']
+        assert data['hits'] >= 1
+        assert data['misses'] >= 1
+
+
+class TestLocalCache:
+    """程序內快取單元測試"""
+
+    def test_lru_eviction(self):
+        """測試超過容量時淘汰最久未使用的項目"""
+        cache = LocalCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.mget(['a', 'b', 'c']) == [1, None, 3]
+
+    def test_ttl(self):
+        """測試過期項目讀取時視為不存在"""
+        now = [100.0]
+        cache = LocalCache(clock=lambda: now[0])
+        cache.set('a', 1, ex=10)
+        assert cache.get('a') == 1
+        now[0] += 10
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_counters_not_evicted(self):
+        """測試版本計數器不會被 LRU 淘汰"""
+        cache = LocalCache(maxsize=1)
+        assert cache.incr('version') == 1
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.incr('version') == 2
+        assert cache.delete('version') == 1
+        assert cache.get('version') is None
@@ -0,0 +1,132 @@
+# pytest/test_category_tree.py
+"""
+分類樹測試 - 物化路徑維護、整棵樹單次查詢與快取、商品依分類（含子分類）篩選
+"""
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import Category, Product
+from app.services.category_service import rebuild_category_paths
+
+
+@pytest.fixture
+def category_queries(app):
+    """記錄對 categories 資料表的 SELECT"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM categories' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def category_chain(client, admin_headers):
+    """建立四層分類：電子產品 > 手機 > 智慧型手機 > 旗艦機，回傳各層 id"""
+    ids = []
+    for name in ['電子產品', '手機', '智慧型手機', '旗艦機']:
+        response = client.post('/categories', headers=admin_headers,
+                               json={'name': name, 'parent_id': ids[-1] if ids else None})
+        assert response.status_code == 201
+        ids.append(response.get_json()['id'])
+    return ids
+
+
+def path_of(cid):
+    return db.session.get(Category, cid).path
+
+
+class TestCategoryTree:
+    """分類樹測試"""
+
+    def test_path_on_create(self, app, category_chain):
+        """測試新增分類時依上層計算路徑"""
+        a, b, c, d = category_chain
+        assert path_of(a) == f'/{a}/'
+        assert path_of(d) == f'/{a}/{b}/{c}/{d}/'
+
+    def test_parent_and_child_in_same_flush(self, app):
+        """測試同一次 flush 新增上下層分類"""
+        parent = Category(name='上層')
+        child = Category(name='下層', parent=parent)
+        db.session.add_all([child, parent])
+        db.session.commit()
+        assert child.path == f'/{parent.id}/{child.id}/'
+
+    def test_move_subtree(self, client, admin_headers, category_chain, test_category):
+        """測試搬移分類時整棵子樹的路徑一起改寫"""
+        a, b, c, d = category_chain
+        response = client.put(f'/categories/{b}', headers=admin_headers, json={'parent_id': test_category.id})
+        assert response.status_code == 200
+        db.session.expire_all()
+        assert path_of(b) == f'/{test_category.id}/{b}/'
+        assert path_of(d) == f'/{test_category.id}/{b}/{c}/{d}/'
+        assert path_of(a) == f'/{a}/'
+
+    def test_move_under_descendant_rejected(self, client, admin_headers, category_chain):
+        """測試不可將分類移到自己的子孫之下"""
+        a, b, c, d = category_chain
+        response = client.put(f'/categories/{b}', headers=admin_headers, json={'parent_id': d})
+        assert response.status_code == 400
+        response = client.put(f'/categories/{b}', headers=admin_headers, json={'parent_id': b})
+        assert response.status_code == 400
+        response = client.post('/categories', headers=admin_headers, json={'name': '孤兒', 'parent_id': 9999})
+        assert response.status_code == 400
+
+    def test_delete_promotes_children(self, client, admin_headers, category_chain):
+        """測試刪除分類後子分類升為根分類"""
+        a, b, c, d = category_chain
+        assert client.delete(f'/categories/{b}', headers=admin_headers).status_code == 200
+        db.session.expire_all()
+        assert path_of(c) == f'/{c}/'
+        assert path_of(d) == f'/{c}/{d}/'
+        roots = [node['id'] for node in client.get('/categories').get_json()]
+        assert roots == [a, c]
+
+    def test_tree_single_query_and_cached(self, client, admin_headers, category_chain, category_queries):
+        """測試整棵樹一次查詢，之後從快取讀取，分類異動後失效"""
+        tree = client.get('/categories').get_json()
+        assert len(category_queries) == 1
+        node = tree[0]
+        for _ in range(3):
+            node = node['children'][0]
+        assert node['id'] == category_chain[-1]
+        assert node['children'] == []
+
+        client.get('/categories')
+        assert len(category_queries) == 1
+
+        client.put(f'/categories/{category_chain[0]}', headers=admin_headers, json={'name': '3C'})
+        assert client.get('/categories').get_json()[0]['name'] == '3C'
+
+    def test_get_category_from_tree(self, client, category_chain):
+        """測試取得單一分類（含子分類）"""
+        data = client.get(f'/categories/{category_chain[1]}').get_json()
+        assert data['name'] == '手機'
+        assert data['children'][0]['id'] == category_chain[2]
+        assert client.get('/categories/9999').status_code == 404
+
+    def test_products_filter_includes_descendants(self, client, category_chain):
+        """測試商品依分類篩選時包含所有子孫分類"""
+        a, b, c, d = category_chain
+        db.session.add_all([
+            Product(name='旗艦手機', price=30000, category_id=d),
+            Product(name='手機殼', price=300, category_id=b),
+            Product(name='電視', price=20000, category_id=a),
+        ])
+        db.session.commit()
+        assert client.get(f'/products?category_id={a}').get_json()['total'] == 3
+        assert client.get(f'/products?category_id={b}').get_json()['total'] == 2
+        assert client.get(f'/products?category_id={d}').get_json()['total'] == 1
+        assert client.get('/products?category_id=9999').get_json()['total'] == 0
+
+    def test_rebuild_paths(self, app, category_chain):
+        """測試依 parent_id 重建路徑"""
+        db.session.query(Category).update({'path': None})
+        db.session.commit()
+        assert rebuild_category_paths() == 4
+        a, b, c, d = category_chain
+        assert path_of(d) == f'/{a}/{b}/{c}/{d}/'
@@ -0,0 +1,106 @@
+# pytest/test_dashboard_summary.py
+"""
+儀表板統計測試 - 單一查詢、依角色快取、single-flight 與彙總表
+"""
+import threading
+import time
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from app import db
+from app.models import Order
+from app.services.dashboard_service import cached_dashboard_summary, get_dashboard_cache_stats
+from app.services.rollup_service import rebuild_sales_rollups
+
+
+@pytest.fixture
+def orders(app, admin_user):
+    """3 筆訂單，分屬 2 個月份"""
+    for i, (created_at, amount) in enumerate([
+        (datetime(2025, 1, 5), 100.5), (datetime(2025, 1, 20), 200.25), (datetime(2025, 3, 1), 300),
+    ]):
+        db.session.add(Order(order_sn=f'DB{i}', user_id=admin_user.id, total_amount=amount, status='paid',
+                             receiver_name='收件人', receiver_phone='0912345678', shipping_address='地址',
+                             created_at=created_at))
+    db.session.commit()
+
+
+@pytest.fixture
+def statements(app):
+    """記錄執行的 SQL"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+EXPECTED = {
+    'total_sales': 600.75,
+    'order_count': 3,
+    'customer_count': 1,
+    'monthly_sales': [{'month': '2025-01', 'value': 300.75}, {'month': '2025-03', 'value': 300.0}],
+}
+
+
+class TestDashboardSummary:
+    """儀表板統計測試"""
+
+    def test_single_query_then_cached(self, client, admin_headers, orders, statements):
+        """測試第一次以一條 SQL 取得全部統計，之後在 TTL 內直接讀快取"""
+        response = client.get('/dashboard/summary', headers=admin_headers)
+        assert response.get_json() == EXPECTED
+        assert len(statements) == 1 and 'UNION ALL' in statements[0]
+
+        statements.clear()
+        assert client.get('/dashboard/summary', headers=admin_headers).get_json() == EXPECTED
+        assert statements == []
+
+    def test_cache_per_role_and_ttl(self, client, app, admin_headers, seller_headers, orders, admin_user):
+        """測試快取依角色分開；TTL 內新訂單不會反映，TTL 為 0 時每次重新計算"""
+        before = get_dashboard_cache_stats()['misses']
+        client.get('/dashboard/summary', headers=admin_headers)
+        client.get('/dashboard/summary', headers=seller_headers)
+        assert get_dashboard_cache_stats()['misses'] - before == 2
+
+        db.session.add(Order(order_sn='DB9', user_id=admin_user.id, total_amount=50, status='paid',
+                             receiver_name='收件人', receiver_phone='0912345678', shipping_address='地址',
+                             created_at=datetime(2025, 3, 2)))
+        db.session.commit()
+        assert client.get('/dashboard/summary', headers=admin_headers).get_json()['order_count'] == 3
+        app.config['DASHBOARD_CACHE_TTL'] = 0
+        assert client.get('/dashboard/summary', headers=admin_headers).get_json()['order_count'] == 4
+
+    def test_single_flight(self, app):
+        """測試快取過期時多個請求同時進來，只有一個重新計算"""
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return EXPECTED
+
+        results = []
+
+        def request():
+            with app.app_context():
+                results.append(cached_dashboard_summary('admin', loader=slow_loader))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert results == [EXPECTED] * 8
+
+    def test_rollup_matches_raw(self, client, app, admin_headers, orders):
+        """測試讀每日彙總表的結果與原始資料表一致"""
+        app.config['DASHBOARD_CACHE_TTL'] = 0
+        rebuild_sales_rollups()
+        raw = client.get('/dashboard/summary', headers=admin_headers).get_json()
+        app.config['SALES_ROLLUP_READS'] = True
+        assert client.get('/dashboard/summary', headers=admin_headers).get_json() == raw == EXPECTED
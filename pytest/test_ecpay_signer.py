@@ -0,0 +1,83 @@
+# pytest/test_ecpay_signer.py
+"""
+綠界 CheckMacValue 簽章測試 - 與原本的 quote_plus + replace 實作結果一致
+"""
+import hashlib
+import random
+import urllib.parse
+import pytest
+from app.utils.check_mac_value import ECPaySigner, get_signer, verify_check_mac_value
+
+HASH_KEY = '5294y06JbISpM5x9'
+HASH_IV = 'v77hoKGq4kWxNNIS'
+
+
+def legacy_mac(params, hash_key=HASH_KEY, hash_iv=HASH_IV):
+    """原本 gen_mac / verify_check_mac_value 的演算法"""
+    ordered = sorted((k, v) for k, v in params.items() if k != 'CheckMacValue')
+    raw = "&".join(f"{k}={v}" for k, v in ordered)
+    raw = f"HashKey={hash_key}&{raw}&HashIV={hash_iv}"
+    urlenc = urllib.parse.quote_plus(raw).lower()
+    for enc, ch in [('%2d', '-'), ('%5f', '_'), ('%2e', '.'), ('%21', '!'), ('%2a', '*'), ('%28', '('), ('%29', ')')]:
+        urlenc = urlenc.replace(enc, ch)
+    return hashlib.sha256(urlenc.encode('utf-8')).hexdigest().upper()
+
+
+PARAMS = {
+    'MerchantID': '2000132',
+    'MerchantTradeNo': 'OMS11760000000',
+    'MerchantTradeDate': '2025/01/02 03:04:05',
+    'PaymentType': 'aio',
+    'TotalAmount': 1280,
+    'TradeDesc': 'OMS訂單付款',
+    'ItemName': 'OMS商品x1 #A (特價)!*~',
+    'ReturnURL': 'https://example.com/payments/ecpay/callback?a=1&b=2',
+    'ChoosePayment': 'ALL',
+    'EncryptType': 1,
+}
+
+
+class TestECPaySigner:
+    """綠界簽章測試"""
+
+    def test_same_as_legacy(self):
+        """測試與原本演算法結果相同"""
+        assert ECPaySigner(HASH_KEY, HASH_IV).sign(PARAMS) == legacy_mac(PARAMS)
+
+    def test_encode_matches_quote_plus(self):
+        """測試各種字元（含全形、emoji、控制字元）的編碼與 quote_plus(safe='!*()').lower() 相同"""
+        rng = random.Random(0)
+        alphabet = [chr(c) for c in range(0, 0x250)] + ['測', '試', '😀', '　']
+        for _ in range(200):
+            raw = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            assert ECPaySigner.encode(raw) == urllib.parse.quote_plus(raw, safe='!*()').lower()
+
+    def test_verify(self):
+        """測試驗證通過、竄改與缺少 CheckMacValue"""
+        signer = ECPaySigner(HASH_KEY, HASH_IV)
+        data = {k: str(v) for k, v in PARAMS.items()}
+        data['CheckMacValue'] = legacy_mac(data)
+        assert signer.verify(data)
+        assert not signer.verify(dict(data, TotalAmount='1'))
+        assert not signer.verify(dict(data, CheckMacValue='非ASCII'))
+        assert not signer.verify({k: v for k, v in data.items() if k != 'CheckMacValue'})
+
+    def test_signer_cached_per_config(self, app):
+        """測試每個 app 快取 signer，HashKey 變更時重建"""
+        signer = get_signer()
+        assert get_signer() is signer
+        app.config['ECPAY_HASH_KEY'] = 'other-key'
+        assert get_signer() is not signer
+        assert get_signer().hash_key == 'other-key'
+
+    def test_verify_check_mac_value_uses_app_config(self, app):
+        """測試 verify_check_mac_value 使用 app 設定的金鑰"""
+        data = {'MerchantTradeNo': 'TEST1', 'RtnCode': '1'}
+        data['CheckMacValue'] = legacy_mac(data, app.config['ECPAY_HASH_KEY'], app.config['ECPAY_HASH_IV'])
+        assert verify_check_mac_value(data)
+
+    def test_payment_form_signature(self, client, customer_headers, test_order, app):
+        """測試產生付款表單的 CheckMacValue 可通過驗證"""
+        params = client.post(f'/payments/ecpay/{test_order.id}', headers=customer_headers).get_json()['params']
+        assert params['CheckMacValue'] == legacy_mac(params, app.config['ECPAY_HASH_KEY'], app.config['ECPAY_HASH_IV'])
+        assert verify_check_mac_value(params)
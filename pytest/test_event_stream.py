@@ -0,0 +1,142 @@
+# pytest/test_event_stream.py
+"""
+即時事件測試 - 程序內 pub/sub、commit 後才發佈、SSE 串流與重連補送
+"""
+import json
+import pytest
+from unittest.mock import patch
+from app import db
+from app.models import Order
+from app.services.event_broker import LocalBroker, get_broker, init_event_broker, publish_event, user_channel, ADMIN_CHANNEL
+
+
+def events(subscription):
+    """取出目前佇列中的事件 [(type, data), ...]"""
+    result = []
+    while (record := subscription.get(timeout=0)) is not None:
+        result.append((record[1], json.loads(record[2])))
+    return result
+
+
+def parse_sse(body):
+    """把 SSE 內容拆成 [{'id', 'event', 'data'}, ...]（略過 retry 與註解行）"""
+    messages = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith((':', 'retry')))
+        if fields:
+            messages.append(fields)
+    return messages
+
+
+@pytest.fixture
+def short_stream(app):
+    app.config.update(SSE_HEARTBEAT=0.01, SSE_MAX_DURATION=0.05)
+
+
+class TestLocalBroker:
+    """程序內 broker 測試"""
+
+    def test_publish_subscribe(self):
+        """測試只收到訂閱頻道的事件，同時訂閱多個頻道時同一事件只收一次"""
+        broker = LocalBroker()
+        sub = broker.subscribe(['user:1', 'admin'])
+        other = broker.subscribe(['user:2'])
+        broker.publish(['user:1', 'admin'], 'order_status', '{}')
+        assert len(events(sub)) == 1
+        assert events(other) == []
+
+    def test_replay_after_last_event_id(self):
+        """測試重連時補送 Last-Event-ID 之後保留中的事件"""
+        broker = LocalBroker(history=2)
+        first = broker.publish(['user:1'], 'a', '1')
+        broker.publish(['user:1'], 'b', '2')
+        broker.publish(['user:1'], 'c', '3')
+        sub = broker.subscribe(['user:1'], last_event_id=first)
+        assert [r[1] for r in (sub.get(timeout=0), sub.get(timeout=0))] == ['b', 'c']
+
+    def test_slow_subscriber_drops_oldest(self):
+        """測試佇列滿時丟掉最舊的事件，不阻塞發佈端"""
+        broker = LocalBroker(queue_size=2)
+        sub = broker.subscribe(['user:1'])
+        for i in range(3):
+            broker.publish(['user:1'], 'e', str(i))
+        assert [r[2] for r in (sub.get(timeout=0), sub.get(timeout=0))] == ['1', '2']
+        assert broker.stats.snapshot()['dropped'] == 1
+
+    def test_close_unsubscribes(self):
+        """測試關閉訂閱後不再佔用"""
+        broker = LocalBroker()
+        broker.subscribe(['user:1']).close()
+        assert broker.subscriber_count() == 0
+
+    def test_multiple_workers_require_shared_broker(self, app):
+        """測試多個 worker 卻沒有設定共用 broker 時拒絕啟動"""
+        app.config['WEB_CONCURRENCY'] = 4
+        with pytest.raises(RuntimeError, match='EVENT_BROKER_URL'):
+            init_event_broker(app)
+        app.config['EVENT_BROKER_BACKEND'] = lambda app: LocalBroker()
+        assert isinstance(init_event_broker(app), LocalBroker)
+
+
+class TestEventPublishing:
+    """事件發佈時機測試"""
+
+    def test_published_after_commit(self, app):
+        """測試事件在 commit 後才發佈，rollback 時捨棄"""
+        sub = get_broker().subscribe([user_channel(1)])
+        publish_event(1, 'order_status', {'order_id': 1})
+        assert events(sub) == []
+        db.session.commit()
+        assert events(sub) == [('order_status', {'order_id': 1})]
+
+        publish_event(1, 'order_status', {'order_id': 2})
+        db.session.rollback()
+        db.session.commit()
+        assert events(sub) == []
+
+    def test_batch_update_status(self, client, admin_headers, test_order):
+        """測試批次更新狀態推播給訂單擁有者與管理員頻道"""
+        user_sub = get_broker().subscribe([user_channel(test_order.user_id)])
+        admin_sub = get_broker().subscribe([ADMIN_CHANNEL])
+        response = client.put('/orders/status', json={'order_ids': [test_order.id], 'status': 'shipped'},
+                              headers=admin_headers)
+        assert response.status_code == 200
+        expected = [('order_status', {'order_id': test_order.id, 'order_sn': test_order.order_sn, 'status': 'shipped'})]
+        assert events(user_sub) == expected
+        assert events(admin_sub) == expected
+
+    def test_ecpay_callback(self, client, test_order):
+        """測試付款成功通知推播 payment_success，重送不重複推播"""
+        order = db.session.get(Order, test_order.id)
+        order.trade_no = f"SSE{order.id}"
+        db.session.commit()
+        sub = get_broker().subscribe([user_channel(test_order.user_id)])
+        with patch('app.routes.payments.verify_check_mac_value', return_value=True):
+            for _ in range(2):
+                client.post('/payments/ecpay/callback', data={
+                    'MerchantTradeNo': f"SSE{test_order.id}", 'RtnCode': '1', 'CheckMacValue': 'dummy_mac'
+                })
+        assert [type for type, _ in events(sub)] == ['payment_success']
+
+
+class TestEventStream:
+    """SSE 端點測試"""
+
+    def test_stream_with_query_token(self, client, customer_headers, customer_user, short_stream):
+        """測試以 query string 帶 token 連線，依 Last-Event-ID 補送事件"""
+        token = customer_headers['Authorization'].split(' ', 1)[1]
+        broker = get_broker()
+        broker.publish([user_channel(customer_user.id)], 'order_status', '{"order_id":1}')
+        broker.publish([user_channel(customer_user.id + 1)], 'order_status', '{"order_id":2}')
+        response = client.get(f'/events/stream?jwt={token}', headers={'Last-Event-ID': '0'})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        body = response.get_data(as_text=True)
+        assert body.startswith('retry: ')
+        assert parse_sse(body) == [{'id': '1', 'event': 'order_status', 'data': '{"order_id":1}'}]
+        assert broker.subscriber_count() == 0  # 串流結束後取消訂閱
+
+    def test_stream_requires_token(self, client):
+        """測試未帶 token 時拒絕連線"""
+        assert client.get('/events/stream').status_code == 401
@@ -0,0 +1,105 @@
+# pytest/test_json_provider.py
+"""
+JSON 回應編碼測試 - orjson 與標準函式庫兩種路徑輸出與 Flask 預設相同
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from werkzeug import http
+from app.utils.json_provider import FastJSONProvider, http_date, init_json_provider
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+PAYLOAD = {
+    'id': 1,
+    'name': '測試訂單',
+    'amount': decimal.Decimal('12.50'),
+    'token': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'created_at': datetime(2025, 1, 2, 3, 4, 5),
+    'paid_at': datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    'day': date(2025, 1, 2),
+    'updated_at': None,
+    'point': Point(1, 2),
+    'items': [{'qty': 2, 'price': 1.5, 'active': True}],
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def provider(request, app):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    app.config['JSON_FAST_ENCODER'] = request.param == 'orjson'
+    return FastJSONProvider(app)
+
+
+class TestJSONProvider:
+    """JSON 回應編碼測試"""
+
+    def test_same_as_flask_default(self, app, provider):
+        """測試輸出內容與 Flask 預設 provider 相同（含 datetime、Decimal、UUID、dataclass）"""
+        expected = DefaultJSONProvider(app).dumps(PAYLOAD)
+        result = provider.dumps(PAYLOAD)
+        assert json.loads(result) == json.loads(expected)
+        assert list(json.loads(result)) == sorted(PAYLOAD)
+        assert '測試訂單' in result  # 直接輸出 UTF-8
+
+    @pytest.mark.parametrize('value', [
+        datetime(2025, 1, 2, 3, 4, 5, 678),
+        datetime(2024, 2, 29, 23, 59, 59, tzinfo=timezone(timedelta(hours=8))),
+        datetime(999, 12, 31),
+        date(2025, 7, 6),
+    ])
+    def test_http_date(self, value):
+        """測試 HTTP 日期格式與 werkzeug 相同"""
+        assert http_date(value) == http.http_date(value)
+
+    def test_iso_datetime(self, app, provider):
+        """測試 JSON_DATETIME_FORMAT = 'iso'"""
+        app.config['JSON_DATETIME_FORMAT'] = 'iso'
+        data = json.loads(FastJSONProvider(app).dumps(PAYLOAD))
+        assert data['created_at'] == '2025-01-02T03:04:05'
+        assert data['paid_at'] == '2025-01-02T03:04:05+00:00'
+        assert data['day'] == '2025-01-02'
+
+    def test_unsupported_type(self, provider):
+        """測試無法編碼的型別與 Flask 預設一樣拋出 TypeError"""
+        with pytest.raises(TypeError):
+            provider.dumps({'value': object()})
+
+    def test_big_int_falls_back(self, provider):
+        """測試 orjson 不支援的大整數改由標準函式庫編碼"""
+        assert json.loads(provider.dumps({'n': 2 ** 70})) == {'n': 2 ** 70}
+
+    def test_response(self, app, client, customer_headers, test_order):
+        """測試 jsonify 回應使用新的 provider，datetime 維持 HTTP 日期格式"""
+        assert isinstance(app.json, FastJSONProvider)
+        response = client.get(f'/orders/{test_order.id}', headers=customer_headers)
+        assert response.mimetype == 'application/json'
+        assert response.data.endswith(b'}\n')
+        data = response.get_json()
+        assert data['order_sn'] == test_order.order_sn
+        assert data['created_at'].endswith(' GMT')
+
+    def test_indent_in_debug(self, app):
+        """測試 debug 模式輸出縮排格式"""
+        app.debug = True
+        with app.test_request_context():
+            body = app.json.response({'a': 1}).get_data(as_text=True)
+        assert json.loads(body) == {'a': 1}
+        assert '\n  "a"' in body
+
+    def test_custom_provider(self):
+        """測試 JSON_PROVIDER 指定其他 provider"""
+        flask_app = Flask(__name__)
+        flask_app.config['JSON_PROVIDER'] = 'flask.json.provider:DefaultJSONProvider'
+        assert type(init_json_provider(flask_app)) is DefaultJSONProvider
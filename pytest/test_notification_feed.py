@@ -0,0 +1,120 @@
+# pytest/test_notification_feed.py
+"""
+通知 feed 測試 - since_id / cursor 分頁、未讀計數同步、全站通知的個別已讀、全部已讀
+"""
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import Notification, NotificationState, NotificationRead
+from app.services.notification_service import create_notification, unread_count
+
+
+@pytest.fixture
+def feed(app, customer_user, admin_user):
+    """customer 的 3 筆個人通知、2 筆全站通知，另有 1 筆其他使用者的通知"""
+    create_notification(customer_user.id, 'order_status', '通知1', '內容1')
+    create_notification(None, 'system', '全站1', '全站內容1')
+    create_notification(customer_user.id, 'order_status', '通知2', '內容2')
+    create_notification(admin_user.id, 'system', '他人', '他人內容')
+    create_notification(None, 'system', '全站2', '全站內容2')
+    create_notification(customer_user.id, 'payment_success', '通知3', '內容3')
+    db.session.commit()
+    return {n.title: n.id for n in Notification.query.all()}
+
+
+def titles(response):
+    return [n['title'] for n in response.get_json()['data']]
+
+
+class TestNotificationFeed:
+    """通知 feed 測試"""
+
+    def test_feed_and_counter(self, client, customer_headers, customer_user, feed):
+        """測試 feed 依 id 由新到舊、不含他人通知，未讀數由計數欄位 + 全站通知組成"""
+        data = client.get('/notifications', headers=customer_headers).get_json()
+        assert [n['title'] for n in data['data']] == ['通知3', '全站2', '通知2', '全站1', '通知1']
+        assert data['unread_count'] == 5
+        assert data['next_cursor'] is None
+        assert db.session.get(NotificationState, customer_user.id).unread_count == 3
+
+    def test_legacy_global_is_read_ignored(self, client, customer_headers, feed):
+        """測試舊資料中 is_read=True 的全站通知，feed 與未讀數都視為未讀"""
+        db.session.get(Notification, feed['全站1']).is_read = True
+        db.session.commit()
+        data = client.get('/notifications', headers=customer_headers).get_json()
+        unread = [n['title'] for n in data['data'] if not n['is_read']]
+        assert '全站1' in unread
+        assert data['unread_count'] == len(unread) == 5
+
+    def test_cursor_and_since_id(self, client, customer_headers, feed):
+        """測試 cursor 往舊的分頁、since_id 只取新的通知"""
+        first = client.get('/notifications?page_size=2', headers=customer_headers).get_json()
+        assert [n['title'] for n in first['data']] == ['通知3', '全站2']
+        second = client.get(f"/notifications?page_size=2&cursor={first['next_cursor']}", headers=customer_headers)
+        assert titles(second) == ['通知2', '全站1']
+        since = client.get(f"/notifications?since_id={feed['通知2']}", headers=customer_headers)
+        assert titles(since) == ['通知3', '全站2']
+        assert client.get('/notifications?cursor=bad', headers=customer_headers).status_code == 400
+
+    def test_mark_read(self, client, customer_headers, customer_user, feed):
+        """測試個人通知標記已讀會減少計數，重複標記不會重複扣；全站通知只記錄該使用者已讀"""
+        response = client.post(f"/notifications/{feed['通知1']}/read", headers=customer_headers)
+        assert response.get_json()['unread_count'] == 4
+        response = client.post(f"/notifications/{feed['通知1']}/read", headers=customer_headers)
+        assert response.get_json()['unread_count'] == 4
+
+        response = client.post(f"/notifications/{feed['全站1']}/read", headers=customer_headers)
+        assert response.get_json()['unread_count'] == 3
+        assert db.session.get(Notification, feed['全站1']).is_read is False  # 全站通知本身不變
+        assert NotificationRead.query.count() == 1
+
+        data = client.get('/notifications', headers=customer_headers).get_json()['data']
+        assert {n['title'] for n in data if n['is_read']} == {'通知1', '全站1'}
+
+    def test_mark_others_notification_forbidden(self, client, customer_headers, feed):
+        """測試不能標記他人的通知"""
+        assert client.post(f"/notifications/{feed['他人']}/read", headers=customer_headers).status_code == 403
+
+    def test_read_all_single_update(self, app, client, customer_headers, customer_user, feed):
+        """測試全部已讀只以一條 UPDATE 推進水位，不逐筆更新通知"""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = client.post('/notifications/read_all', headers=customer_headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert response.get_json()['unread_count'] == 0
+        assert [s for s in statements if s.lstrip().startswith('UPDATE')] == [
+            s for s in statements if s.lstrip().startswith('UPDATE notification_states')]
+        assert len([s for s in statements if s.lstrip().startswith('UPDATE')]) == 1
+
+        data = client.get('/notifications', headers=customer_headers).get_json()
+        assert all(n['is_read'] for n in data['data'])
+
+    def test_read_all_up_to_id(self, client, customer_headers, customer_user, feed):
+        """測試只標記到 up_to_id，之後送達的通知維持未讀"""
+        response = client.post('/notifications/read_all', json={'up_to_id': feed['通知2']}, headers=customer_headers)
+        assert response.get_json()['unread_count'] == 2  # 通知3、全站2
+        create_notification(customer_user.id, 'order_status', '通知4', '內容4')
+        db.session.commit()
+        assert unread_count(customer_user.id) == 3
+        assert client.post('/notifications/read_all', json={'up_to_id': 'x'}, headers=customer_headers).status_code == 400
+
+    def test_read_all_without_state(self, client, admin_headers, admin_user, feed):
+        """測試只收過全站通知、還沒有狀態列的使用者也能全部已讀"""
+        db.session.query(NotificationState).filter_by(user_id=admin_user.id).delete()
+        db.session.commit()
+        assert client.get('/notifications/unread_count', headers=admin_headers).get_json()['unread_count'] == 2
+        response = client.post('/notifications/read_all', headers=admin_headers)
+        assert response.get_json()['unread_count'] == 0
+
+    def test_rollback_discards_counter(self, app, customer_user):
+        """測試通知隨交易 rollback 時不累加未讀數"""
+        create_notification(customer_user.id, 'order_status', '取消', '內容')
+        db.session.rollback()
+        db.session.commit()
+        assert unread_count(customer_user.id) == 0
@@ -0,0 +1,113 @@
+# pytest/test_operation_logs.py
+"""
+操作紀錄測試 - keyset 分頁、篩選、權限範圍與封存
+"""
+import gzip
+import json
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from app import db
+from app.models import OperationLog
+from app.services.operation_log_service import archive_operation_logs
+
+
+@pytest.fixture
+def logs(app, admin_user, customer_user):
+    """6 筆紀錄，建立時間逐日遞增：admin 4 筆、customer 2 筆"""
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    rows = [
+        OperationLog(user_id=admin_user.id, username='admin', action='update', target_type='order',
+                     target_id=1, content='改狀態', created_at=base),
+        OperationLog(user_id=admin_user.id, username='admin', action='create', target_type='product',
+                     target_id=7, content='新增商品', created_at=base + timedelta(days=1)),
+        OperationLog(user_id=customer_user.id, username='customer', action='create', target_type='order',
+                     target_id=2, content='下單', created_at=base + timedelta(days=2)),
+        OperationLog(user_id=admin_user.id, username='admin', action='update', target_type='order',
+                     target_id=2, content='出貨', created_at=base + timedelta(days=3)),
+        OperationLog(user_id=customer_user.id, username='customer', action='update', target_type='order',
+                     target_id=2, content='改地址', created_at=base + timedelta(days=4)),
+        OperationLog(user_id=admin_user.id, username='admin', action='delete', target_type='product',
+                     target_id=7, content='刪除商品', created_at=base + timedelta(days=5)),
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+class TestOperationLogList:
+    """操作紀錄列表測試"""
+
+    def test_cursor_pages(self, client, admin_headers, logs):
+        """測試以 X-Next-Cursor 逐頁取得全部紀錄，由新到舊且不重複"""
+        seen = []
+        url = '/notifications/logs?page_size=4'
+        while url:
+            response = client.get(url, headers=admin_headers)
+            assert response.status_code == 200
+            seen.extend(log['content'] for log in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/notifications/logs?page_size=4&cursor={cursor}' if cursor else None
+        assert seen == ['刪除商品', '改地址', '出貨', '下單', '新增商品', '改狀態']
+
+    def test_filters(self, client, admin_headers, logs, customer_user):
+        """測試依使用者、動作、對象與日期區間篩選"""
+        def contents(query):
+            response = client.get(f'/notifications/logs?{query}', headers=admin_headers)
+            return [log['content'] for log in response.get_json()]
+
+        assert contents(f'user_id={customer_user.id}') == ['改地址', '下單']
+        assert contents('action=create') == ['下單', '新增商品']
+        assert contents('target_type=order&target_id=2') == ['改地址', '出貨', '下單']
+        assert contents('date_start=2025-01-02&date_end=2025-01-03') == ['下單', '新增商品']
+
+    def test_customer_sees_own_logs(self, client, customer_headers, logs, admin_user):
+        """測試一般使用者只看得到自己的紀錄，帶 user_id 也無效"""
+        response = client.get(f'/notifications/logs?user_id={admin_user.id}', headers=customer_headers)
+        assert [log['content'] for log in response.get_json()] == ['改地址', '下單']
+
+    def test_invalid_cursor(self, client, admin_headers):
+        """測試錯誤的 cursor 回傳 400"""
+        assert client.get('/notifications/logs?cursor=bad', headers=admin_headers).status_code == 400
+
+
+class TestOperationLogArchive:
+    """操作紀錄封存測試"""
+
+    def test_archive_moves_old_rows(self, app, logs, tmp_path):
+        """測試分批把舊紀錄寫入 gzip JSON Lines 並刪除，新紀錄保留"""
+        result = archive_operation_logs(datetime(2025, 1, 4), tmp_path, batch_size=2)
+        assert result['rows'] == 3
+        with gzip.open(result['path'], 'rt', encoding='utf-8') as archive:
+            archived = [json.loads(line) for line in archive]
+        assert [row['content'] for row in archived] == ['改狀態', '新增商品', '下單']
+        assert archived[0]['created_at'] == '2025-01-01T12:00:00'
+        remaining = [log.content for log in OperationLog.query.order_by(OperationLog.id)]
+        assert remaining == ['出貨', '改地址', '刪除商品']
+
+    def test_dry_run_and_nothing_to_archive(self, app, logs, tmp_path):
+        """測試 dry run 只計算筆數；沒有需要封存的資料時不產生檔案"""
+        assert archive_operation_logs(datetime(2025, 1, 4), tmp_path, dry_run=True) == {'rows': 3, 'path': None}
+        assert OperationLog.query.count() == 6
+        assert archive_operation_logs(datetime(2024, 1, 1), tmp_path) == {'rows': 0, 'path': None}
+        assert list(tmp_path.iterdir()) == []
+
+    def test_partial_run_leaves_readable_archive(self, app, logs, tmp_path):
+        """測試中途失敗時檔案仍是完整可讀的 gzip，已刪除的紀錄都在檔案中"""
+        real_commit = db.session.commit
+        calls = []
+
+        def flaky_commit():
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('模擬中斷')
+            real_commit()
+
+        with patch.object(db.session, 'commit', flaky_commit), pytest.raises(RuntimeError):
+            archive_operation_logs(datetime(2025, 1, 6), tmp_path, batch_size=2)
+        path, = tmp_path.iterdir()
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            archived = [json.loads(line)['content'] for line in archive]
+        remaining = [log.content for log in OperationLog.query.order_by(OperationLog.id)]
+        assert archived == ['改狀態', '新增商品', '下單', '出貨']
+        assert remaining == ['下單', '出貨', '改地址', '刪除商品']
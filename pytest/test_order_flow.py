@@ -122,4 +122,223 @@ class TestOrderFlow:
             'receiver_phone': '0912345678',
             'shipping_address': '測試收件地址'
         })
-        assert response.status_code == 400
\ No newline at end of file
+        assert response.status_code == 400
+
+    def test_create_order_duplicate_lines_share_stock(self, client, customer_headers, test_product):
+        """測試同一商品分多行下單時，以合計數量檢查庫存且不會部分扣減"""
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [
+                {'product_id': test_product.id, 'qty': 6},
+                {'product_id': test_product.id, 'qty': 6}  # 合計 12 > 庫存 10
+            ],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        assert response.status_code == 400
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 10
+    
+    def test_create_order_multiple_products(self, client, customer_headers, test_product, app):
+        """測試多商品訂單一次完成計價與扣庫存"""
+        from app import db
+        from app.models import Product
+        other = Product(name="第二商品", price=50.0, stock=5, is_active=True)
+        db.session.add(other)
+        db.session.commit()
+        
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [
+                {'product_id': test_product.id, 'qty': 2},
+                {'product_id': other.id, 'qty': 3}
+            ],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['total_amount'] == 350.0  # 100*2 + 50*3
+        assert len(data['items']) == 2
+        assert len(data['history']) == 1
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 8
+        assert client.get(f'/products/{other.id}').get_json()['stock'] == 2
+    
+    def test_cancel_order_restores_stock(self, client, admin_headers, customer_headers, test_product):
+        """測試批次取消訂單會回補庫存"""
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [{'product_id': test_product.id, 'qty': 4}],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        order_id = response.get_json()['id']
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 6
+        
+        response = client.put('/orders/status', headers=admin_headers, json={
+            'order_ids': [order_id],
+            'status': 'cancelled'
+        })
+        assert response.status_code == 200
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 10
+    
+    def test_list_orders_cursor_pagination(self, client, admin_headers, customer_headers, test_product):
+        """測試游標分頁可完整走訪所有訂單且不重複"""
+        for qty in [1, 2, 3]:
+            client.post('/orders', headers=customer_headers, json={
+                'items': [{'product_id': test_product.id, 'qty': qty}],
+                'receiver_name': '測試收件人',
+                'receiver_phone': '0912345678',
+                'shipping_address': '測試收件地址'
+            })
+        
+        for sort_by in ['created_at', 'total_amount']:
+            seen = []
+            cursor = ''
+            while True:
+                response = client.get('/orders', headers=admin_headers, query_string={
+                    'cursor': cursor, 'page_size': 2, 'sort_by': sort_by
+                })
+                assert response.status_code == 200
+                data = response.get_json()
+                assert 'total' not in data
+                seen.extend(o['id'] for o in data['data'])
+                cursor = data['next_cursor']
+                if not cursor:
+                    break
+            assert len(seen) == 3
+            assert len(set(seen)) == 3
+        
+        amounts = client.get('/orders', headers=admin_headers, query_string={
+            'cursor': '', 'page_size': 10, 'sort_by': 'total_amount', 'with_total': 'true'
+        }).get_json()
+        assert amounts['total'] == 3
+        assert [o['total_amount'] for o in amounts['data']] == [300.0, 200.0, 100.0]
+    
+    def test_list_orders_invalid_cursor(self, client, admin_headers):
+        """測試無效的 cursor 回傳 400"""
+        response = client.get('/orders', headers=admin_headers, query_string={'cursor': 'not-a-cursor'})
+        assert response.status_code == 400
+    
+    def test_list_orders_keyword_search(self, client, admin_headers, customer_headers, test_product):
+        """測試關鍵字搜尋（中文姓名、備註、訂單編號）與修改後索引同步"""
+        for name, remark in [('王小明', '請放管理室'), ('陳大文', '下午配送')]:
+            client.post('/orders', headers=customer_headers, json={
+                'items': [{'product_id': test_product.id, 'qty': 1}],
+                'receiver_name': name,
+                'receiver_phone': '0912345678',
+                'shipping_address': '測試收件地址',
+                'remark': remark
+            })
+        
+        def search(keyword):
+            response = client.get('/orders', headers=admin_headers, query_string={'keyword': keyword})
+            assert response.status_code == 200
+            return [o['receiver_name'] for o in response.get_json()['data']]
+        
+        assert search('小明') == ['王小明']
+        assert search('王') == ['王小明']
+        assert search('管理室') == ['王小明']
+        assert search('明陳') == []  # 跨訂單的字不會誤中
+        assert len(search('OMS')) == 2
+        assert len(search('MS')) == 2  # 過短的英數字改用 LIKE
+        
+        order = client.get('/orders', headers=admin_headers, query_string={'keyword': '陳大文'}).get_json()['data'][0]
+        client.put(f"/orders/{order['id']}", headers=admin_headers, json={'receiver_name': '林美玲'})
+        assert search('陳大文') == []
+        assert search('美玲') == ['林美玲']
+    
+    def test_batch_update_status_results(self, client, admin_headers, customer_headers, test_order):
+        """測試批次更新回傳每筆訂單結果，並寫入歷史與通知"""
+        response = client.put('/orders/status', headers=admin_headers, json={
+            'order_ids': [test_order.id, 99999, test_order.id],
+            'status': 'shipped',
+            'remark': '出貨波次'
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['updated_count'] == 1
+        assert data['results'] == [
+            {'order_id': test_order.id, 'ok': True},
+            {'order_id': 99999, 'ok': False, 'reason': '找不到訂單'},
+        ]
+        history = client.get(f'/orders/{test_order.id}/history', headers=customer_headers).get_json()
+        assert [h['status'] for h in history] == ['shipped']
+        notifications = client.get('/notifications', headers=customer_headers).get_json()['data']
+        assert any(test_order.order_sn in n['content'] for n in notifications)
+    
+    def test_batch_update_status_other_users_order(self, client, customer_headers, admin_user, app):
+        """測試一般使用者無法批次更新別人的訂單"""
+        from app import db
+        from app.models import Order
+        order = Order(order_sn='OTHER001', user_id=admin_user.id, total_amount=10, status='pending',
+                      receiver_name='管理員', receiver_phone='0900000000', shipping_address='地址')
+        db.session.add(order)
+        db.session.commit()
+        response = client.put('/orders/status', headers=customer_headers, json={
+            'order_ids': [order.id], 'status': 'cancelled'
+        })
+        assert response.get_json()['results'] == [{'order_id': order.id, 'ok': False, 'reason': '無權限'}]
+        assert db.session.get(Order, order.id).status == 'pending'
+
+    @pytest.mark.parametrize('qty', [-50, 0])
+    def test_update_order_items_invalid_qty(self, client, customer_headers, test_product, qty):
+        """測試修改明細時數量必須為正整數，否則回傳 400 且庫存與金額不變"""
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [{'product_id': test_product.id, 'qty': 1}],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        order = response.get_json()
+        response = client.put(f"/orders/{order['id']}", headers=customer_headers, json={
+            'items': [{'product_id': test_product.id, 'qty': qty}]
+        })
+        assert response.status_code == 400
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 9
+        assert client.get(f"/orders/{order['id']}", headers=customer_headers).get_json()['total_amount'] == order['total_amount']
+
+    def test_delete_order_restores_stock(self, client, customer_headers, test_product):
+        """測試刪除未付款訂單會回補庫存並一併刪除明細，不產生重複刪除的警告"""
+        import warnings
+        from sqlalchemy.exc import SAWarning
+        from app.models import OrderItem
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [{'product_id': test_product.id, 'qty': 3}],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        order_id = response.get_json()['id']
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', SAWarning)
+            assert client.delete(f'/orders/{order_id}', headers=customer_headers).status_code == 200
+        assert OrderItem.query.filter_by(order_id=order_id).count() == 0
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 10
+
+    @pytest.mark.parametrize('change, message', [({'is_active': False}, '已下架'), ({'price': 120.0}, '價格已變更')])
+    def test_create_order_product_changed_after_read(self, client, customer_headers, test_product, change, message):
+        """測試讀取商品後才被下架或改價時，條件式扣庫存失敗並回傳 400，不以舊價格成立訂單"""
+        from unittest.mock import patch
+        from sqlalchemy import update
+        from app import db
+        from app.models import Order, Product
+        from app.services import order_service
+        original = order_service.load_products
+
+        def load_then_change(product_ids):
+            products = original(product_ids)
+            db.session.execute(update(Product).where(Product.id == test_product.id).values(**change)
+                               .execution_options(synchronize_session=False))
+            return products
+
+        with patch.object(order_service, 'load_products', load_then_change):
+            response = client.post('/orders', headers=customer_headers, json={
+                'items': [{'product_id': test_product.id, 'qty': 2}],
+                'receiver_name': '測試收件人',
+                'receiver_phone': '0912345678',
+                'shipping_address': '測試收件地址'
+            })
+        assert response.status_code == 400
+        assert message in response.get_json()['message']
+        assert Order.query.count() == 0
+        assert db.session.get(Product, test_product.id).stock == 10
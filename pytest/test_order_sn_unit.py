@@ -0,0 +1,88 @@
+# pytest/test_order_sn_unit.py
+"""
+訂單編號配置器單元測試 - 不查資料庫也能保證唯一
+"""
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from app.utils.order_sn import TimeSequenceAllocator, OrderSnAllocator, SEQ_LIMIT, init_order_sn_allocator
+
+
+class FakeClock:
+    """可控制的時鐘，sleep 直接推進時間"""
+    def __init__(self, now):
+        self.now = now
+        self.slept = 0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+class TestOrderSnUnit:
+    """訂單編號配置器單元測試"""
+    
+    def test_format(self):
+        """測試編號格式：前綴 + 時間 + 節點 + PID + 序號"""
+        clock = FakeClock(1_700_000_000.5)
+        allocator = TimeSequenceAllocator(node_id=7, clock=clock, sleep=clock.sleep, floor=0)
+        with patch('app.utils.order_sn.os.getpid', return_value=4321):
+            allocator._reset()
+            sn = allocator.allocate()
+        assert sn == 'OMS20231114221320' + '07' + '0004321' + '0000'
+    
+    def test_unique_within_second_and_rollover(self):
+        """測試同一秒序號用完會等到下一秒，且編號不重複"""
+        clock = FakeClock(1_700_000_000.0)
+        allocator = TimeSequenceAllocator(clock=clock, sleep=clock.sleep, floor=0)
+        sns = [allocator.allocate() for _ in range(SEQ_LIMIT + 5)]
+        assert len(set(sns)) == len(sns)
+        assert clock.slept > 0
+        assert sns[SEQ_LIMIT][3:17] != sns[0][3:17]
+    
+    def test_skips_startup_second(self):
+        """測試程序啟動的那一秒不配號"""
+        clock = FakeClock(1_700_000_000.2)
+        allocator = TimeSequenceAllocator(clock=clock, sleep=clock.sleep, floor=1_700_000_000)
+        sn = allocator.allocate()
+        assert clock.now >= 1_700_000_001
+        assert sn[3:17] == '20231114221321'
+    
+    def test_clock_going_backwards_keeps_unique(self):
+        """測試時鐘倒退時沿用上次秒數，不會重複"""
+        clock = FakeClock(1_700_000_010.0)
+        allocator = TimeSequenceAllocator(clock=clock, sleep=clock.sleep, floor=0)
+        first = allocator.allocate()
+        clock.now -= 5
+        second = allocator.allocate()
+        assert first != second
+        assert first[3:17] == second[3:17]
+    
+    def test_reset_after_fork(self):
+        """測試 fork 後（PID 改變）重新起算並帶入新 PID"""
+        clock = FakeClock(1_700_000_000.0)
+        allocator = TimeSequenceAllocator(clock=clock, sleep=clock.sleep, floor=0)
+        allocator.allocate()
+        with patch('app.utils.order_sn.os.getpid', return_value=99):
+            sn = allocator.allocate()
+        assert sn.endswith('0000099' + '0000')
+    
+    def test_invalid_node_id(self):
+        """測試節點編號超出範圍"""
+        with pytest.raises(ValueError):
+            TimeSequenceAllocator(node_id=100)
+
+    def test_bad_custom_allocator_fails_at_init(self):
+        """測試自訂配置器缺少 allocate 時在建立階段就失敗，而不是第一張訂單"""
+        class Incomplete(OrderSnAllocator):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+        app = Flask(__name__)
+        app.config['ORDER_SN_ALLOCATOR'] = lambda app: object()
+        with pytest.raises(TypeError):
+            init_order_sn_allocator(app)
@@ -0,0 +1,91 @@
+# pytest/test_payment_idempotency.py
+"""
+金流通知冪等測試 - 綠界重送同一筆通知時只入帳一次
+"""
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+from app import db
+from app.models import Order, OrderHistory, Payment, Notification
+from app.models.sales_rollup import DailyOrderRollup
+
+
+@pytest.fixture
+def ecpay_order(test_order):
+    order = db.session.get(Order, test_order.id)
+    order.trade_no = f"TEST{order.id}123456"
+    db.session.commit()
+    return order
+
+
+@pytest.fixture
+def post_callback(client):
+    """送出已通過 MAC 驗證的付款成功通知"""
+    def _post(trade_no):
+        with patch('app.routes.payments.verify_check_mac_value', return_value=True):
+            return client.post('/payments/ecpay/callback', data={
+                'MerchantTradeNo': trade_no, 'RtnCode': '1', 'RtnMsg': '交易成功', 'CheckMacValue': 'dummy_mac'
+            })
+    return _post
+
+
+def counts(order_id):
+    return (
+        Payment.query.filter_by(order_id=order_id).count(),
+        OrderHistory.query.filter_by(order_id=order_id, status='paid').count(),
+        Notification.query.filter_by(type='payment_success').count(),
+    )
+
+
+class TestPaymentIdempotency:
+    """金流通知冪等測試"""
+
+    def test_retries_record_once(self, post_callback, ecpay_order):
+        """測試重送多次只產生一筆付款、歷史與通知，銷售彙總只計一次"""
+        for _ in range(5):
+            response = post_callback(ecpay_order.trade_no)
+            assert response.get_data(as_text=True) == '1|OK'
+        assert counts(ecpay_order.id) == (1, 1, 1)
+        order = db.session.get(Order, ecpay_order.id)
+        assert (order.status, order.payment_status) == ('paid', 'paid')
+        paid = db.session.query(DailyOrderRollup.order_count).filter_by(status='paid').scalar()
+        assert paid == 1
+
+    def test_retry_fast_path_skips_order(self, app, post_callback, ecpay_order):
+        """測試已入帳的通知只查一次付款紀錄，不載入訂單"""
+        trade_no = ecpay_order.trade_no
+        post_callback(trade_no)
+        db.session.expire_all()
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            post_callback(trade_no)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert len(statements) == 1
+        assert 'FROM payments' in statements[0]
+
+    def test_already_paid_order_not_recorded(self, post_callback, ecpay_order):
+        """測試訂單已由其他交易付款時，條件式 UPDATE 不會再更新也不入帳"""
+        ecpay_order.payment_status = 'paid'
+        db.session.commit()
+        assert post_callback(ecpay_order.trade_no).get_data(as_text=True) == '1|OK'
+        assert counts(ecpay_order.id) == (0, 0, 0)
+
+    def test_concurrent_insert_rolls_back(self, post_callback, ecpay_order):
+        """測試另一個 worker 已寫入同一筆交易時，唯一索引衝突會整筆 rollback"""
+        db.session.add(Payment(order_id=ecpay_order.id, amount=1, status='success',
+                               payment_method='ecpay', transaction_id=ecpay_order.trade_no))
+        db.session.commit()
+        with patch('app.services.payment_service.payment_recorded', return_value=False):
+            assert post_callback(ecpay_order.trade_no).get_data(as_text=True) == '1|OK'
+        assert counts(ecpay_order.id) == (1, 0, 0)
+        assert db.session.get(Order, ecpay_order.id).payment_status == 'unpaid'
+
+    def test_unknown_trade_no(self, post_callback, app):
+        """測試找不到訂單"""
+        assert post_callback('NOPE').get_data(as_text=True) == '0|找不到訂單'
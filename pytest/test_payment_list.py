@@ -0,0 +1,73 @@
+# pytest/test_payment_list.py
+"""
+付款列表測試 - keyset 分頁（X-Next-Cursor 標頭）、篩選與權限範圍
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import Order, Payment
+
+
+@pytest.fixture
+def payments(app, test_order):
+    """test_order 的 5 筆付款，建立時間逐日遞增；另有一筆其他使用者訂單的付款"""
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    rows = [
+        Payment(order_id=test_order.id, amount=100.0, status='success' if i % 2 == 0 else 'failed',
+                payment_method='ecpay' if i < 3 else 'credit_card', transaction_id=f"LIST{i}",
+                created_at=base + timedelta(days=i))
+        for i in range(5)
+    ]
+    other = Order(order_sn='OTHERPAY', user_id=test_order.user_id + 1000, total_amount=50.0, shipping_fee=0.0,
+                  status='pending', payment_status='unpaid', receiver_name='其他', receiver_phone='0900000000',
+                  shipping_address='其他地址')
+    db.session.add(other)
+    db.session.flush()
+    rows.append(Payment(order_id=other.id, amount=50.0, status='success', payment_method='ecpay',
+                        transaction_id='OTHER', created_at=base + timedelta(days=10)))
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+class TestPaymentList:
+    """付款列表測試"""
+
+    def test_cursor_pages(self, client, admin_headers, payments):
+        """測試以 X-Next-Cursor 逐頁取得所有付款，依建立時間由新到舊且不重複"""
+        seen = []
+        url = '/payments?page_size=2'
+        while True:
+            response = client.get(url, headers=admin_headers)
+            assert response.status_code == 200
+            seen.extend(p['transaction_id'] for p in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            url = f'/payments?page_size=2&cursor={cursor}'
+        assert seen == ['OTHER', 'LIST4', 'LIST3', 'LIST2', 'LIST1', 'LIST0']
+
+    def test_same_fields_as_to_dict(self, client, admin_headers, payments):
+        """測試 projection 查詢輸出與 Payment.to_dict 相同"""
+        data = client.get('/payments?page_size=1', headers=admin_headers).get_json()
+        assert data == [db.session.get(Payment, payments[-1].id).to_dict()]
+
+    def test_filters(self, client, admin_headers, payments, test_order):
+        """測試依狀態、付款方式、訂單與日期區間篩選"""
+        def ids(query):
+            return [p['transaction_id'] for p in client.get(f'/payments?{query}', headers=admin_headers).get_json()]
+
+        assert ids('status=failed') == ['LIST3', 'LIST1']
+        assert ids('payment_method=credit_card') == ['LIST4', 'LIST3']
+        assert ids(f'order_id={test_order.id}&status=success') == ['LIST4', 'LIST2', 'LIST0']
+        assert ids('date_start=2025-01-02&date_end=2025-01-03') == ['LIST2', 'LIST1']
+
+    def test_customer_sees_own_payments(self, client, customer_headers, payments):
+        """測試一般使用者只看到自己訂單的付款"""
+        data = client.get('/payments', headers=customer_headers).get_json()
+        assert [p['transaction_id'] for p in data] == ['LIST4', 'LIST3', 'LIST2', 'LIST1', 'LIST0']
+
+    @pytest.mark.parametrize('query', ['cursor=not-a-cursor', 'date_start=yesterday'])
+    def test_invalid_parameters(self, client, admin_headers, query):
+        """測試錯誤的 cursor 或日期回傳 400，不再回傳空陣列"""
+        assert client.get(f'/payments?{query}', headers=admin_headers).status_code == 400
@@ -0,0 +1,78 @@
+# pytest/test_product_listing.py
+"""
+商品列表序列化測試 - projection 查詢的輸出與 products_schema 相同，且查詢數不隨筆數增加
+"""
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import Category, Product
+from app.schemas.product import products_schema
+from app.services.product_service import list_product_page
+from app.utils.serialization import compile_row_serializer, isoformat
+
+
+@pytest.fixture
+def catalog(app):
+    """三層分類與 30 個商品（含無分類、無促銷價的商品）"""
+    root = Category(name='電子產品')
+    phone = Category(name='手機', parent=root)
+    flagship = Category(name='旗艦機', parent=phone)
+    db.session.add_all([root, phone, flagship])
+    db.session.flush()
+    products = [
+        Product(name=f'商品{i}', price=100 + i, promo_price=(90.5 if i % 2 else None), stock=i,
+                desc='描述', is_active=bool(i % 3), category_id=[root.id, phone.id, flagship.id, None][i % 4])
+        for i in range(30)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    products[0].stock = 99  # 產生 updated_at
+    db.session.commit()
+    return root
+
+
+class TestProductListing:
+    """商品列表序列化測試"""
+
+    def test_same_output_as_schema(self, app, catalog):
+        """測試輸出與 products_schema.dump 完全相同（含巢狀分類與子分類）"""
+        expected = products_schema.dump(
+            Product.query.order_by(Product.created_at.desc()).limit(100).all()
+        )
+        db.session.expire_all()
+        result = list_product_page(page_size=100)
+        assert result['total'] == 30
+        by_id = lambda p: p['id']  # 建立時間相同的商品排序不固定，以 id 比對
+        assert sorted(result['data'], key=by_id) == sorted(expected, key=by_id)
+
+    def test_filters(self, app, catalog):
+        """測試名稱、上下架、分類（含子分類）篩選"""
+        assert list_product_page(name='商品1')['total'] == 11
+        assert list_product_page(is_active=False)['total'] == 10
+        assert list_product_page(category_id=catalog.id)['total'] == 23
+        page = list_product_page(page=2, page_size=25)
+        assert len(page['data']) == 5
+
+    def test_query_count_independent_of_rows(self, client, catalog):
+        """測試列表只有 COUNT 與 projection 兩次查詢（分類樹已快取），不逐列載入分類"""
+        client.get('/categories')
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = client.get('/products?page_size=30')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        assert len(response.get_json()['data']) == 30
+        assert len(statements) == 2
+
+    def test_row_serializer(self):
+        """測試預先編譯的 row 序列化函式"""
+        from datetime import datetime
+        serialize = compile_row_serializer([('id', None), ('price', float), ('at', isoformat)], start=1)
+        row = ('略過', 1, 10, datetime(2025, 1, 2, 3, 4, 5))
+        assert serialize(row) == {'id': 1, 'price': 10.0, 'at': '2025-01-02T03:04:05'}
+        assert serialize(('略過', 2, None, None)) == {'id': 2, 'price': None, 'at': None}
@@ -123,4 +123,23 @@ class TestProductManagement:
         
         # 驗證商品已被刪除
         get_response = client.get(f'/products/{test_product.id}')
-        assert get_response.status_code == 404
\ No newline at end of file
+        assert get_response.status_code == 404
+
+    def test_change_stock_insufficient(self, client, admin_headers, test_product):
+        """測試庫存不足時異動失敗且庫存不變"""
+        response = client.put(f'/products/{test_product.id}/stock',
+                             headers=admin_headers, json={'delta': -11})
+        assert response.status_code == 400
+        assert client.get(f'/products/{test_product.id}').get_json()['stock'] == 10
+
+    def test_change_stock_legacy_param(self, client, admin_headers, test_product):
+        """測試 stock_change 為 delta 的別名，兩者同時出現時以 delta 為準"""
+        response = client.put(f'/products/{test_product.id}/stock',
+                             headers=admin_headers, json={'stock_change': -3})
+        assert response.get_json()['stock'] == 7
+        response = client.put(f'/products/{test_product.id}/stock',
+                             headers=admin_headers, json={'delta': 2, 'stock_change': -3})
+        assert response.get_json()['stock'] == 9
+        response = client.put(f'/products/{test_product.id}/stock',
+                             headers=admin_headers, json={'stock_change': 'abc'})
+        assert response.status_code == 400
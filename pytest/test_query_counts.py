@@ -0,0 +1,107 @@
+# pytest/test_query_counts.py
+"""
+SQL 查詢數測試 - 鎖定各端點的查詢次數，避免關聯被隱性載入（N+1、整串訂單歷史被帶出）
+"""
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert
+from app import db
+from app.models import Order, OrderItem, OrderHistory, Customer
+
+ORDER_COUNT = 30
+
+
+@pytest.fixture
+def count_sql(app):
+    """回傳 context manager，區塊內執行的 SQL 會收集在 list 中"""
+    @contextmanager
+    def _count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return _count
+
+
+@pytest.fixture
+def heavy_customer(customer_user, test_product):
+    """擁有大量訂單（含明細與歷史）的客戶"""
+    now = datetime(2025, 1, 1)
+    db.session.execute(insert(Order), [{
+        'order_sn': f'HEAVY{i:05d}', 'user_id': customer_user.id, 'total_amount': 200.0,
+        'status': 'pending', 'shipping_fee': 0, 'payment_status': 'unpaid',
+        'receiver_name': '收件人', 'receiver_phone': '0912345678', 'shipping_address': '地址',
+        'created_at': now + timedelta(minutes=i),
+    } for i in range(ORDER_COUNT)])
+    order_ids = [o.id for o in Order.query.filter_by(user_id=customer_user.id)]
+    db.session.execute(insert(OrderItem), [
+        {'order_id': oid, 'product_id': test_product.id, 'product_name': test_product.name, 'qty': 1, 'price': 100.0}
+        for oid in order_ids for _ in range(2)
+    ])
+    db.session.execute(insert(OrderHistory), [
+        {'order_id': oid, 'status': 'pending', 'operator': str(customer_user.id), 'operated_at': now}
+        for oid in order_ids
+    ])
+    db.session.commit()
+    db.session.expunge_all()
+    return order_ids
+
+
+# (說明, method, path, 角色, 查詢數上限)
+BUDGETS = [
+    ("登入", 'post', '/auth/login', None, 2),
+    ("個人資料", 'get', '/auth/me', 'customer', 1),
+    ("使用者列表", 'get', '/users', 'admin', 1),
+    ("訂單列表", 'get', '/orders?page_size=20', 'customer', 3),
+    ("訂單列表（cursor）", 'get', '/orders?cursor=&page_size=20', 'customer', 2),
+]
+
+
+class TestQueryCounts:
+    """SQL 查詢數測試"""
+
+    @pytest.mark.parametrize("label, method, path, role, budget", BUDGETS, ids=[b[0] for b in BUDGETS])
+    def test_endpoint_query_budget(self, client, count_sql, heavy_customer, admin_user, label, method, path, role, budget):
+        """測試端點的查詢數不隨使用者訂單數增加"""
+        headers = {}
+        if role:
+            email, password = ('admin@test.com', 'admin123') if role == 'admin' else ('customer@test.com', 'customer123')
+            token = client.post('/auth/login', json={'email': email, 'password': password}).get_json()['access_token']
+            headers = {'Authorization': f'Bearer {token}'}
+        kwargs = {'json': {'email': 'customer@test.com', 'password': 'customer123'}} if path == '/auth/login' else {}
+
+        with count_sql() as statements:
+            response = getattr(client, method)(path, headers=headers, **kwargs)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert len(statements) <= budget, f"{label} 執行了 {len(statements)} 次查詢：\n" + "\n".join(statements)
+        assert not any('FROM orders' in s for s in statements if path.startswith(('/auth', '/users'))), f"{label} 不應查詢訂單"
+
+    def test_order_detail_query_budget(self, client, count_sql, heavy_customer, customer_headers):
+        """測試訂單明細頁：訂單 + 使用者 JOIN、明細與歷史各一次"""
+        with count_sql() as statements:
+            response = client.get(f'/orders/{heavy_customer[0]}', headers=customer_headers)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data['items']) == 2
+        assert len(data['history']) == 1
+        assert data['user']['email'] == 'customer@test.com'
+        assert len(statements) <= 3
+
+    def test_lazy_relationship_raises(self, app, heavy_customer):
+        """測試未指定載入選項時存取關聯會直接報錯，而不是默默發出查詢"""
+        order = db.session.get(Order, heavy_customer[0])
+        with pytest.raises(Exception, match='raise_on_sql'):
+            order.items
+
+    def test_delete_customer_with_orders(self, app, test_order):
+        """測試刪除仍有訂單的顧客不需載入訂單"""
+        db.session.expunge_all()
+        db.session.delete(db.session.get(Customer, test_order.customer_id))
+        db.session.commit()
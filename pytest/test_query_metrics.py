@@ -0,0 +1,78 @@
+# pytest/test_query_metrics.py
+"""
+SQL 統計測試 - Server-Timing、/metrics 與查詢數上限
+"""
+import pytest
+from app import db
+from app.models import Product
+from app.utils.query_metrics import query_budget, query_metrics, QueryBudgetExceeded
+
+
+@pytest.fixture
+def budget_route(app):
+    """註冊一個宣告上限 1 次、實際查詢 2 次的測試端點"""
+    @query_budget(1)
+    def too_many_queries():
+        Product.query.count()
+        Product.query.count()
+        return 'ok'
+    app.add_url_rule('/_test/too-many-queries', 'too_many_queries', too_many_queries)
+    return '/_test/too-many-queries'
+
+
+class TestQueryMetrics:
+    """SQL 統計測試"""
+
+    def test_server_timing_header(self, client, customer_headers, test_order):
+        """測試回應帶有 Server-Timing，描述查詢數"""
+        response = client.get(f'/orders/{test_order.id}', headers=customer_headers)
+        assert response.status_code == 200
+        timing = response.headers['Server-Timing']
+        assert timing.startswith('db;dur=')
+        assert 'desc="3 queries"' in timing
+        assert 'db-slowest;dur=' in timing
+
+    def test_metrics_endpoint(self, client, admin_headers, test_order):
+        """測試 /metrics 輸出各端點累計統計與寫入緩衝區統計"""
+        query_metrics.reset()
+        client.get(f'/orders/{test_order.id}', headers=admin_headers)
+        client.get(f'/orders/{test_order.id}', headers=admin_headers)
+        response = client.get('/metrics', headers=admin_headers)
+        assert response.status_code == 200
+        data = response.get_json()
+        stats = data['sql']['orders.get_order']
+        assert stats['requests'] == 2
+        assert stats['max_queries'] == 3
+        assert stats['slowest_sql'].startswith('SELECT')
+        assert 'flushes' in data['write_buffer']
+
+    def test_metrics_forbidden_for_customer(self, client, customer_headers):
+        """測試非管理員無法查看 /metrics"""
+        response = client.get('/metrics', headers=customer_headers)
+        assert response.status_code == 403
+
+    def test_budget_strict_in_tests(self, client, budget_route):
+        """測試 QUERY_BUDGET_STRICT 開啟時超過上限直接失敗"""
+        with pytest.raises(QueryBudgetExceeded, match='too_many_queries'):
+            client.get(budget_route)
+
+    def test_budget_warns_when_not_strict(self, app, client, budget_route, caplog):
+        """測試正式環境超過上限只記錄 warning"""
+        app.config['QUERY_BUDGET_STRICT'] = False
+        response = client.get(budget_route)
+        assert response.status_code == 200
+        assert '超過上限 1' in caplog.text
+
+    def test_create_order_budget_independent_of_lines(self, client, customer_headers, test_category):
+        """測試建立訂單的查詢數不隨明細筆數增加（超過 @query_budget 會直接失敗）"""
+        products = [Product(name=f"商品{i}", price=10.0, stock=10, category_id=test_category.id, is_active=True) for i in range(20)]
+        db.session.add_all(products)
+        db.session.commit()
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [{'product_id': p.id, 'qty': 1} for p in products],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        assert response.status_code == 201
+        assert len(response.get_json()['items']) == 20
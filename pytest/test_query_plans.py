@@ -0,0 +1,145 @@
+# pytest/test_query_plans.py
+"""
+查詢計畫測試 - 確認路由中的主要查詢都走到索引
+
+SQLite 一律執行；設定環境變數 OMS_MYSQL_TEST_URL（指向可任意建表的空資料庫，
+例如 mysql+pymysql://user:pw@localhost:3306/oms_plan_test）時，同一組查詢也會在 MySQL 上以 EXPLAIN 檢查。
+"""
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import select, func, or_, and_, create_engine
+from app import db
+from app.models import (Order, OrderItem, OrderHistory, Product, Category, Customer,
+                        Notification, OperationLog, Payment)
+
+START = datetime(2025, 1, 1)
+
+# (說明, 查詢, 必須出現在查詢計畫中的索引；tuple 表示每個都要出現)
+PLAN_CASES = [
+    ("使用者訂單列表",
+     select(Order).where(Order.user_id == 1).order_by(Order.created_at.desc()).limit(10),
+     'ix_orders_user_id_created_at'),
+    ("管理員訂單列表 / keyset 分頁",
+     select(Order).where(or_(Order.created_at < START, and_(Order.created_at == START, Order.id < 100)))
+     .order_by(Order.created_at.desc(), Order.id.desc()).limit(10),
+     'ix_orders_created_at_id'),
+    ("訂單狀態篩選",
+     select(Order).where(Order.status == 'pending').order_by(Order.created_at.desc()).limit(10),
+     'ix_orders_status_created_at'),
+    ("依金額 keyset 分頁",
+     select(Order).where(or_(Order.total_amount < 100, and_(Order.total_amount == 100, Order.id < 5)))
+     .order_by(Order.total_amount.desc(), Order.id.desc()).limit(10),
+     'ix_orders_total_amount_id'),
+    ("訂單明細載入",
+     select(OrderItem).where(OrderItem.order_id == 1),
+     'ix_order_items_order_id'),
+    ("訂單歷史",
+     select(OrderHistory).where(OrderHistory.order_id == 1).order_by(OrderHistory.operated_at),
+     'ix_order_histories_order_id_operated_at'),
+    ("報表日期區間",
+     select(func.count(Order.id), func.sum(Order.total_amount)).where(Order.created_at >= START),
+     'ix_orders_created_at_id'),
+    ("商品銷售排行（日期區間）",
+     select(Product.name, func.sum(OrderItem.qty))
+     .join(OrderItem, Product.id == OrderItem.product_id)
+     .join(Order, OrderItem.order_id == Order.id)
+     .where(Order.created_at >= START)
+     .group_by(Product.id),
+     ('ix_orders_created_at_id', 'ix_order_items_order_id')),
+    ("單一商品銷售量 / 刪除商品前檢查明細",
+     select(func.sum(OrderItem.qty)).where(OrderItem.product_id == 1),
+     'ix_order_items_product_id_order_id'),
+    ("顧客銷售統計",
+     select(Customer.id, func.count(Order.id)).join(Order, Customer.id == Order.customer_id).group_by(Customer.id),
+     'ix_orders_customer_id'),
+    ("使用者通知",
+     select(Notification).where(Notification.user_id == 1).order_by(Notification.created_at.desc()),
+     'ix_notifications_user_id_created_at'),
+    ("通知 feed（since_id / cursor）",
+     select(Notification).where(Notification.user_id == 1, Notification.id > 100).order_by(Notification.id.desc()).limit(20),
+     'ix_notifications_user_id_id'),
+    ("使用者操作紀錄",
+     select(OperationLog).where(OperationLog.user_id == 1)
+     .order_by(OperationLog.created_at.desc(), OperationLog.id.desc()).limit(50),
+     'ix_operation_logs_user_id_created_at_id'),
+    ("管理員操作紀錄 / keyset 分頁",
+     select(OperationLog).where(or_(OperationLog.created_at < START,
+                                    and_(OperationLog.created_at == START, OperationLog.id < 100)))
+     .order_by(OperationLog.created_at.desc(), OperationLog.id.desc()).limit(50),
+     'ix_operation_logs_created_at_id'),
+    ("單一對象的操作紀錄",
+     select(OperationLog).where(OperationLog.target_type == 'order', OperationLog.target_id == 1)
+     .order_by(OperationLog.created_at.desc(), OperationLog.id.desc()).limit(50),
+     'ix_operation_logs_target_created_at_id'),
+    ("使用者付款列表",
+     select(Payment).join(Order, Payment.order_id == Order.id).where(Order.user_id == 1),
+     'ix_payments_order_id'),
+    ("管理員付款列表",
+     select(Payment).order_by(Payment.created_at.desc(), Payment.id.desc()).limit(20),
+     'ix_payments_created_at_id'),
+    ("付款列表依狀態篩選 / keyset 分頁",
+     select(Payment).where(Payment.status == 'success',
+                           or_(Payment.created_at < START, and_(Payment.created_at == START, Payment.id < 100)))
+     .order_by(Payment.created_at.desc(), Payment.id.desc()).limit(20),
+     'ix_payments_status_created_at_id'),
+    ("分類商品",
+     select(Product).where(Product.category_id == 1),
+     'ix_products_category_id'),
+    ("分類商品（含子分類）",
+     select(Product).where(Product.category_id.in_(select(Category.id).where(Category.path.startswith('/1/')))),
+     'ix_products_category_id'),
+    ("上架商品下拉選單",
+     select(Product).where(Product.is_active == True).order_by(Product.created_at),
+     'ix_products_is_active_created_at'),
+]
+
+
+def assert_uses(label, plan, index):
+    for name in (index if isinstance(index, tuple) else (index,)):
+        assert name in plan, f"{label} 未使用 {name}：{plan}"
+
+
+def explain(conn, stmt):
+    """回傳查詢計畫的文字（各列以 | 串接），方便用 in 判斷索引名稱"""
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if conn.dialect.positional:
+        params = tuple(compiled.params[k] for k in compiled.positiontup)
+    else:
+        params = compiled.params
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        return ' | '.join(str(r[-1]) for r in rows)
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled}", params).mappings().all()
+    return ' | '.join(f"{r['table']}: possible_keys={r['possible_keys']} key={r['key']}" for r in rows)
+
+
+@pytest.fixture(scope="module")
+def mysql_engine():
+    url = os.getenv('OMS_MYSQL_TEST_URL')
+    if not url:
+        pytest.skip("未設定 OMS_MYSQL_TEST_URL")
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    yield engine
+    db.metadata.drop_all(engine)
+    engine.dispose()
+
+
+class TestQueryPlans:
+    """查詢計畫測試"""
+
+    @pytest.mark.parametrize("label, stmt, index", PLAN_CASES, ids=[c[0] for c in PLAN_CASES])
+    def test_sqlite_uses_index(self, app, label, stmt, index):
+        """測試 SQLite 查詢計畫使用預期索引"""
+        with db.engine.connect() as conn:
+            plan = explain(conn, stmt)
+        assert_uses(label, plan, index)
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize("label, stmt, index", PLAN_CASES, ids=[c[0] for c in PLAN_CASES])
+    def test_mysql_uses_index(self, app, mysql_engine, label, stmt, index):
+        """測試 MySQL 查詢計畫可使用預期索引（空表時優化器可能選全表掃描，因此檢查 possible_keys）"""
+        with mysql_engine.connect() as conn:
+            plan = explain(conn, stmt)
+        assert_uses(label, plan, index)
@@ -0,0 +1,159 @@
+# pytest/test_reconciliation.py
+"""
+金流對帳測試 - 匯入綠界對帳檔補登付款，重複匯入不重複入帳
+"""
+import csv
+import io
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+from app import db
+from app.models import Order, OrderItem, OrderHistory, Payment, Notification
+from app.models.sales_rollup import DailyOrderRollup
+from app.services.reconciliation_service import reconcile_settlement, _apply_bulk
+from app.utils.check_mac_value import get_signer
+
+COLUMNS = ['MerchantTradeNo', 'RtnCode', 'RtnMsg', 'TradeAmt', 'PaymentDate', 'CheckMacValue']
+
+
+@pytest.fixture
+def ecpay_orders(app, test_order, test_product):
+    """四筆未付款且已送出綠界的訂單"""
+    orders = []
+    for i in range(4):
+        order = Order(order_sn=f"RECON{i}", user_id=test_order.user_id, customer_id=test_order.customer_id,
+                      total_amount=100.0 + i, shipping_fee=0.0, status='pending', payment_status='unpaid',
+                      trade_no=f"RECON{i}TRADE", receiver_name='測試', receiver_phone='0912345678',
+                      shipping_address='測試地址')
+        order.items.append(OrderItem(product_id=test_product.id, product_name=test_product.name,
+                                     qty=1, price=100.0 + i))
+        db.session.add(order)
+        orders.append(order)
+    db.session.commit()
+    return orders
+
+
+def settlement(*rows, sign=True):
+    """產生對帳檔；rows 為 (trade_no, rtn_code, amount)"""
+    signer = get_signer()
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for trade_no, rtn_code, amount in rows:
+        row = {'MerchantTradeNo': trade_no, 'RtnCode': rtn_code, 'RtnMsg': '交易成功',
+               'TradeAmt': str(amount), 'PaymentDate': '2025/01/02 03:05:10'}
+        row['CheckMacValue'] = signer.sign(row) if sign else 'BAD'
+        writer.writerow(row)
+    buffer.seek(0)
+    return buffer
+
+
+def paid_rows(orders):
+    return [(order.trade_no, '1', int(order.total_amount)) for order in orders]
+
+
+class TestReconciliation:
+    """金流對帳測試"""
+
+    def test_applies_missing_payments(self, ecpay_orders):
+        """測試補登付款紀錄、訂單歷史、通知與銷售彙總，報表列出補登的交易"""
+        report = io.StringIO()
+        summary = reconcile_settlement(settlement(*paid_rows(ecpay_orders)), report, chunk_size=3)
+        assert summary == {'rows': 4, 'paid': 4}
+        ids = [order.id for order in ecpay_orders]
+        db.session.expire_all()
+        assert {o.payment_status for o in Order.query.filter(Order.id.in_(ids))} == {'paid'}
+        assert Payment.query.filter(Payment.order_id.in_(ids)).count() == 4
+        assert OrderHistory.query.filter(OrderHistory.order_id.in_(ids), OrderHistory.status == 'paid').count() == 4
+        assert Notification.query.filter_by(type='payment_success').count() == 4
+        assert db.session.query(DailyOrderRollup.order_count).filter_by(status='paid').scalar() == 4
+
+        report.seek(0)
+        rows = list(csv.DictReader(report))
+        assert [row['trade_no'] for row in rows] == [order.trade_no for order in ecpay_orders]
+        assert {(row['result'], row['status_before'], row['status_after']) for row in rows} == {('paid', 'pending', 'paid')}
+
+    def test_rerun_is_idempotent(self, ecpay_orders):
+        """測試重複匯入同一份對帳檔不重複入帳，報表不列出已入帳的交易"""
+        reconcile_settlement(settlement(*paid_rows(ecpay_orders)))
+        report = io.StringIO()
+        summary = reconcile_settlement(settlement(*paid_rows(ecpay_orders)), report)
+        assert summary == {'rows': 4, 'already_paid': 4}
+        assert Payment.query.count() == 4
+        report.seek(0)
+        assert list(csv.DictReader(report)) == []
+
+    def test_differences(self, ecpay_orders):
+        """測試簽章錯誤、交易失敗、找不到訂單、金額不符、重複列與已付款但無紀錄"""
+        first, second, third, fourth = ecpay_orders
+        fourth.payment_status = 'paid'
+        db.session.commit()
+        rows = [
+            (first.trade_no, '1', 100),
+            (first.trade_no, '1', 100),
+            (second.trade_no, '10100248', 101),
+            (third.trade_no, '1', 999),
+            (fourth.trade_no, '1', 103),
+            ('UNKNOWN', '1', 1),
+        ]
+        data = settlement(*rows).getvalue().splitlines()
+        data.append(settlement(('BADMAC', '1', 1), sign=False).getvalue().splitlines()[1])
+        summary = reconcile_settlement(io.StringIO('\n'.join(data)))
+        assert summary == {'rows': 7, 'paid': 1, 'duplicate_row': 1, 'failed': 1, 'amount_mismatch': 1,
+                           'paid_without_record': 1, 'not_found': 1, 'invalid_signature': 1}
+        assert Payment.query.count() == 1
+
+    def test_dry_run(self, ecpay_orders):
+        """測試 dry run 只比對不寫入"""
+        summary = reconcile_settlement(settlement(*paid_rows(ecpay_orders)), dry_run=True)
+        assert summary == {'rows': 4, 'paid': 4}
+        assert Payment.query.count() == 0
+        db.session.expire_all()
+        assert db.session.get(Order, ecpay_orders[0].id).payment_status == 'unpaid'
+
+    def test_one_lookup_per_chunk(self, app, ecpay_orders):
+        """測試每段只查一次訂單，不隨列數增加"""
+        data = settlement(*paid_rows(ecpay_orders))
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            reconcile_settlement(data, chunk_size=2)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        order_lookups = [s for s in statements if s.lstrip().startswith('SELECT') and 'FROM orders' in s]
+        updates = [s for s in statements if s.lstrip().startswith('UPDATE orders')]
+        assert len(order_lookups) == 2
+        assert len(updates) == 2
+
+    def test_bulk_conflict_falls_back(self, ecpay_orders):
+        """測試批次補登遇到已付款的訂單時整段 rollback，改逐筆處理"""
+        rows = db.session.execute(
+            db.select(Order.id, Order.trade_no, Order.user_id, Order.customer_id, Order.order_sn,
+                      Order.status, Order.payment_status, Order.total_amount, Order.created_at)
+            .where(Order.id.in_([ecpay_orders[0].id, ecpay_orders[1].id]))
+        ).all()
+        ecpay_orders[1].payment_status = 'paid'
+        db.session.commit()
+        assert _apply_bulk(rows, 'ecpay', '對帳補登') is False
+        assert Payment.query.count() == 0
+        db.session.expire_all()
+        assert db.session.get(Order, ecpay_orders[0].id).payment_status == 'unpaid'
+
+        with patch('app.services.reconciliation_service._apply_bulk', return_value=False):
+            summary = reconcile_settlement(settlement(*paid_rows(ecpay_orders[:1])))
+        assert summary == {'rows': 1, 'paid': 1}
+        assert Payment.query.count() == 1
+
+    def test_worker_pool(self, ecpay_orders):
+        """測試以 process pool 驗證簽章"""
+        summary = reconcile_settlement(settlement(*paid_rows(ecpay_orders)), chunk_size=1, workers=2)
+        assert summary == {'rows': 4, 'paid': 4}
+
+    def test_missing_columns(self, app):
+        """測試對帳檔缺少必要欄位"""
+        with pytest.raises(ValueError, match='TradeAmt'):
+            reconcile_settlement(io.StringIO('MerchantTradeNo,RtnCode,CheckMacValue\n'))
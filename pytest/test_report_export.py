@@ -0,0 +1,53 @@
+# pytest/test_report_export.py
+"""
+報表匯出測試 - CSV 串流輸出與 gzip
+"""
+import csv
+import gzip
+import io
+from app.models import Order
+from app.services.report_service import iter_csv, export_orders_csv, stream_orders_csv
+
+
+def _rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+class TestReportExport:
+    """報表匯出測試"""
+
+    def test_iter_csv_chunks(self):
+        """測試每 chunk_rows 列輸出一個片段，合併後為完整 CSV"""
+        chunks = list(iter_csv(['a', 'b'], ([i, i * 2] for i in range(5)), chunk_rows=2))
+        assert len(chunks) == 3
+        assert _rows(''.join(chunks)) == [['a', 'b'], ['0', '0'], ['1', '2'], ['2', '4'], ['3', '6'], ['4', '8']]
+
+    def test_export_orders_streamed(self, client, admin_headers, test_order):
+        """測試訂單匯出以串流回應，內容與舊版 export_orders_csv 相同"""
+        response = client.get('/api/reports/export/orders', headers=admin_headers)
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'text/csv'
+        body = response.get_data(as_text=True)
+        assert body == export_orders_csv(Order.query.order_by(Order.id).all())
+        assert _rows(body)[1][:4] == [str(test_order.id), str(test_order.customer_id), '100.0', 'pending']
+
+    def test_export_gzip(self, client, admin_headers, test_order, test_product):
+        """測試 ?gzip=1 時輸出 gzip 壓縮的 CSV"""
+        response = client.get('/api/reports/export/products?gzip=1', headers=admin_headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/gzip'
+        assert response.headers['Content-Disposition'].endswith('products.csv.gz')
+        rows = _rows(gzip.decompress(response.get_data()).decode('utf-8'))
+        assert rows[0] == ['商品ID', '名稱', '分類', '價格', '促銷價', '庫存']
+        assert rows[1][:2] == [str(test_product.id), '測試商品']
+
+    def test_stream_uses_small_batches(self, app, test_order):
+        """測試小批次分頁時仍輸出全部資料列"""
+        body = ''.join(stream_orders_csv(batch_size=1))
+        assert len(_rows(body)) == 2
+
+    def test_export_forbidden_for_customer(self, client, customer_headers):
+        """測試客戶無法匯出"""
+        response = client.get('/api/reports/export/orders', headers=customer_headers)
+        assert response.status_code == 403
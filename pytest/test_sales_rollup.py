@@ -0,0 +1,123 @@
+# pytest/test_sales_rollup.py
+"""
+每日銷售彙總測試 - 訂單異動時的增量維護與報表讀取
+"""
+import pytest
+from datetime import datetime
+from app import db
+from app.models import Product, DailyOrderRollup, DailyProductRollup
+from app.services.rollup_service import rebuild_sales_rollups
+from app.services.report_service import product_sales_ranking
+
+
+def _rollups():
+    """目前彙總表內容（略過差額歸零的資料列）"""
+    orders = {
+        (r.day, r.status, r.customer_id): (r.order_count, r.total_amount)
+        for r in DailyOrderRollup.query.all() if r.order_count
+    }
+    products = {
+        (r.day, r.product_id, r.status): (r.qty, r.amount)
+        for r in DailyProductRollup.query.all() if r.qty
+    }
+    return orders, products
+
+
+@pytest.fixture
+def other_product(app, test_category):
+    product = Product(name="其他商品", price=50.0, stock=10, category_id=test_category.id, is_active=True)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+@pytest.fixture
+def place(client, customer_headers):
+    def _place(*lines):
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [{'product_id': pid, 'qty': qty} for pid, qty in lines],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        assert response.status_code == 201
+        return response.get_json()['id']
+    return _place
+
+
+class TestSalesRollup:
+    """每日銷售彙總測試"""
+
+    def test_create_order_updates_rollups(self, app, place, test_product, other_product):
+        """測試建立訂單後彙總表立即反映"""
+        place((test_product.id, 2), (other_product.id, 1))
+        place((test_product.id, 1))
+        orders, products = _rollups()
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        assert orders == {(today, 'pending', 0): (2, 350.0)}
+        assert products == {
+            (today, test_product.id, 'pending'): (3, 300.0),
+            (today, other_product.id, 'pending'): (1, 50.0),
+        }
+
+    def test_incremental_matches_rebuild(self, app, client, admin_headers, customer_headers,
+                                         place, test_product, other_product):
+        """測試改狀態、改明細、取消、付款、刪除後，增量結果與重新彙總一致"""
+        a = place((test_product.id, 2))
+        b = place((other_product.id, 3))
+        c = place((test_product.id, 1), (other_product.id, 1))
+        d = place((test_product.id, 1))
+
+        client.put(f'/orders/{a}', headers=admin_headers, json={'status': 'shipped'})
+        client.put(f'/orders/{b}', headers=customer_headers, json={'items': [{'product_id': test_product.id, 'qty': 1}]})
+        client.put('/orders/status', headers=admin_headers, json={'order_ids': [c], 'status': 'cancelled'})
+        assert client.post(f'/payments/{d}', headers=customer_headers).status_code == 201
+        e = place((other_product.id, 2))
+        assert client.delete(f'/orders/{e}', headers=customer_headers).status_code == 200
+
+        incremental = _rollups()
+        rebuild_sales_rollups()
+        assert incremental == _rollups()
+        assert sum(count for count, _ in incremental[0].values()) == 4
+
+    def test_failed_order_leaves_rollups_untouched(self, app, client, customer_headers, test_product):
+        """測試庫存不足而失敗的訂單不會寫入彙總"""
+        response = client.post('/orders', headers=customer_headers, json={
+            'items': [{'product_id': test_product.id, 'qty': 99}],
+            'receiver_name': '測試收件人',
+            'receiver_phone': '0912345678',
+            'shipping_address': '測試收件地址'
+        })
+        assert response.status_code == 400
+        assert _rollups() == ({}, {})
+
+    def test_reports_read_rollups(self, app, client, admin_headers, test_order, place, test_product):
+        """測試開啟 SALES_ROLLUP_READS 後報表與儀表板讀取彙總表，結果與原始查詢一致"""
+        place((test_product.id, 3))
+        rebuild_sales_rollups()  # test_order 直接寫入資料表，需先回填
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        raw_ranking = product_sales_ranking(today, today)
+
+        app.config['SALES_ROLLUP_READS'] = True
+        assert product_sales_ranking(today, today) == raw_ranking
+
+        response = client.get(f'/api/reports/sales?period=month&date_start={today}&date_end={today}', headers=admin_headers)
+        assert response.get_json() == [{'date': today[:7], 'order_count': 2, 'total_amount': 400.0}]
+
+        response = client.get('/api/reports/customer-summary', headers=admin_headers)
+        assert response.get_json() == [
+            {'customer_id': test_order.customer_id, 'name': '測試客戶', 'order_count': 1, 'total_amount': 100.0}
+        ]
+
+        response = client.get('/dashboard/summary', headers=admin_headers)
+        data = response.get_json()
+        assert data['total_sales'] == 400.0
+        assert data['order_count'] == 2
+        assert data['monthly_sales'] == [{'month': today[:7], 'value': 400.0}]
+
+    def test_rebuild_date_range(self, app, place, test_product):
+        """測試只重建指定日期時其他日期的彙總不受影響"""
+        place((test_product.id, 1))
+        before = _rollups()
+        assert rebuild_sales_rollups(start='2000-01-01', end='2000-01-31') == 0
+        assert _rollups() == before
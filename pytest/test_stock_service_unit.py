@@ -0,0 +1,85 @@
+# pytest/test_stock_service_unit.py
+"""
+庫存服務單元測試 - 條件式扣庫存與批次回補
+"""
+import pytest
+from app import db
+from app.models import Product
+from app.services.stock_service import reserve_stock, release_stock, adjust_stock
+
+
+@pytest.fixture
+def products(app):
+    """兩個庫存不同的商品"""
+    a = Product(name="商品A", price=10.0, stock=5, is_active=True)
+    b = Product(name="商品B", price=20.0, stock=1, is_active=True)
+    db.session.add_all([a, b])
+    db.session.commit()
+    return a.id, b.id
+
+
+def _stock(pid):
+    return db.session.query(Product.stock).filter(Product.id == pid).scalar()
+
+
+class TestStockServiceUnit:
+    """庫存服務單元測試"""
+    
+    def test_reserve_stock_all_success(self, products):
+        """測試所有商品庫存足夠時一次扣減"""
+        a, b = products
+        assert reserve_stock([(a, 2), (b, 1)]) == []
+        db.session.commit()
+        assert _stock(a) == 3
+        assert _stock(b) == 0
+    
+    def test_reserve_stock_reports_failed_lines_and_keeps_stock(self, products):
+        """測試任一商品不足時整批不扣，並回報不足的品項"""
+        a, b = products
+        failed = reserve_stock([(a, 2), (b, 3)])
+        assert failed == [{'product_id': b, 'requested': 3, 'available': 1}]
+        db.session.commit()
+        assert _stock(a) == 5
+        assert _stock(b) == 1
+    
+    def test_reserve_stock_aggregates_duplicate_lines(self, products):
+        """測試同一商品多行時以合計數量檢查"""
+        a, _ = products
+        failed = reserve_stock([(a, 3), (a, 3)])
+        assert failed == [{'product_id': a, 'requested': 6, 'available': 5}]
+    
+    def test_reserve_stock_unknown_product(self, products):
+        """測試不存在的商品回報 available 為 None"""
+        failed = reserve_stock({99999: 1})
+        assert failed == [{'product_id': 99999, 'requested': 1, 'available': None}]
+    
+    def test_reserve_stock_price_guard(self, products):
+        """測試指定 prices 時只扣減上架中且單價未變的商品，數量為 0 的商品也會檢查"""
+        a, b = products
+        assert reserve_stock({a: 1}, prices={a: 10.0, b: 20.0}) == []
+        db.session.query(Product).filter(Product.id == a).update({'price': 12.0})
+        db.session.query(Product).filter(Product.id == b).update({'is_active': False})
+        failed = reserve_stock({a: 1}, prices={a: 10.0, b: 20.0})
+        assert failed == [
+            {'product_id': a, 'requested': 1, 'available': 4, 'reason': 'price_changed'},
+            {'product_id': b, 'requested': 0, 'available': 1, 'reason': 'inactive'},
+        ]
+        assert _stock(a) == 4
+        assert reserve_stock({b: 1}) == []  # 未指定 prices（例如後台調整庫存）不檢查上架狀態
+
+    def test_release_stock_batch(self, products):
+        """測試批次回補庫存"""
+        a, b = products
+        release_stock([(a, 1), (b, 2), (a, 1)])
+        db.session.commit()
+        assert _stock(a) == 7
+        assert _stock(b) == 3
+    
+    def test_adjust_stock_refreshes_loaded_product(self, products):
+        """測試異動後 session 中已載入的商品會讀到最新庫存"""
+        a, _ = products
+        product = db.session.get(Product, a)
+        assert product.stock == 5
+        assert adjust_stock(a, -4) is None
+        assert product.stock == 1
+        assert adjust_stock(a, -2) == {'product_id': a, 'requested': 2, 'available': 1}
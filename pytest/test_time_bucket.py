@@ -0,0 +1,127 @@
+# pytest/test_time_bucket.py
+"""
+報表時間分組測試 - 日 / 週 / 月 / 年分組、REPORT_TIMEZONE、範圍條件與各資料庫的 SQL
+"""
+import pytest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from sqlalchemy.dialects import mysql, postgresql
+from app import db
+from app.models import Order
+from app.services.report_service import sales_summary, sales_summary_stmt
+from app.services.rollup_service import rebuild_sales_rollups
+
+TAIPEI = ZoneInfo('Asia/Taipei')
+
+
+@pytest.fixture
+def timed_orders(app, admin_user):
+    """4 筆訂單（created_at 為 UTC），括號內為台北時間"""
+    times = [
+        (datetime(2025, 1, 31, 15, 0), 100),   # (1/31 週五 23:00)
+        (datetime(2025, 1, 31, 16, 30), 200),  # (2/1 週六 00:30)
+        (datetime(2025, 2, 2, 17, 0), 300),    # (2/3 週一 01:00)
+        (datetime(2025, 12, 31, 20, 0), 400),  # (2026/1/1 週四 04:00)
+    ]
+    db.session.add_all(
+        Order(order_sn=f'TB{i}', user_id=admin_user.id, total_amount=amount, status='paid',
+              receiver_name='收件人', receiver_phone='0912345678', shipping_address='地址', created_at=created_at)
+        for i, (created_at, amount) in enumerate(times)
+    )
+    db.session.commit()
+
+
+def _summary(rows):
+    return [(r['date'], r['order_count'], r['total_amount']) for r in rows]
+
+
+class TestSalesSummaryPeriods:
+    """分組測試"""
+
+    def test_utc_periods(self, app, timed_orders):
+        """測試預設 UTC 時的日 / 週（週一為起點）/ 月 / 年分組"""
+        assert _summary(sales_summary('day')) == [
+            ('2025-01-31', 2, 300.0), ('2025-02-02', 1, 300.0), ('2025-12-31', 1, 400.0)]
+        assert _summary(sales_summary('week')) == [('2025-01-27', 3, 600.0), ('2025-12-29', 1, 400.0)]
+        assert _summary(sales_summary('month')) == [
+            ('2025-01', 2, 300.0), ('2025-02', 1, 300.0), ('2025-12', 1, 400.0)]
+        assert _summary(sales_summary('year')) == [('2025', 4, 1000.0)]
+
+    def test_report_timezone(self, client, admin_headers, timed_orders, app):
+        """測試 REPORT_TIMEZONE 依當地日期分組，日期區間也以當地整日計算"""
+        app.config['REPORT_TIMEZONE'] = 'Asia/Taipei'
+
+        def report(query):
+            response = client.get(f'/api/reports/sales?{query}', headers=admin_headers)
+            assert response.status_code == 200
+            return [(r['date'], r['order_count'], r['total_amount']) for r in response.get_json()]
+
+        assert report('period=week') == [('2025-01-27', 2, 300.0), ('2025-02-03', 1, 300.0), ('2025-12-29', 1, 400.0)]
+        assert report('period=month') == [('2025-01', 1, 100.0), ('2025-02', 2, 500.0), ('2026-01', 1, 400.0)]
+        assert report('period=year') == [('2025', 3, 600.0), ('2026', 1, 400.0)]
+        assert report('period=day&date_start=2025-02-01&date_end=2025-02-01') == [('2025-02-01', 1, 200.0)]
+
+    def test_invalid_period_and_timezone(self, client, admin_headers, app):
+        """測試不支援的 period 或時區回傳 400"""
+        assert client.get('/api/reports/sales?period=quarter', headers=admin_headers).status_code == 400
+        app.config['REPORT_TIMEZONE'] = 'Mars/Base'
+        assert client.get('/api/reports/sales', headers=admin_headers).status_code == 400
+
+    @pytest.mark.parametrize("url", [
+        '/api/reports/sales?start=2024-13-45',
+        '/api/reports/product-ranking?start=2024-13-45',
+        '/api/reports/product-ranking?limit=abc',
+        '/api/reports/product-ranking?limit=0',
+        '/api/reports/export/order_stats?end=2024-02-30',
+        '/api/reports/export/product_rank?limit=-1',
+    ])
+    def test_malformed_query_returns_400(self, client, admin_headers, url):
+        """測試日期或 limit 格式錯誤時回傳 400 與 {code, message}"""
+        response = client.get(url, headers=admin_headers)
+        assert response.status_code == 400
+        assert response.get_json()['code'] == 400
+
+    def test_dashboard_monthly_sales(self, client, admin_headers, timed_orders, app):
+        """測試儀表板的月度統計走同一套分組"""
+        app.config['REPORT_TIMEZONE'] = 'Asia/Taipei'
+        data = client.get('/dashboard/summary', headers=admin_headers).get_json()
+        assert data['order_count'] == 4
+        assert data['monthly_sales'] == [
+            {'month': '2025-01', 'value': 100.0}, {'month': '2025-02', 'value': 500.0}, {'month': '2026-01', 'value': 400.0}]
+
+    def test_rollup_week(self, app, timed_orders):
+        """測試彙總表的週分組與原始資料表一致；非 UTC 時區時不讀彙總表"""
+        rebuild_sales_rollups()
+        raw = sales_summary('week')
+        app.config['SALES_ROLLUP_READS'] = True
+        assert sales_summary('week') == raw
+        app.config['REPORT_TIMEZONE'] = 'Asia/Taipei'
+        assert _summary(sales_summary('week'))[0] == ('2025-01-27', 2, 300.0)
+
+
+class TestTimeBucketSql:
+    """各資料庫產生的 SQL 測試"""
+
+    def test_sqlite_range_uses_index(self, app):
+        """測試日期區間以 created_at 範圍條件查詢，走 ix_orders_created_at_id"""
+        stmt = sales_summary_stmt('month', '2025-01-01', '2025-01-31', 'sqlite', TAIPEI)
+        compiled = stmt.compile(db.engine)
+        with db.engine.connect() as conn:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(compiled.params[k] for k in compiled.positiontup)).all()
+        assert 'ix_orders_created_at_id' in ' | '.join(str(r[-1]) for r in plan)
+        assert compiled.params['created_at_1'] == datetime(2024, 12, 31, 16, 0)
+        assert compiled.params['created_at_2'] == datetime(2025, 1, 31, 16, 0)
+
+    @pytest.mark.parametrize("dialect, expected", [
+        (mysql.dialect(), ('date_format(date_add(orders.created_at, INTERVAL 480 MINUTE)',)),
+        (postgresql.dialect(), ("date_trunc('week', timezone('Asia/Taipei', timezone('UTC', orders.created_at)))",
+                                "to_char(")),
+    ], ids=['mysql', 'postgresql'])
+    def test_dialect_sql(self, dialect, expected):
+        """測試 MySQL / PostgreSQL 的分組運算式，WHERE 只比較原始欄位"""
+        unit = 'week' if dialect.name == 'postgresql' else 'day'
+        sql = str(sales_summary_stmt(unit, '2025-01-01', '2025-01-31', dialect.name, TAIPEI).compile(dialect=dialect))
+        for fragment in expected:
+            assert fragment in sql
+        where = sql.split('WHERE', 1)[1].split('GROUP BY', 1)[0].split()
+        assert [where[0], where[1], where[3], where[4], where[5]] == ['orders.created_at', '>=', 'AND', 'orders.created_at', '<']
@@ -0,0 +1,86 @@
+# pytest/test_write_buffer_unit.py
+"""
+通知 / 操作紀錄延遲批次寫入單元測試
+"""
+import pytest
+from app import db
+from app.models import Notification, OperationLog
+from app.services.notification_service import create_notification, create_notifications, log_operation
+from app.services.write_buffer import WriteBuffer, flush_metrics, get_buffer, get_flush_metrics
+
+
+@pytest.fixture
+def metrics(app):
+    """每個測試從乾淨的統計開始"""
+    flush_metrics.reset()
+    return flush_metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestWriteBufferUnit:
+    """延遲批次寫入單元測試"""
+
+    def test_rows_written_on_commit(self, customer_user, metrics):
+        """測試通知與操作紀錄在 commit 前才一次寫入"""
+        create_notification(customer_user.id, 'system', '標題1', '內容1')
+        create_notifications([
+            {'user_id': customer_user.id, 'type': 'system', 'title': '標題2', 'content': '內容2'},
+        ])
+        log_operation(customer_user.id, 'customer', 'update', 'order', 1, '更新')
+        assert len(get_buffer(db.session())) == 3
+        assert db.session.query(Notification).count() == 0
+
+        db.session.commit()
+
+        assert len(get_buffer(db.session())) == 0
+        assert db.session.query(Notification).count() == 2
+        assert db.session.query(OperationLog).count() == 1
+        snapshot = get_flush_metrics()
+        assert snapshot['flushes'] == 1
+        assert snapshot['rows_by_table'] == {'notifications': 2, 'operation_logs': 1}
+
+    def test_rows_discarded_on_rollback(self, customer_user, metrics):
+        """測試 rollback 時緩衝區一併丟棄"""
+        create_notification(customer_user.id, 'system', '標題', '內容')
+        db.session.rollback()
+        db.session.commit()
+
+        assert db.session.query(Notification).count() == 0
+        assert get_flush_metrics()['discarded_rows'] == 1
+
+    def test_savepoint_rollback_keeps_buffer(self, customer_user, metrics):
+        """測試 savepoint 回滾不影響外層交易的緩衝資料"""
+        create_notification(customer_user.id, 'system', '標題', '內容')
+        with db.session.begin_nested() as sp:
+            sp.rollback()
+        db.session.commit()
+
+        assert db.session.query(Notification).count() == 1
+
+    def test_flush_when_row_threshold_reached(self, customer_user, metrics):
+        """測試累積筆數達門檻時先寫入 session"""
+        db.session().info['write_buffer'] = WriteBuffer(max_rows=2)
+        create_notification(customer_user.id, 'system', '標題1', '內容1')
+        assert db.session.query(Notification).count() == 0
+        create_notification(customer_user.id, 'system', '標題2', '內容2')
+
+        assert db.session.query(Notification).count() == 2
+        assert get_flush_metrics()['threshold_flushes'] == 1
+
+    def test_due_after_max_age(self):
+        """測試等待時間超過門檻時視為需要寫入"""
+        clock = FakeClock()
+        buffer = WriteBuffer(max_rows=100, max_age=5, clock=clock)
+        assert not buffer.due()
+        buffer.add(Notification, {})
+        clock.now = 4.9
+        assert not buffer.due()
+        clock.now = 5.0
+        assert buffer.due()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+操作紀錄封存腳本
+
+把超過保留天數的 operation_logs 分批寫入 gzip 壓縮的 JSON Lines 檔案後從資料表刪除，
+建議每天以排程執行一次。封存檔可用 zcat / gzip.open 逐行讀回。
+
+使用方式：
+    python scripts/archive_operation_logs.py [--days 90] [--output-dir archive] [--batch-size 5000] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.operation_log_service import archive_operation_logs, retention_cutoff
+
+def main():
+    parser = argparse.ArgumentParser(description="封存超過保留天數的操作紀錄")
+    parser.add_argument('--days', type=int, help="保留天數，預設為 OPERATION_LOG_RETENTION_DAYS")
+    parser.add_argument('--output-dir', help="封存檔目錄，預設為 OPERATION_LOG_ARCHIVE_DIR")
+    parser.add_argument('--batch-size', type=int, default=5000, help="每批封存並刪除的筆數")
+    parser.add_argument('--dry-run', action='store_true', help="只計算要封存的筆數，不寫檔也不刪除")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        days = args.days if args.days is not None else app.config['OPERATION_LOG_RETENTION_DAYS']
+        cutoff = retention_cutoff(days)
+        print(f"正在封存 {cutoff:%Y-%m-%d %H:%M:%S}（UTC）之前的操作紀錄...")
+        result = archive_operation_logs(
+            cutoff,
+            args.output_dir or app.config['OPERATION_LOG_ARCHIVE_DIR'],
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+        )
+        if args.dry_run:
+            print(f"共 {result['rows']} 筆需要封存（dry run，未寫入）")
+        else:
+            print(f"完成，共封存 {result['rows']} 筆" + (f"：{result['path']}" if result['path'] else ""))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+綠界 CheckMacValue 簽章壓測腳本
+
+以一筆典型的付款結果通知比較：
+- 原本的做法：每次讀設定、quote_plus 後再做 7 次 str.replace
+- ECPaySigner：建立一次，單次 str.translate 編碼
+先確認兩者結果相同，再輸出每秒可驗證的通知數。
+
+使用方式：
+    python scripts/bench_ecpay_signer.py [--count 100000]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+import urllib.parse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.check_mac_value import ECPaySigner
+
+HASH_KEY = '5294y06JbISpM5x9'
+HASH_IV = 'v77hoKGq4kWxNNIS'
+
+NOTIFICATION = {
+    'CustomField1': '', 'CustomField2': '', 'CustomField3': '', 'CustomField4': '',
+    'MerchantID': '2000132', 'MerchantTradeNo': 'OMS11760000000', 'PaymentDate': '2025/01/02 03:05:10',
+    'PaymentType': 'Credit_CreditCard', 'PaymentTypeChargeFee': '25', 'RtnCode': '1', 'RtnMsg': '交易成功',
+    'SimulatePaid': '0', 'StoreID': '', 'TradeAmt': '1280', 'TradeDate': '2025/01/02 03:04:05',
+    'TradeNo': '2501020304051234',
+}
+
+
+def legacy_verify(data):
+    """原本 app/utils/check_mac_value.py 的實作"""
+    check_data = {k: v for k, v in data.items() if k != 'CheckMacValue'}
+    ordered = sorted(check_data.items())
+    raw = "&".join(f"{k}={v}" for k, v in ordered)
+    raw = f"HashKey={HASH_KEY}&{raw}&HashIV={HASH_IV}"
+    urlenc = urllib.parse.quote_plus(raw).lower()
+    for enc, ch in [
+        ('%2d', '-'), ('%5f', '_'), ('%2e', '.'),
+        ('%21', '!'), ('%2a', '*'), ('%28', '('), ('%29', ')'),
+    ]:
+        urlenc = urlenc.replace(enc, ch)
+    calculated_mac = hashlib.sha256(urlenc.encode('utf-8')).hexdigest().upper()
+    return calculated_mac == data.get('CheckMacValue')
+
+
+def measure(fn, data, count):
+    t0 = time.perf_counter()
+    for _ in range(count):
+        fn(data)
+    return count / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="綠界 CheckMacValue 簽章壓測")
+    parser.add_argument('--count', type=int, default=100000, help="驗證次數")
+    args = parser.parse_args()
+
+    signer = ECPaySigner(HASH_KEY, HASH_IV)
+    data = dict(NOTIFICATION, CheckMacValue=signer.sign(NOTIFICATION))
+    if not (legacy_verify(data) and signer.verify(data)):
+        print("兩種實作結果不一致")
+        sys.exit(1)
+
+    legacy = measure(legacy_verify, data, args.count)
+    fast = measure(signer.verify, data, args.count)
+    print(f"原本實作:    {legacy:>10,.0f} 次/秒")
+    print(f"ECPaySigner: {fast:>10,.0f} 次/秒（{fast / legacy:.1f}x）")
+
+
+if __name__ == '__main__':
+    main()
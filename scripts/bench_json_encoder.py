@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 回應編碼壓測腳本
+
+以 Order.to_dict(include_items=True, include_history=True, include_user=True) 組成的訂單列表
+（每筆 3 個明細、2 筆歷史），比較三種編碼方式產生回應 body 的耗時：
+- Flask 預設 provider（json.dumps + Python default）
+- FastJSONProvider 標準函式庫路徑（預先建立的 encoder）
+- FastJSONProvider orjson 路徑（需安裝 orjson）
+另外列出 JSON_DATETIME_FORMAT=iso 時 orjson 原生處理 datetime 的耗時。
+
+使用方式：
+    python scripts/bench_json_encoder.py [--sizes 20 100 1000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['FLASK_ENV'] = 'testing'
+
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from app.models import Order, OrderItem, OrderHistory, User
+from app.utils.json_provider import FastJSONProvider, orjson
+
+
+def build_orders(count):
+    """建立不寫入資料庫的訂單物件（關聯直接指定，to_dict 不會查詢）"""
+    user = User(id=1, username='bench', email='bench@example.com', role='customer', is_active=True,
+                created_at=datetime(2025, 1, 1))
+    start = datetime(2025, 1, 1, 8, 0, 0)
+    orders = []
+    for n in range(count):
+        created = start + timedelta(minutes=n)
+        order = Order(id=n + 1, order_sn=f'OMS{n:012d}', user_id=1, total_amount=1280.0, status='paid',
+                      shipping_fee=60, payment_status='paid', remark='請於平日配送', receiver_name='王小明',
+                      receiver_phone='0912345678', shipping_address='台北市信義區市府路 1 號',
+                      created_at=created, updated_at=created + timedelta(hours=1))
+        order.items = [OrderItem(id=n * 3 + i, order_id=n + 1, product_id=i + 1, product_name=f'商品{i}',
+                                 qty=i + 1, price=199.0, created_at=created) for i in range(3)]
+        order.histories = [OrderHistory(id=n * 2 + i, order_id=n + 1, status=s, operator='1',
+                                        operated_at=created + timedelta(minutes=i), remark=None)
+                           for i, s in enumerate(['pending', 'paid'])]
+        order.user = user
+        orders.append(order)
+    return orders
+
+
+def measure(provider, payload, repeat):
+    provider.response(payload)  # 暖機
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        provider.response(payload).get_data()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 回應編碼壓測")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000], help="訂單筆數")
+    parser.add_argument('--repeat', type=int, default=20, help="每種情境重複次數")
+    args = parser.parse_args()
+
+    app = create_app()
+    providers = [('Flask 預設', DefaultJSONProvider(app))]
+    app.config['JSON_FAST_ENCODER'] = False
+    providers.append(('標準函式庫', FastJSONProvider(app)))
+    if orjson is not None:
+        app.config['JSON_FAST_ENCODER'] = True
+        providers.append(('orjson', FastJSONProvider(app)))
+        app.config['JSON_DATETIME_FORMAT'] = 'iso'
+        providers.append(('orjson iso', FastJSONProvider(app)))
+    else:
+        print("未安裝 orjson，只比較標準函式庫路徑（pip install orjson）")
+
+    with app.test_request_context():
+        print(f"{'筆數':>6} | " + " | ".join(f"{name:>12}" for name, _ in providers) + "   (ms / 次)")
+        for size in args.sizes:
+            payload = {'data': [o.to_dict(include_items=True, include_history=True, include_user=True)
+                                for o in build_orders(size)], 'total': size}
+            timings = [measure(provider, payload, args.repeat) for _, provider in providers]
+            baseline = timings[0]
+            print(f"{size:>6} | " + " | ".join(f"{ms:>7.2f} {baseline / ms:>3.1f}x" for ms in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+商品列表序列化壓測腳本
+
+在記憶體 SQLite 建立四層分類與商品，比較 20 / 100 / 1000 筆時：
+- 舊做法：Product ORM 查詢 + products_schema.dump（逐列 lazy load 分類與子分類）
+- 新做法：list_product_page（projection + JOIN 分類 + 預先編譯的序列化函式）
+輸出每次呼叫的平均耗時與 SQL 查詢數。
+
+使用方式：
+    python scripts/bench_product_listing.py [--sizes 20 100 1000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['FLASK_ENV'] = 'testing'  # 使用記憶體 SQLite，不動到開發資料庫
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models.product import Product, Category
+from app.schemas.product import products_schema
+from app.services.product_service import list_product_page
+
+
+def seed(total):
+    categories = []
+    for i in range(8):
+        parent = None
+        for depth in range(4):
+            category = Category(name=f'分類{i}-{depth}', parent=parent)
+            categories.append(category)
+            parent = category
+    db.session.add_all(categories)
+    db.session.flush()
+    db.session.add_all(
+        Product(name=f'商品{n}', price=100 + n, promo_price=90.0, stock=n, desc='描述',
+                image_url=f'https://example.com/{n}.jpg', category_id=categories[n % len(categories)].id)
+        for n in range(total)
+    )
+    db.session.commit()
+
+
+def old_path(size):
+    products = Product.query.order_by(Product.created_at.desc()).limit(size).all()
+    return products_schema.dump(products)
+
+
+def new_path(size):
+    return list_product_page(page_size=size)['data']
+
+
+def measure(fn, size, repeat):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    fn(size)  # 暖機（分類樹快取、編譯好的 SQL）
+    event.listen(db.engine, 'before_cursor_execute', count)
+    elapsed = 0.0
+    for _ in range(repeat):
+        db.session.expire_all()  # 每輪都從資料庫重新載入，模擬新的請求
+        t0 = time.perf_counter()
+        fn(size)
+        elapsed += time.perf_counter() - t0
+    event.remove(db.engine, 'before_cursor_execute', count)
+    return elapsed / repeat * 1000, len(statements) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="商品列表序列化壓測")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000], help="每頁筆數")
+    parser.add_argument('--repeat', type=int, default=20, help="每種情境重複次數")
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['QUERY_METRICS_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        seed(max(args.sizes))
+        print(f"{'筆數':>6} | {'舊做法 ms':>10} {'查詢數':>6} | {'新做法 ms':>10} {'查詢數':>6} | {'加速':>6}")
+        for size in args.sizes:
+            old_ms, old_queries = measure(old_path, size, args.repeat)
+            new_ms, new_queries = measure(new_path, size, args.repeat)
+            print(f"{size:>6} | {old_ms:>10.2f} {old_queries:>6.0f} | {new_ms:>10.2f} {new_queries:>6.0f} | {old_ms / new_ms:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+報表時間分組跨資料庫壓測腳本
+
+對每個 --url 指定的資料庫（預設只有記憶體 SQLite）建立 users / customers / orders，
+寫入 --orders 筆分散在兩年內的訂單，以 sales_summary_stmt 執行 day / week / month / year 分組：
+- 全部資料、以及最近 31 天（範圍條件）兩種查詢的平均耗時
+- 範圍查詢的查詢計畫是否使用 ix_orders_created_at_id
+- 各資料庫的分組結果是否一致（以第一個資料庫為基準）
+MySQL / PostgreSQL 請指向可任意建表的空資料庫，結束時會刪除建立的資料表。
+
+使用方式：
+    python scripts/bench_time_bucket.py [--url mysql+pymysql://user:pw@localhost/oms_bench ...]
+        [--orders 100000] [--repeat 5] [--timezone Asia/Taipei]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from app.models import User, Customer, Order
+from app.services.report_service import sales_summary_stmt
+from app.utils.time_bucket import UNITS, report_timezone
+
+TABLES = [User.__table__, Customer.__table__, Order.__table__]
+INDEX = 'ix_orders_created_at_id'
+END = datetime(2025, 1, 1)
+
+
+def seed(engine, total, batch=5000):
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__).values(id=1, username='bench', email='bench@example.com',
+                                                   password_hash='x', role='admin', is_active=True,
+                                                   email_verified=True))
+        for offset in range(0, total, batch):
+            conn.execute(insert(Order.__table__), [{
+                'order_sn': f'BENCH{n}',
+                'user_id': 1,
+                'total_amount': rng.randint(1, 500) * 10,
+                'status': 'paid',
+                'shipping_fee': 0,
+                'payment_status': 'paid',
+                'receiver_name': '壓測',
+                'receiver_phone': '0900000000',
+                'shipping_address': '地址',
+                'created_at': END - timedelta(seconds=rng.randint(0, 2 * 365 * 86400)),
+            } for n in range(offset, min(offset + batch, total))])
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(conn)
+    if conn.dialect.name == 'sqlite':
+        params = tuple(compiled.params[k] for k in compiled.positiontup)
+        return ' '.join(str(r[-1]) for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params))
+    return ' '.join(str(tuple(r)) for r in conn.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params))
+
+
+def run(conn, stmt, repeat):
+    rows = conn.execute(stmt).all()  # 暖機
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(stmt).all()
+    return (time.perf_counter() - t0) / repeat * 1000, [(r[0], int(r[1]), float(r[2])) for r in rows]
+
+
+def bench(url, total, repeat, tz):
+    engine = create_engine(url)
+    Order.metadata.create_all(engine, tables=TABLES)
+    try:
+        t0 = time.perf_counter()
+        seed(engine, total)
+        print(f"\n{engine.dialect.name}（{engine.url.render_as_string(hide_password=True)}）"
+              f"寫入 {total} 筆：{time.perf_counter() - t0:.1f}s")
+        start = (END - timedelta(days=31)).date().isoformat()
+        end = (END - timedelta(days=1)).date().isoformat()
+        results = {}
+        with engine.connect() as conn:
+            print(f"{'period':<8}{'全部 (ms)':>12}{'31 天 (ms)':>12}{'組數':>8}  走索引")
+            for unit in UNITS:
+                full = sales_summary_stmt(unit, None, None, engine.dialect.name, tz)
+                ranged = sales_summary_stmt(unit, start, end, engine.dialect.name, tz)
+                full_ms, full_rows = run(conn, full, repeat)
+                ranged_ms, ranged_rows = run(conn, ranged, repeat)
+                uses_index = INDEX in explain(conn, ranged)
+                print(f"{unit:<8}{full_ms:>12.1f}{ranged_ms:>12.1f}{len(full_rows):>8}  {'是' if uses_index else '否'}")
+                results[unit] = (full_rows, ranged_rows)
+        return engine.dialect.name, results
+    finally:
+        Order.metadata.drop_all(engine, tables=TABLES)
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='報表時間分組跨資料庫壓測')
+    parser.add_argument('--url', action='append', help='資料庫連線字串，可指定多個（預設記憶體 SQLite）')
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timezone', default='Asia/Taipei')
+    args = parser.parse_args()
+
+    tz = report_timezone(args.timezone)
+    outcomes = [bench(url, args.orders, args.repeat, tz) for url in args.url or ['sqlite://']]
+    base_name, base = outcomes[0]
+    for name, results in outcomes[1:]:
+        diff = [unit for unit in UNITS if results[unit] != base[unit]]
+        print(f"\n{name} 與 {base_name} 的分組結果：{'一致' if not diff else '不一致（' + ', '.join(diff) + '）'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+訂單搜尋索引重建腳本
+
+既有訂單在 order_search_tokens 上線前建立，需要回填一次索引；
+之後訂單新增 / 修改時會自動維護，不必再執行。
+
+使用方式：
+    python scripts/rebuild_order_search.py [--batch-size 1000]
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.search_service import rebuild_order_search_index
+
+def main():
+    parser = argparse.ArgumentParser(description="重建訂單搜尋索引")
+    parser.add_argument('--batch-size', type=int, default=1000, help="每批處理的訂單數")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print("正在重建訂單搜尋索引...")
+        count = rebuild_order_search_index(batch_size=args.batch_size)
+        print(f"完成，共處理 {count} 筆訂單")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日銷售彙總重建腳本
+
+daily_order_rollups / daily_product_rollups 上線前需要回填一次；
+之後訂單異動時會自動維護，只有資料修正（例如直接改資料庫）後才需要重建對應日期。
+
+使用方式：
+    python scripts/rebuild_sales_rollups.py [--start 2025-01-01] [--end 2025-01-31]
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.rollup_service import rebuild_sales_rollups
+
+def day(value):
+    return date.fromisoformat(value).isoformat()
+
+def main():
+    parser = argparse.ArgumentParser(description="重建每日銷售彙總")
+    parser.add_argument('--start', type=day, help="起始日期 YYYY-MM-DD（含），省略時從最早的訂單開始")
+    parser.add_argument('--end', type=day, help="結束日期 YYYY-MM-DD（含），省略時到最新的訂單")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print("正在重建每日銷售彙總...")
+        count = rebuild_sales_rollups(start=args.start, end=args.end)
+        print(f"完成，共彙總 {count} 筆訂單")
+
+if __name__ == '__main__':
+    main()
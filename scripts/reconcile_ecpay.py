@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+綠界交易對帳腳本
+
+金流通知在停機期間會漏收，事後以綠界後台匯出的交易對帳檔（CSV）補登：
+驗證每列的 CheckMacValue，比對訂單並補上付款紀錄，差異輸出成報表。
+可重複執行，已入帳的交易不會重複處理。
+
+使用方式：
+    python scripts/reconcile_ecpay.py settlement.csv [--report diff.csv] [--chunk-size 5000] [--workers 4] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.reconciliation_service import reconcile_settlement, DEFAULT_CHUNK_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="匯入綠界交易對帳檔並補登付款")
+    parser.add_argument('file', help="對帳檔 CSV（需含 MerchantTradeNo / RtnCode / TradeAmt / CheckMacValue）")
+    parser.add_argument('--report', help="差異報表輸出路徑（CSV）")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="每批處理的列數")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="驗證簽章的 process 數，0 表示不另開 process")
+    parser.add_argument('--dry-run', action='store_true', help="只比對並輸出報表，不寫入資料庫")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print("正在對帳..." + ("（dry run，不寫入）" if args.dry_run else ""))
+        with open(args.file, newline='', encoding='utf-8-sig') as fileobj:
+            if args.report:
+                with open(args.report, 'w', newline='', encoding='utf-8') as report:
+                    summary = reconcile_settlement(fileobj, report, chunk_size=args.chunk_size,
+                                                   workers=args.workers, dry_run=args.dry_run)
+            else:
+                summary = reconcile_settlement(fileobj, chunk_size=args.chunk_size,
+                                               workers=args.workers, dry_run=args.dry_run)
+        print(f"完成，共 {summary.pop('rows', 0)} 列")
+        for result, count in sorted(summary.items()):
+            print(f"  {result}: {count}")
+
+if __name__ == '__main__':
+    main()
@@ -45,6 +45,7 @@ from app.models.customer import Customer
 from app.models.order import Order, OrderItem
 from app.models.payment import Payment
 from app.models.notification import Notification
+from app.services.rollup_service import rebuild_sales_rollups
 
 # 初始化 Faker（繁體中文）
 fake = Faker('zh_TW')
@@ -549,6 +550,7 @@ def main():
         products = create_products(categories)
         customers = create_customers()
         orders = create_orders(customers, products, users)
+        rebuild_sales_rollups()  # 種子訂單直接寫入資料表，需重新彙總報表用的每日彙總
         notifications = create_notifications(users, orders)
         
         print("\n" + "=" * 50)